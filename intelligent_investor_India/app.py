@@ -4,6 +4,7 @@ import plotly.express as px
 from config.universe import get_nifty500_tickers
 from src.data_loader import FundamentalLoader
 from src.valuation import ValuationEngine
+from src.piotroski import configured_f_scores
 from src.portfolio import PortfolioManager
 from src.sentiment import SentimentEngine
 from src.history import HistoryEngine
@@ -11,6 +12,7 @@ from src.personalization import PersonalizationEngine
 from src.mutual_funds import MutualFundEngine
 from src.insurance import InsuranceEngine
 from src.technical import TechnicalEngine
+from src.price_store import PriceStore
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="Intelligent Investor AI", page_icon="🇮🇳", layout="wide")
@@ -36,6 +38,7 @@ st.markdown("""
 st.sidebar.title("👤 User Profile")
 age = st.sidebar.number_input("Age", min_value=18, max_value=80, value=30)
 income = st.sidebar.number_input("Monthly Income (₹)", min_value=0, value=100000, step=5000)
+expenses = st.sidebar.number_input("Monthly Expenses (₹)", min_value=0, value=60000, step=5000)
 savings = st.sidebar.number_input("Emergency Fund (₹)", min_value=0, value=200000, step=10000)
 risk_appetite = st.sidebar.select_slider("Risk Appetite", options=["Low", "Medium", "High"], value="Medium")
 
@@ -44,6 +47,11 @@ st.sidebar.title("💰 Investment")
 capital = st.sidebar.number_input("Capital to Deploy (₹)", min_value=10000, value=100000, step=5000)
 deduct_insurance = st.sidebar.checkbox("Deduct Insurance Premiums?", value=True)
 
+st.sidebar.markdown("---")
+st.sidebar.title("🎯 Goal")
+goal_amount = st.sidebar.number_input("Target Corpus (₹)", min_value=0, value=10000000, step=500000)
+goal_years = st.sidebar.slider("Years to Goal", min_value=1, max_value=40, value=15)
+
 run_btn = st.sidebar.button("🚀 RUN AI ANALYSIS")
 
 # --- CACHED FUNCTIONS (Speed Up) ---
@@ -53,6 +61,13 @@ def load_market_data():
     loader = FundamentalLoader(tickers)
     return loader.get_key_stats()
 
+@st.cache_resource
+def load_price_store():
+    # One memory-mapped store shared by every session (and the weekly job)
+    store = PriceStore()
+    store.sync(get_nifty500_tickers())
+    return store
+
 # --- MAIN APP LOGIC ---
 st.title("🇮🇳 Intelligent Investor: AI Wealth Manager")
 st.markdown("Your personal robo-advisor for Stocks, Mutual Funds, and Insurance.")
@@ -62,6 +77,7 @@ if run_btn:
     profile = {
         "age": age,
         "monthly_income": income,
+        "monthly_expenses": expenses,
         "current_emergency_fund": savings,
         "risk_appetite": risk_appetite,
         "has_term_insurance": False,
@@ -125,6 +141,23 @@ if run_btn:
         mf_orders = mf_engine.recommend_funds(allocation, adjusted_capital)
         st.dataframe(mf_orders, hide_index=True, use_container_width=True)
 
+        # Goal Projection (Monte Carlo; monthly surplus invested as a SIP)
+        st.subheader("🎯 Goal Projection")
+        projection = user_engine.project_goal(adjusted_capital, goal_years, goal=goal_amount or None)
+        col1, col2, col3 = st.columns(3)
+        chance = projection['probability']
+        col1.metric("Chance of Reaching Goal", f"{chance:.0%}" if chance is not None else "-")
+        col2.metric("Median Outcome", f"₹{projection['median']:,.0f}")
+        col3.metric("Total Invested", f"₹{projection['invested']:,.0f}")
+
+        bands = projection['bands'].reset_index()
+        fig = px.line(bands, x='year', y=['p10', 'p50', 'p90', 'invested'],
+                      labels={'value': 'Wealth (₹)', 'year': 'Years', 'variable': ''})
+        if goal_amount:
+            fig.add_hline(y=goal_amount, line_dash="dash", annotation_text="Goal")
+        st.plotly_chart(fig)
+        st.caption("Bands: 10th / 50th / 90th percentile of 20,000 simulated paths.")
+
     with tab3:
         st.header("AI Stock Picker (NIFTY 500)")
         
@@ -136,14 +169,15 @@ if run_btn:
             
             if not df_raw.empty:
                 # Analysis Pipeline
-                tech_engine = TechnicalEngine()
+                price_store = load_price_store()
+                tech_engine = TechnicalEngine(panel=price_store.to_panel(), store=price_store)
                 df_tech = tech_engine.add_technical_indicators(df_raw)
                 
-                val_engine = ValuationEngine(df_raw)
+                val_engine = ValuationEngine(df_raw, f_scores=configured_f_scores(df_raw.index))
                 val_engine.clean_data()
                 df_scored = val_engine.get_blended_score(df_tech)
                 
-                pm = PortfolioManager(stock_budget)
+                pm = PortfolioManager(stock_budget, price_store=price_store)
                 candidates = pm.select_and_allocate(df_scored, top_n=15)
                 
                 if not candidates.empty:
@@ -14,4 +14,164 @@ REPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
 # --- INDIAN SETTINGS ---
 STARTING_CAPITAL = 100000  # ₹1,00,000 (Example Capital)
-CURRENCY_SYMBOL = "₹"
\ No newline at end of file
+CURRENCY_SYMBOL = "₹"
+
+# --- DATA FETCHING ---
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", 16))      # Parallel yfinance requests
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", 20))    # Seconds to wait per ticker
+
+# --- LOCAL CACHE ---
+# Fundamentals are cached on disk so repeat runs skip the network.
+# Each field has its own time-to-live (in hours): price-driven fields go
+# stale quickly, balance-sheet fields only change with quarterly results.
+USE_CACHE = os.getenv("USE_CACHE", "1") != "0"
+CACHE_DB = DATA_DIR / "market_cache.sqlite"
+
+FIELD_TTL_HOURS = {
+    # Price / momentum (short)
+    'price': 6, 'market_cap': 6, '50_dma': 6, '200_dma': 6,
+    'trailing_pe': 6, 'price_to_book': 6, 'dividend_yield': 6,
+    # Analyst estimates (daily)
+    'forward_pe': 24, 'peg_ratio': 24,
+    # Fundamentals (long)
+    'roe': 24 * 7, 'profit_margin': 24 * 7, 'debt_to_equity': 24 * 7,
+    'current_ratio': 24 * 7, 'target_mean_price': 24 * 7,
+    'sector': 24 * 30,
+}
+DEFAULT_TTL_HOURS = 24
+
+# --- MARKET DATA PROVIDER ---
+# live   = yfinance (default)
+# record = yfinance, and save every response under RECORDINGS_DIR
+# replay = serve saved responses only (no network), for offline benchmarks
+MARKET_DATA_MODE = os.getenv("MARKET_DATA_MODE", "live")
+RECORDINGS_DIR = Path(os.getenv("RECORDINGS_DIR", DATA_DIR / "recordings"))
+REPLAY_LATENCY = float(os.getenv("REPLAY_LATENCY", 0))  # Simulated seconds per call
+
+# --- INCREMENTAL REFRESH ---
+# Keep yesterday's scored universe and only refetch/re-score what changed
+INCREMENTAL_REFRESH = os.getenv("INCREMENTAL_REFRESH", "0") == "1"
+SNAPSHOT_PATH = DATA_DIR / "universe_snapshot.pkl"
+
+# --- FINANCIAL STATEMENTS ---
+# Annual statements are cached by ticker + fiscal year (same SQLite file)
+# and only refetched once the next year's results should be out.
+STATEMENT_FILING_LAG_DAYS = 120     # Results are usually filed within ~4 months of year end
+STATEMENT_RECHECK_HOURS = 24 * 7    # How often to look again for an overdue filing
+HISTORY_AUDIT_SCOPE = os.getenv("HISTORY_AUDIT_SCOPE", "shortlist")  # 'shortlist' or 'universe'
+
+# --- NEWS SENTIMENT ---
+# One shared token bucket for news requests (replaces a fixed sleep per ticker)
+NEWS_RATE_PER_SEC = float(os.getenv("NEWS_RATE_PER_SEC", 4))
+NEWS_RATE_BURST = int(os.getenv("NEWS_RATE_BURST", 8))
+NEWS_HEADLINES = 5            # Latest headlines shown per stock
+# News is kept in a local append-only store; sentiment is a decayed average
+# over a time window of stored headlines (not just today's top five)
+NEWS_REFRESH_MINUTES = int(os.getenv("NEWS_REFRESH_MINUTES", 120))  # Re-ask the API at most this often
+NEWS_WINDOW_DAYS = 7
+NEWS_HALF_LIFE_DAYS = 2       # A headline's weight halves every 2 days
+SENTIMENT_BATCH_SIZE = 200    # Headlines per scoring batch / process-pool task
+# 'textblob' (default) or 'lexicon': TextBlob's lexicon precompiled to a JSON
+# table and scored without TextBlob overhead (same -1..+1 scale)
+SENTIMENT_SCORER = os.getenv("SENTIMENT_SCORER", "textblob")
+SENTIMENT_PROCESSES = int(os.getenv("SENTIMENT_PROCESSES", 1))  # >1 = process pool for big batches
+SENTIMENT_LEXICON_PATH = DATA_DIR / "sentiment_lexicon.json"
+
+# --- BULK PRICE HISTORY ---
+PRICE_HISTORY_PERIOD = "1y"   # Enough bars for a 200-DMA
+PRICE_BATCH_SIZE = 100        # Tickers per yf.download() call
+
+# Fields that move with the share price. When a bulk price panel is
+# available these are re-derived from the latest close instead of
+# forcing a per-ticker refetch.
+PRICE_DERIVED_FIELDS = ['price', '50_dma', '200_dma', 'market_cap', 'trailing_pe',
+                        'forward_pe', 'peg_ratio', 'price_to_book', 'dividend_yield']
+
+# --- LOCAL PRICE STORE ---
+# Memory-mapped daily bars, appended to once a day and shared by every process
+PRICE_STORE_DIR = DATA_DIR / "prices"
+# Catch-up window for appends, picked by calendar days since the last stored
+# bar: a daily run asks for "5d"; a bot left idle for weeks backfills the gap
+PRICE_UPDATE_PERIODS = [(4, "5d"), (28, "1mo"), (85, "3mo"), (175, "6mo"), (360, "1y"), (720, "2y"),
+                        (1800, "5y"), (None, "max")]
+INDICATOR_STATE_PATH = DATA_DIR / "indicator_state.npz"  # Online indicator checkpoint
+
+# --- SCORING RULES ---
+# Sector thresholds, points and blend weights (edit to re-tune, no code change)
+SCORING_RULES_PATH = Path(os.getenv("SCORING_RULES_PATH", BASE_DIR / "config" / "scoring_rules.json"))
+SCORING_MODE = os.getenv("SCORING_MODE", "absolute")  # 'absolute' cutoffs or 'percentile' within sector
+
+# quality_score from the 'snapshot' checks above, or the full 9-point
+# Piotroski F-score computed from annual statements ('piotroski')
+QUALITY_SCORE_SOURCE = os.getenv("QUALITY_SCORE_SOURCE", "snapshot")
+PIOTROSKI_MIN_CRITERIA = 5   # Scorable criteria (of 9) needed to use the F-score
+
+# --- ALLOCATION ---
+# 'equal'    = equal rupee targets walked down the ranked list
+# 'optimize' = maximise score-weighted exposure in whole shares, within the
+#              budget, the sector caps and a portfolio volatility target
+ALLOCATION_MODE = os.getenv("ALLOCATION_MODE", "equal")
+OPTIMIZER_CANDIDATES = 100    # Top-ranked stocks the optimizer may choose from
+RISK_TARGET_VOL = float(os.getenv("RISK_TARGET_VOL", 0.20))  # Annualised, on the whole budget (cash = 0 risk)
+COV_LOOKBACK_DAYS = 252       # Daily returns behind the covariance (from the local price store)
+COV_MIN_OBS = 60              # Fewer returns -> median variance, no correlation
+TRADING_DAYS = 252
+
+# --- BACKTEST ---
+# Every run archives its raw fundamentals by date; the backtester replays
+# scoring + selection over those snapshots and the local price store (offline)
+SNAPSHOT_ARCHIVE = os.getenv("SNAPSHOT_ARCHIVE", "1") != "0"
+SNAPSHOT_ARCHIVE_DIR = DATA_DIR / "snapshots"
+BACKTEST_REBALANCE = os.getenv("BACKTEST_REBALANCE", "weekly")  # 'weekly' (like weekly_mail.py) or 'monthly'
+BACKTEST_TOP_N = 15           # Stocks held, equal weight (like select_and_allocate's top_n)
+BACKTEST_COST_BPS = 10        # Trading cost per rupee traded, in basis points
+
+# --- RISK ---
+RISK_CACHE_DIR = DATA_DIR / "risk"   # Universe covariance per price date
+RISK_CACHE_KEEP = 5                  # Dates kept on disk
+VAR_CONFIDENCE = 0.95
+
+# --- LIVE QUOTES ---
+# Last prices for holdings + candidates, fetched in ONE batched download and
+# kept briefly in memory and in CACHE_DB (never one request per ticker)
+QUOTE_TTL_SECONDS = int(os.getenv("QUOTE_TTL_SECONDS", 300))
+QUOTE_PERIOD = "5d"           # Daily bars requested; the last close is the quote (covers holidays)
+QUOTE_CANDIDATES = 100        # Top-ranked candidates re-priced before allocation
+UNLISTED_HOLDING_TYPES = ('MF',)  # holdings.csv Types with no exchange symbol, valued from the CSV
+
+# --- GOAL PROJECTION ---
+# Annual (expected return, volatility) per allocation bucket for the Monte Carlo
+PROJECTION_ASSUMPTIONS = {
+    'Stocks': (0.13, 0.22),
+    'Mutual_Funds': (0.11, 0.16),
+    'Safe_Debt_Gold': (0.07, 0.06),
+}
+PROJECTION_CORRELATION = [[1.0, 0.85, 0.1],   # Same order as PROJECTION_ASSUMPTIONS
+                          [0.85, 1.0, 0.1],
+                          [0.1, 0.1, 1.0]]
+PROJECTION_PATHS = 20000
+PROJECTION_SEED = 42          # Same inputs -> same bands (None = fresh draws every run)
+PROJECTION_PERCENTILES = [10, 25, 50, 75, 90]
+
+# --- ORDER EXECUTION ---
+# alpaca = paper/live account from .env (needs alpaca-trade-api)
+# mock   = in-process broker with simulated latency and failures (no network)
+BROKER = os.getenv("BROKER", "alpaca")
+ORDER_MAX_IN_FLIGHT = int(os.getenv("ORDER_MAX_IN_FLIGHT", 8))  # Orders submitted concurrently
+ORDER_RETRIES = 3             # Extra attempts per order after a transient failure
+ORDER_RETRY_BACKOFF = 0.5     # Seconds before the first retry; doubles each time
+BROKER_RATE_PER_SEC = float(os.getenv("BROKER_RATE_PER_SEC", 3))   # Alpaca allows 200 requests/min
+BROKER_RATE_BURST = int(os.getenv("BROKER_RATE_BURST", 10))
+MOCK_BROKER_LATENCY = float(os.getenv("MOCK_BROKER_LATENCY", 0.05))        # Seconds per call
+MOCK_BROKER_FAILURE_RATE = float(os.getenv("MOCK_BROKER_FAILURE_RATE", 0))  # Requests that never arrive
+MOCK_BROKER_LOST_ACK_RATE = float(os.getenv("MOCK_BROKER_LOST_ACK_RATE", 0))  # Accepted, reply lost
+
+# --- ORDER JOURNAL ---
+# Append-only log of every order's intent / submission / acknowledgement,
+# so a run that dies halfway can be resumed without sending anything twice
+ORDER_JOURNAL = os.getenv("ORDER_JOURNAL", "1") != "0"
+ORDER_JOURNAL_PATH = DATA_DIR / "order_journal.jsonl"
+ORDER_JOURNAL_SYNC_RECORDS = 512     # fsync after this many buffered records...
+ORDER_JOURNAL_SYNC_SECONDS = 0.05    # ...or once the oldest buffered record is this old
+ORDER_RESUME_MAX_AGE_HOURS = 12      # Older unfinished orders are expired, not re-sent (they were day orders)
+ORDER_JOURNAL_KEEP_HOURS = 24        # Finished batches stay this long, so re-runs are answered from the log
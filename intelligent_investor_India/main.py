@@ -1,8 +1,9 @@
 import pandas as pd
-from config.settings import STARTING_CAPITAL
+from config.settings import STARTING_CAPITAL, INCREMENTAL_REFRESH, HISTORY_AUDIT_SCOPE, SNAPSHOT_ARCHIVE
 from config.universe import get_nifty500_tickers
 from src.data_loader import FundamentalLoader
 from src.valuation import ValuationEngine
+from src.piotroski import configured_f_scores
 from src.portfolio import PortfolioManager
 from src.sentiment import SentimentEngine
 from src.history import HistoryEngine
@@ -10,6 +11,10 @@ from src.personalization import PersonalizationEngine
 from src.mutual_funds import MutualFundEngine
 from src.insurance import InsuranceEngine
 from src.technical import TechnicalEngine 
+from src.refresh import IncrementalRefresher
+from src.price_store import PriceStore
+from src.backtest import SnapshotArchive
+from src.risk import RiskEngine
 
 pd.set_option('future.no_silent_downcasting', True)
 
@@ -75,23 +80,45 @@ def run_indian_bot():
     
     # (Optional: Load existing holdings here to avoid duplicates - skipped for brevity)
     
+    # Local price store: a small batched download appends today's bars, then
+    # RSI/trend/DMAs for the whole universe read memory-mapped history
+    price_store = PriceStore()
+    price_store.sync(universe_tickers)
+    price_panel = price_store.to_panel()
+    
     print(f"2. Fetching Fundamentals for {len(universe_tickers)} stocks...")
-    loader = FundamentalLoader(universe_tickers)
-    df_raw = loader.get_key_stats()
+    df_scored = None
+    if INCREMENTAL_REFRESH:
+        # Re-uses yesterday's snapshot; only changed stocks are fetched & re-scored
+        df_raw, df_scored = IncrementalRefresher(universe_tickers, panel=price_panel, store=price_store).run()
+    else:
+        loader = FundamentalLoader(universe_tickers)
+        df_raw = loader.get_key_stats()
     
     if not df_raw.empty:
-        # --- A. Technical Analysis (Trend) ---
+        if SNAPSHOT_ARCHIVE:
+            SnapshotArchive().save(df_raw)  # Dated copy for the backtester
         print("\n3. Analyzing Trends & Valuation...")
-        tech_engine = TechnicalEngine()
-        df_tech = tech_engine.add_technical_indicators(df_raw)
-        
-        # --- B. Fundamental Analysis (Sector + Quality) ---
-        val_engine = ValuationEngine(df_raw)
-        val_engine.clean_data()
-        df_scored = val_engine.get_blended_score(df_tech)
+        tech_engine = TechnicalEngine(panel=price_panel, store=price_store)
+
+        if df_scored is None:
+            # --- A. Technical Analysis (Trend) ---
+            df_tech = tech_engine.add_technical_indicators(df_raw)
+            
+            # --- B. Fundamental Analysis (Sector + Quality) ---
+            val_engine = ValuationEngine(df_raw, f_scores=configured_f_scores(df_raw.index))
+            val_engine.clean_data()
+            df_scored = val_engine.get_blended_score(df_tech)
+
+        # Optional: audit statements for the whole universe up front (cached,
+        # fetched in parallel) so a rejected stock is replaced by the next best
+        if HISTORY_AUDIT_SCOPE == "universe":
+            verdicts = HistoryEngine().audit(df_scored.index)
+            print(f"📜 History audit: {int(verdicts['is_stable'].sum())}/{len(verdicts)} stocks passed")
+            df_scored = df_scored[verdicts['is_stable'].to_numpy()]
         
         # --- C. Portfolio Manager (Select Candidates) ---
-        pm = PortfolioManager(stock_budget)
+        pm = PortfolioManager(stock_budget, price_store=price_store)
         
         # Sell Check (Optional)
         # if hasattr(pm, 'review_portfolio_for_sells'): ...
@@ -107,11 +134,11 @@ def run_indian_bot():
             if not stable_buys.empty:
                 # --- E. RSI Check (Timing) ---
                 print("\n--- ⏱ RSI TIMING CHECK ---")
+                # Wilder RSI already scored for the whole universe (neutral if no bars)
+                rsi_by_ticker = df_scored['rsi_14'] if 'rsi_14' in df_scored.columns else pd.Series(dtype=float)
+                rsi_values = rsi_by_ticker.reindex(stable_buys['ticker']).fillna(50).to_numpy()
                 rsi_approved = []
-                for idx, row in stable_buys.iterrows():
-                    ticker = row['ticker']
-                    rsi = tech_engine.get_rsi(ticker)
-                    
+                for idx, ticker, rsi in zip(stable_buys.index, stable_buys['ticker'], rsi_values):
                     if rsi > 75:
                         print(f"  ❌ SKIPPED {ticker}: Overbought (RSI {rsi:.0f})")
                     elif rsi < 30:
@@ -173,6 +200,12 @@ def run_indian_bot():
                     st_renamed = final_stock_buys.rename(columns={'ticker': 'Ticker', 'est_cost': 'Value'})
                     st_renamed['Category'] = 'Stock'
                     final_df = pd.concat([final_df, st_renamed[['Ticker', 'Value', 'Category']]])
+
+                # 4. Risk of holdings + this plan's stock buys (local price history)
+                if len(price_store):
+                    risk_engine = RiskEngine(price_store)
+                    positions = risk_engine.positions(pm.holdings, final_stock_buys, prices=pm.market_prices())
+                    RiskEngine.report(risk_engine.analyze(positions))
                 
                 # Save Report
                 if not final_df.empty:
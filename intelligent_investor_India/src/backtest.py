@@ -0,0 +1,272 @@
+import os
+import math
+import numpy as np
+import pandas as pd
+from config.settings import (SNAPSHOT_ARCHIVE_DIR, BACKTEST_REBALANCE, BACKTEST_TOP_N, BACKTEST_COST_BPS,
+                             SCORING_MODE, TRADING_DAYS)
+from src.price_store import PriceStore
+from src.refresh import IncrementalRefresher
+from src.technical import TechnicalEngine
+from src.valuation import ValuationEngine
+
+class SnapshotArchive:
+    def __init__(self, root=SNAPSHOT_ARCHIVE_DIR):
+        """
+        Dated copies of the raw fundamentals (the FundamentalLoader frame),
+        one pickle per day: <root>/YYYY-MM-DD.pkl. A second run on the
+        same day replaces that day's file.
+        """
+        self.root = str(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def save(self, df_raw, date=None):
+        date = (pd.Timestamp(date) if date is not None else pd.Timestamp.now()).normalize()
+        path = os.path.join(self.root, f"{date:%Y-%m-%d}.pkl")
+        tmp = f"{path}.tmp"
+        pd.to_pickle(df_raw, tmp)
+        os.replace(tmp, path)
+        return path
+
+    def dates(self):
+        names = [f[:-4] for f in os.listdir(self.root) if f.endswith('.pkl')]
+        return pd.DatetimeIndex(sorted(pd.to_datetime(names, format='%Y-%m-%d', errors='coerce').dropna()))
+
+    def load(self):
+        """
+        (DatetimeIndex, [frame per date]) for the whole archive, oldest first.
+        """
+        dates = self.dates()
+        frames = []
+        for date in dates:
+            df = pd.read_pickle(os.path.join(self.root, f"{date:%Y-%m-%d}.pkl"))
+            frames.append(df[~df.index.duplicated(keep='last')])
+        return dates, frames
+
+
+class Backtester:
+    FREQ = {'weekly': 'W-FRI', 'monthly': 'M'}
+
+    def __init__(self, store=None, archive=None, rebalance=BACKTEST_REBALANCE, top_n=BACKTEST_TOP_N,
+                 cost_bps=BACKTEST_COST_BPS, rules=None, mode=SCORING_MODE):
+        """
+        Walk-forward replay of the Technical -> Valuation -> top-N selection
+        pipeline, fully offline: fundamentals come from the dated snapshot
+        archive (latest snapshot on or before each rebalance date, with
+        price-driven fields rolled to that day's close like the incremental
+        refresh does) and prices from the local PriceStore.
+
+        All rebalance dates are scored in one pass over a stacked
+        (date x ticker) frame, and daily P&L with weight drift between
+        rebalances is computed as whole (days x tickers) arrays.
+        Holdings are equal weight (select_and_allocate's 'equal' mode,
+        without share rounding); the history, RSI and news filters need
+        data we don't keep historically, so they are not replayed.
+        """
+        if rebalance not in self.FREQ:
+            raise ValueError(f"Unknown rebalance '{rebalance}' (use one of {list(self.FREQ)})")
+        self.store = store or PriceStore()
+        self.archive = archive or SnapshotArchive()
+        self.rebalance = rebalance
+        self.top_n = top_n
+        self.cost = cost_bps / 10000.0
+        self.rules = rules
+        self.mode = mode  # 'absolute' scores all dates at once; 'percentile' ranks each date's universe
+
+    # --- DATES ---
+    def rebalance_rows(self, index, first_snapshot, start=None, end=None):
+        """
+        Positions in the price index of the last trading day of every week
+        (or month) that already has a fundamentals snapshot.
+        """
+        days = pd.Series(np.arange(len(index)), index=index)
+        days = days[days.index >= max(first_snapshot, pd.Timestamp(start or first_snapshot))]
+        if end is not None:
+            days = days[days.index <= pd.Timestamp(end)]
+        period = days.index.to_period(self.FREQ[self.rebalance])
+        return days.groupby(period).max().to_numpy()
+
+    # --- SCORING ---
+    def stack(self, snap_dates, snapshots, close, rows):
+        """
+        One row per (rebalance date, ticker): the as-of snapshot row,
+        repriced to that date. Returns (frame, date position, ticker column).
+        """
+        C = close.to_numpy()
+        snap_of = np.searchsorted(snap_dates.values, close.index[rows].values, side='right') - 1
+
+        big = pd.concat(snapshots)
+        lengths = np.array([len(s) for s in snapshots])
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        n = lengths[snap_of]
+        starts = np.concatenate(([0], np.cumsum(n)[:-1]))
+        take = np.repeat(offsets[snap_of] - starts, n) + np.arange(n.sum())
+
+        date_pos = np.repeat(np.arange(len(rows)), n)
+        col = close.columns.get_indexer(big.index[take])
+        t = rows[date_pos]
+        with np.errstate(invalid='ignore'):
+            keep = (col >= 0) & (C[t, np.maximum(col, 0)] > 0)
+        take, date_pos, col, t = take[keep], date_pos[keep], col[keep], t[keep]
+
+        frame = big.iloc[take].reset_index()
+        frame = frame.rename(columns={frame.columns[0]: 'ticker'})
+        stats = pd.DataFrame({
+            'price': C[t, col],
+            '50_dma': close.rolling(50, min_periods=50).mean().to_numpy()[t, col],
+            '200_dma': close.rolling(200, min_periods=200).mean().to_numpy()[t, col],
+        })
+        return IncrementalRefresher.reprice_to(frame, stats), date_pos, col
+
+    def _score(self, frame):
+        tech = TechnicalEngine().add_technical_indicators(frame.copy())
+        engine = ValuationEngine(frame, rules=self.rules, mode=self.mode, quality_source='snapshot')
+        engine.clean_data()
+        return engine.get_blended_score(tech)['total_score'].reindex(frame.index).to_numpy()
+
+    def score_matrix(self, frame, date_pos, col, shape):
+        """
+        (rebalance dates x tickers) total_score; NaN = not in that snapshot.
+        """
+        if self.mode == 'percentile':
+            # Percentiles are relative to the day's peers: score each date on its own
+            total = np.full(len(frame), np.nan)
+            for _, idx in pd.Series(np.arange(len(frame))).groupby(date_pos):
+                total[idx.to_numpy()] = self._score(frame.iloc[idx.to_numpy()].reset_index(drop=True))
+        else:
+            # Absolute cutoffs are row-local: every date in one pass
+            total = self._score(frame)
+        S = np.full(shape, np.nan)
+        S[date_pos, col] = total
+        return S
+
+    def target_weights(self, S):
+        """
+        Equal weight (1/top_n each) in the top_n scores of every date;
+        fewer eligible stocks leave the rest in cash.
+        """
+        filled = np.where(np.isnan(S), -np.inf, S)
+        order = np.argsort(-filled, axis=1, kind='stable')[:, :self.top_n]
+        picked = np.take_along_axis(filled, order, axis=1) > -np.inf
+        W = np.zeros(S.shape)
+        np.put_along_axis(W, order, np.where(picked, 1.0 / self.top_n, 0.0), axis=1)
+        return W
+
+    # --- SIMULATION ---
+    def simulate(self, C, rows, W):
+        """
+        Daily returns of holding W[k] from the close of rows[k] to rows[k+1]
+        (weights drift with prices, cash earns nothing), with trading costs
+        charged on each rebalance day. Returns (daily returns from rows[0],
+        one-way turnover per rebalance).
+        """
+        T = len(C)
+        k = np.searchsorted(rows, np.arange(T), side='left') - 1   # Period of (rows[k], rows[k+1]]
+        t = np.flatnonzero(k >= 0)
+        k = k[t]
+
+        anchor = C[rows[k]]
+        Wt = W[k]
+        cash = 1 - Wt.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            now = np.where(Wt > 0, C[t] / anchor, 0.0)
+            prev = np.where(Wt > 0, C[t - 1] / anchor, 0.0)
+        returns = np.zeros(T)
+        returns[t] = ((Wt * now).sum(axis=1) + cash) / ((Wt * prev).sum(axis=1) + cash) - 1
+
+        # Weights just before each rebalance (last period's weights after drift)
+        drift = np.zeros(W.shape)
+        if len(rows) > 1:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                grown = np.where(W[:-1] > 0, C[rows[1:]] / C[rows[:-1]], 0.0) * W[:-1]
+            drift[1:] = grown / (grown.sum(axis=1) + 1 - W[:-1].sum(axis=1))[:, None]
+        traded = np.abs(W - drift).sum(axis=1)
+        returns[rows] = (1 + returns[rows]) * (1 - traded * self.cost) - 1
+        return returns[rows[0]:], traded / 2
+
+    @staticmethod
+    def summarize(returns):
+        equity = np.cumprod(1 + returns)
+        years = max(len(returns) - 1, 1) / TRADING_DAYS
+        drawdown = equity / np.maximum.accumulate(equity) - 1
+        std = returns[1:].std()
+        return {
+            'total_return': equity[-1] - 1,
+            'cagr': equity[-1] ** (1 / years) - 1 if equity[-1] > 0 else -1.0,
+            'volatility': std * math.sqrt(TRADING_DAYS),
+            'sharpe': returns[1:].mean() / std * math.sqrt(TRADING_DAYS) if std > 0 else float('nan'),
+            'max_drawdown': drawdown.min(),
+        }, equity, drawdown
+
+    def run(self, start=None, end=None):
+        """
+        Returns {'stats', 'equity', 'drawdown', 'rebalances'}; stats also
+        carry an equal-weight-of-everything-scored benchmark. None if the
+        archive or price store is empty.
+        """
+        print(f"\n--- 🔁 BACKTEST ({self.rebalance}, top {self.top_n}) ---")
+        snap_dates, snapshots = self.archive.load()
+        panel = self.store.to_panel()
+        if not snapshots or len(self.store) == 0:
+            print("⚠ Need archived snapshots and a local price store to backtest.")
+            return None
+
+        close = panel.close.ffill()
+        rows = self.rebalance_rows(close.index, snap_dates[0], start, end)
+        if len(rows) == 0:
+            print("⚠ No rebalance dates between the snapshots and the price history.")
+            return None
+
+        frame, date_pos, col = self.stack(snap_dates, snapshots, close, rows)
+        S = self.score_matrix(frame, date_pos, col, (len(rows), close.shape[1]))
+        W = self.target_weights(S)
+
+        C = close.to_numpy()
+        returns, turnover = self.simulate(C, rows, W)
+        counts = (~np.isnan(S)).sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            W_bench = np.where(~np.isnan(S), 1.0 / counts, 0.0)
+        bench_returns, _ = self.simulate(C, rows, W_bench)
+
+        stats, equity, drawdown = self.summarize(returns)
+        bench, _, _ = self.summarize(bench_returns)
+        years = max(len(returns) - 1, 1) / TRADING_DAYS
+        stats.update({
+            'rebalances': len(rows),
+            'avg_turnover': turnover[1:].mean() if len(rows) > 1 else 0.0,   # Excludes the initial buy
+            'annual_turnover': turnover[1:].sum() / years,
+            'benchmark_return': bench['total_return'],
+            'benchmark_cagr': bench['cagr'],
+            'benchmark_max_drawdown': bench['max_drawdown'],
+        })
+
+        index = close.index[rows[0]:]
+        tickers = close.columns.to_numpy()
+        held = W > 0
+        rebalances = pd.DataFrame({
+            'holdings': held.sum(axis=1),
+            'turnover': turnover,
+            'picks': [",".join(tickers[row]) for row in held],
+        }, index=close.index[rows])
+        return {
+            'stats': stats,
+            'equity': pd.Series(equity, index=index),
+            'drawdown': pd.Series(drawdown, index=index),
+            'rebalances': rebalances,
+        }
+
+    @staticmethod
+    def report(result):
+        s = result['stats']
+        eq = result['equity']
+        print(f"\n📈 {eq.index[0]:%Y-%m-%d} -> {eq.index[-1]:%Y-%m-%d}, {s['rebalances']} rebalances")
+        print(f"   Total Return:   {s['total_return']:.1%} (benchmark {s['benchmark_return']:.1%})")
+        print(f"   CAGR:           {s['cagr']:.1%} (benchmark {s['benchmark_cagr']:.1%})")
+        print(f"   Volatility:     {s['volatility']:.1%} | Sharpe: {s['sharpe']:.2f}")
+        print(f"   Max Drawdown:   {s['max_drawdown']:.1%} (benchmark {s['benchmark_max_drawdown']:.1%})")
+        print(f"   Turnover:       {s['avg_turnover']:.1%} per rebalance, {s['annual_turnover']:.0%} a year")
+
+
+if __name__ == "__main__":
+    result = Backtester().run()
+    if result is not None:
+        Backtester.report(result)
@@ -0,0 +1,165 @@
+import itertools
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+from config.settings import (BROKER, MOCK_BROKER_LATENCY, MOCK_BROKER_FAILURE_RATE, MOCK_BROKER_LOST_ACK_RATE)
+
+class Broker:
+    """
+    The single gateway to order placement. ExecutionEngine talks to one of
+    these instead of alpaca_trade_api directly, so orders can be sent to a
+    local mock for tests and benchmarks.
+    """
+    def get_account(self):
+        raise NotImplementedError
+
+    def submit_order(self, symbol, qty, side, type, time_in_force, client_order_id):
+        """
+        Places one order. The broker rejects a client_order_id it has
+        already seen, so re-sending the same order never fills twice.
+        """
+        raise NotImplementedError
+
+    def get_order_by_client_id(self, client_order_id):
+        """
+        The order placed under this client_order_id, or None if the broker
+        never received it.
+        """
+        raise NotImplementedError
+
+    def is_retryable(self, error):
+        """
+        True if the request may succeed when sent again (network error,
+        rate limit, server error); False for a rejection (bad symbol,
+        no buying power).
+        """
+        return True
+
+
+class AlpacaBroker(Broker):
+    def __init__(self):
+        # Imported here so the mock broker works on machines without alpaca-trade-api
+        import alpaca_trade_api as tradeapi
+        from dotenv import load_dotenv
+        load_dotenv()
+        self.api = tradeapi.REST(
+            os.getenv("ALPACA_API_KEY"),
+            os.getenv("ALPACA_SECRET_KEY"),
+            os.getenv("ALPACA_ENDPOINT"),
+            api_version='v2'
+        )
+
+    def get_account(self):
+        return self.api.get_account()
+
+    def submit_order(self, symbol, qty, side, type, time_in_force, client_order_id):
+        return self.api.submit_order(symbol=symbol, qty=qty, side=side, type=type,
+                                     time_in_force=time_in_force, client_order_id=client_order_id)
+
+    def get_order_by_client_id(self, client_order_id):
+        try:
+            return self.api.get_order_by_client_order_id(client_order_id)
+        except Exception as e:
+            if getattr(e, 'status_code', None) == 404:
+                return None
+            raise
+
+    def is_retryable(self, error):
+        status = getattr(error, 'status_code', None)
+        return status is None or status == 429 or status >= 500
+
+
+class MockBrokerError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class MockBroker(Broker):
+    def __init__(self, latency=MOCK_BROKER_LATENCY, jitter=0.0, failure_rate=MOCK_BROKER_FAILURE_RATE,
+                 lost_ack_rate=MOCK_BROKER_LOST_ACK_RATE, reject=(), buying_power=1e9, seed=None):
+        """
+        In-process broker for tests and throughput runs. Every call sleeps
+        latency +/- jitter seconds (outside the lock, so concurrent callers
+        overlap like they would against a real API). Failure injection:
+          failure_rate  - the request is lost before it arrives (retryable)
+          lost_ack_rate - the order is placed but the reply is lost, so the
+                          caller sees an error for an order that exists
+          reject        - symbols always refused (not retryable)
+        Orders are kept by client_order_id; a repeated id is refused.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.lost_ack_rate = lost_ack_rate
+        self.reject = set(reject)
+        self.buying_power = buying_power
+        self.rng = random.Random(seed)
+        self.orders = {}              # client_order_id -> order
+        self.calls = 0                # submit_order requests received, including failed ones
+        self._ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _wait(self):
+        with self.lock:
+            delay = self.latency + self.rng.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def _roll(self, rate):
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < rate
+
+    def get_account(self):
+        self._wait()
+        return SimpleNamespace(buying_power=self.buying_power, status='ACTIVE')
+
+    def submit_order(self, symbol, qty, side, type, time_in_force, client_order_id):
+        self._wait()
+        with self.lock:
+            self.calls += 1
+        if self._roll(self.failure_rate):
+            raise MockBrokerError(f"connection reset while sending {client_order_id}")
+        if symbol in self.reject:
+            raise MockBrokerError(f"asset {symbol} is not tradable", retryable=False)
+
+        with self.lock:
+            if client_order_id in self.orders:
+                raise MockBrokerError(f"client_order_id must be unique: {client_order_id}", retryable=False)
+            order = SimpleNamespace(id=f"mock-{next(self._ids)}", client_order_id=client_order_id, symbol=symbol,
+                                    qty=qty, side=side, type=type, time_in_force=time_in_force,
+                                    status='accepted', submitted_at=time.time())
+            self.orders[client_order_id] = order
+
+        if self._roll(self.lost_ack_rate):
+            raise MockBrokerError(f"timed out waiting for a reply to {client_order_id}")
+        return order
+
+    def get_order_by_client_id(self, client_order_id):
+        self._wait()
+        with self.lock:
+            return self.orders.get(client_order_id)
+
+    def is_retryable(self, error):
+        return getattr(error, 'retryable', True)
+
+
+_default_broker = None
+
+def get_broker():
+    """
+    Returns the process-wide broker selected by BROKER.
+    """
+    global _default_broker
+    if _default_broker is None:
+        if BROKER == 'mock':
+            _default_broker = MockBroker()
+        elif BROKER == 'alpaca':
+            _default_broker = AlpacaBroker()
+        else:
+            raise ValueError(f"Unknown BROKER '{BROKER}' (use 'alpaca' or 'mock')")
+    return _default_broker
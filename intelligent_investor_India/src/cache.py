@@ -0,0 +1,415 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+import pandas as pd
+from config.settings import (CACHE_DB, FIELD_TTL_HOURS, DEFAULT_TTL_HOURS,
+                             STATEMENT_FILING_LAG_DAYS, STATEMENT_RECHECK_HOURS)
+
+class SQLiteCache:
+    CHUNK = 500   # Keys per IN (...) query: stay under SQLite's bound-parameter limit
+
+    def __init__(self, path=CACHE_DB):
+        """
+        Shared plumbing for the caches below, which all live in one SQLite file.
+        """
+        self.path = str(path)
+
+    @contextmanager
+    def _connect(self):
+        """
+        One transaction on a fresh connection: committed on success, rolled
+        back on error, and always closed.
+        """
+        # Several processes (Streamlit, weekly job) may share the file
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _select_in(self, conn, sql, keys, before=(), after=()):
+        """
+        Runs `sql` (with a {marks} placeholder for the IN list) over `keys`
+        in chunks and returns all rows. before/after: parameters around the list.
+        """
+        keys = list(keys)
+        rows = []
+        for i in range(0, len(keys), self.CHUNK):
+            chunk = keys[i:i + self.CHUNK]
+            rows += conn.execute(sql.format(marks=",".join("?" * len(chunk))),
+                                 list(before) + chunk + list(after)).fetchall()
+        return rows
+
+
+class FundamentalCache(SQLiteCache):
+    def __init__(self, path=CACHE_DB, ttl_hours=None):
+        """
+        SQLite cache of FundamentalLoader records, one row per (ticker, field).
+        Every field carries its own timestamp so it can expire on its own TTL.
+        """
+        super().__init__(path)
+        self.ttl_hours = ttl_hours if ttl_hours is not None else FIELD_TTL_HOURS
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fundamentals (
+                    ticker     TEXT NOT NULL,
+                    field      TEXT NOT NULL,
+                    value      TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (ticker, field)
+                )
+            """)
+
+    def ttl_seconds(self, field):
+        return self.ttl_hours.get(field, DEFAULT_TTL_HOURS) * 3600
+
+    def load(self, tickers):
+        """
+        Returns {ticker: {field: (value, fetched_at)}} for every cached ticker.
+        """
+        tickers = list(tickers)
+        records = {}
+        if not tickers:
+            return records
+
+        with self._connect() as conn:
+            rows = self._select_in(
+                conn, "SELECT ticker, field, value, fetched_at FROM fundamentals "
+                      "WHERE ticker IN ({marks}) ORDER BY rowid", tickers)
+        # rowid order == the field order the record was stored in
+        for ticker, field, value, fetched_at in rows:
+            records.setdefault(ticker, {})[field] = (json.loads(value), fetched_at)
+        return records
+
+    def is_fresh(self, fields, now=None, ignore_fields=()):
+        now = now or time.time()
+        if not fields:
+            return False
+        return all(now - fetched_at < self.ttl_seconds(field)
+                   for field, (_, fetched_at) in fields.items()
+                   if field not in ignore_fields)
+
+    def split_fresh(self, tickers, now=None, ignore_fields=()):
+        """
+        Splits tickers into (fresh_records, stale_tickers).
+        A ticker is fresh only if ALL of its fields (minus ignore_fields)
+        are within their TTL.
+        """
+        now = now or time.time()
+        cached = self.load(tickers)
+        fresh, stale = {}, []
+        for ticker in tickers:
+            fields = cached.get(ticker)
+            if fields and self.is_fresh(fields, now, ignore_fields):
+                fresh[ticker] = self.to_record(ticker, fields)
+            else:
+                stale.append(ticker)
+        return fresh, stale
+
+    def to_record(self, ticker, fields):
+        record = {'ticker': ticker}
+        record.update({field: value for field, (value, _) in fields.items()})
+        return record
+
+    def store(self, records, now=None):
+        """
+        Upserts a list of FundamentalLoader records (dicts with a 'ticker' key).
+        """
+        now = now or time.time()
+        rows = [
+            (rec['ticker'], field, json.dumps(value), now)
+            for rec in records
+            for field, value in rec.items() if field != 'ticker'
+        ]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO fundamentals (ticker, field, value, fetched_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+
+class StatementCache(SQLiteCache):
+    COLUMNS = ['ticker', 'period_end', 'line_item', 'position', 'value']
+
+    STATEMENTS = ('financials', 'balance_sheet', 'cashflow')
+
+    def __init__(self, path=CACHE_DB, statement='financials', filing_lag_days=STATEMENT_FILING_LAG_DAYS,
+                 recheck_hours=STATEMENT_RECHECK_HOURS):
+        """
+        SQLite cache of annual financial statements, one row per
+        (ticker, statement, fiscal_year, line_item). Annual numbers only change
+        once a year, so a ticker is refetched only when its next fiscal year
+        should have been published (latest period end + 1 year + filing lag).
+        statement: 'financials' (income), 'balance_sheet' or 'cashflow'.
+        """
+        if statement not in self.STATEMENTS:
+            raise ValueError(f"Unknown statement '{statement}' (use one of {self.STATEMENTS})")
+        super().__init__(path)
+        self.statement = statement
+        self.filing_lag_days = filing_lag_days
+        self.recheck_hours = recheck_hours
+        with self._connect() as conn:
+            # Tables from before the 'statement' column: it's only a cache, rebuild
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(statements)")}
+            if columns and 'statement' not in columns:
+                conn.execute("DROP TABLE statements")
+                conn.execute("DROP TABLE IF EXISTS statement_checks")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS statements (
+                    ticker      TEXT NOT NULL,
+                    statement   TEXT NOT NULL,
+                    fiscal_year INTEGER NOT NULL,
+                    line_item   TEXT NOT NULL,
+                    position    INTEGER NOT NULL,
+                    period_end  TEXT NOT NULL,
+                    value       REAL,
+                    PRIMARY KEY (ticker, statement, fiscal_year, line_item)
+                )
+            """)
+            # One row per fetch attempt that succeeded (even if it returned nothing)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS statement_checks (
+                    ticker        TEXT NOT NULL,
+                    statement     TEXT NOT NULL,
+                    latest_period TEXT,
+                    checked_at    REAL NOT NULL,
+                    PRIMARY KEY (ticker, statement)
+                )
+            """)
+
+    def split_due(self, tickers, now=None):
+        """
+        Splits tickers into (cached, due). Due = never fetched, or a newer
+        fiscal year is overdue and we haven't looked for it recently.
+        """
+        now = now or time.time()
+        with self._connect() as conn:
+            rows = self._select_in(
+                conn, "SELECT ticker, latest_period, checked_at FROM statement_checks "
+                      "WHERE statement = ? AND ticker IN ({marks})", tickers, before=[self.statement])
+        checks = {ticker: (latest, checked_at) for ticker, latest, checked_at in rows}
+
+        recheck = self.recheck_hours * 3600
+        cached, due = [], []
+        for ticker in tickers:
+            if ticker not in checks:
+                due.append(ticker)
+                continue
+            latest, checked_at = checks[ticker]
+            if latest is None:
+                expected = 0   # Nothing published last time: look again after recheck_hours
+            else:
+                expected = (pd.Timestamp(latest) + pd.Timedelta(days=365 + self.filing_lag_days)).timestamp()
+            if now >= expected and now - checked_at >= recheck:
+                due.append(ticker)
+            else:
+                cached.append(ticker)
+        return cached, due
+
+    def load(self, tickers):
+        """
+        Long frame (ticker, period_end, line_item, position, value) for every
+        cached ticker. `position` is the row order of the original statement.
+        """
+        with self._connect() as conn:
+            rows = self._select_in(
+                conn, "SELECT ticker, period_end, line_item, position, value FROM statements "
+                      "WHERE statement = ? AND ticker IN ({marks})", tickers, before=[self.statement])
+        return self.to_frame(rows)
+
+    @classmethod
+    def to_frame(cls, rows):
+        df = pd.DataFrame(rows, columns=cls.COLUMNS)
+        df['period_end'] = pd.to_datetime(df['period_end'])
+        df['value'] = pd.to_numeric(df['value'], errors='coerce')
+        return df
+
+    @staticmethod
+    def to_rows(ticker, fin):
+        """
+        Flattens a yfinance statement (line items x period ends) into rows.
+        """
+        if fin is None or fin.empty:
+            return []
+        values = fin.apply(pd.to_numeric, errors='coerce')
+        rows = []
+        for position, (line_item, series) in enumerate(values.iterrows()):
+            for period_end, value in series.items():
+                rows.append((ticker, pd.Timestamp(period_end).strftime('%Y-%m-%d'), str(line_item), position,
+                             None if pd.isna(value) else float(value)))
+        return rows
+
+    def store(self, statements, now=None):
+        """
+        statements: {ticker: rows from to_rows()}. Replaces each ticker's
+        statements (restated numbers win) and records the newest period.
+        """
+        now = now or time.time()
+        if not statements:
+            return
+        with self._connect() as conn:
+            for ticker, rows in statements.items():
+                conn.execute("DELETE FROM statements WHERE ticker = ? AND statement = ?", (ticker, self.statement))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO statements "
+                    "(ticker, statement, fiscal_year, line_item, position, period_end, value) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(t, self.statement, int(period[:4]), item, pos, period, value)
+                     for t, period, item, pos, value in rows]
+                )
+                latest = max((r[1] for r in rows), default=None)
+                conn.execute(
+                    "INSERT OR REPLACE INTO statement_checks (ticker, statement, latest_period, checked_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (ticker, self.statement, latest, now)
+                )
+
+
+class NewsCache(SQLiteCache):
+    def __init__(self, path=CACHE_DB):
+        """
+        Local news store for SentimentEngine:
+        - news_items: append-only, one row per (ticker, article id), indexed
+          by publish time so a time window is one range scan; an article id
+          already stored is never ingested again;
+        - news_sync: newest publish time stored + last fetch per ticker, so
+          we don't re-ask the API too often;
+        - headline_sentiment: polarity per headline content hash, so a
+          headline is scored once no matter how often it is seen.
+        """
+        super().__init__(path)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS news_items (
+                    ticker       TEXT NOT NULL,
+                    id           TEXT NOT NULL,
+                    published_at REAL NOT NULL,
+                    title        TEXT NOT NULL,
+                    publisher    TEXT,
+                    link         TEXT,
+                    PRIMARY KEY (ticker, id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS news_items_time ON news_items (ticker, published_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS news_sync (
+                    ticker         TEXT PRIMARY KEY,
+                    last_published REAL,
+                    synced_at      REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS headline_sentiment (
+                    hash      TEXT NOT NULL,
+                    scorer    TEXT NOT NULL,
+                    polarity  REAL NOT NULL,
+                    scored_at REAL NOT NULL,
+                    PRIMARY KEY (hash, scorer)
+                )
+            """)
+
+    def sync_state(self, tickers):
+        """
+        {ticker: (last_published, synced_at)} for tickers fetched before.
+        """
+        with self._connect() as conn:
+            rows = self._select_in(
+                conn, "SELECT ticker, last_published, synced_at FROM news_sync WHERE ticker IN ({marks})", tickers)
+        return {ticker: (last_published, synced_at) for ticker, last_published, synced_at in rows}
+
+    def append(self, items, now=None):
+        """
+        items: {ticker: [(id, published_at, title, publisher, link), ...]}
+        as fetched. Ids already stored for the ticker are skipped (existing
+        rows are never rewritten). Returns the number of new items.
+        """
+        now = now or time.time()
+        if not items:
+            return 0
+        with self._connect() as conn:
+            added = conn.executemany(
+                "INSERT OR IGNORE INTO news_items (ticker, id, published_at, title, publisher, link) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(ticker,) + tuple(row) for ticker, rows in items.items() for row in rows]
+            ).rowcount
+            # High-water mark = newest publish time ever stored for the ticker
+            conn.executemany(
+                "INSERT OR REPLACE INTO news_sync (ticker, last_published, synced_at) "
+                "VALUES (?, (SELECT MAX(published_at) FROM news_items WHERE ticker = ?), ?)",
+                [(ticker, ticker, now) for ticker in items]
+            )
+        return added
+
+    def load_window(self, tickers, since):
+        """
+        Every stored item for `tickers` published at or after `since` (epoch).
+        """
+        with self._connect() as conn:
+            rows = self._select_in(
+                conn, "SELECT ticker, id, published_at, title FROM news_items "
+                      "WHERE ticker IN ({marks}) AND published_at >= ? ORDER BY published_at DESC",
+                tickers, after=[since])
+        return pd.DataFrame(rows, columns=['ticker', 'id', 'published_at', 'title'])
+
+    def load_polarity(self, hashes, scorer):
+        with self._connect() as conn:
+            return dict(self._select_in(
+                conn, "SELECT hash, polarity FROM headline_sentiment WHERE scorer = ? AND hash IN ({marks})",
+                hashes, before=[scorer]))
+
+    def store_polarity(self, polarity, scorer, now=None):
+        """
+        polarity: {headline hash: score}
+        """
+        now = now or time.time()
+        if not polarity:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO headline_sentiment (hash, scorer, polarity, scored_at) VALUES (?, ?, ?, ?)",
+                [(h, scorer, float(p), now) for h, p in polarity.items()]
+            )
+
+
+class QuoteCache(SQLiteCache):
+    def __init__(self, path=CACHE_DB):
+        """
+        Last traded price per symbol with its fetch time (QuoteService's
+        on-disk layer, shared by the app, the CLI and the weekly job).
+        """
+        super().__init__(path)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS quotes (
+                    ticker     TEXT PRIMARY KEY,
+                    price      REAL NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def load(self, tickers):
+        """
+        {ticker: (price, fetched_at)} for tickers quoted before (any age).
+        """
+        with self._connect() as conn:
+            rows = self._select_in(conn, "SELECT ticker, price, fetched_at FROM quotes WHERE ticker IN ({marks})",
+                                   tickers)
+        return {ticker: (price, fetched_at) for ticker, price, fetched_at in rows}
+
+    def store(self, prices, now=None):
+        """
+        prices: {ticker: last price}
+        """
+        now = now or time.time()
+        if not prices:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO quotes (ticker, price, fetched_at) VALUES (?, ?, ?)",
+                [(t, float(p), now) for t, p in prices.items()]
+            )
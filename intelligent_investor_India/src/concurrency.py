@@ -0,0 +1,61 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+def fetch_all(fn, keys, max_workers, timeout):
+    """
+    Calls fn(key) for every key over a thread pool (network-bound work).
+    Returns ({key: result}, {key: error message}); results keep key order.
+
+    Each call gets `timeout` seconds counted from when it actually starts,
+    so calls queued behind a slow one are not blamed for it. The whole
+    batch shares one deadline (timeout x rounds of the pool): hung calls
+    can't stack their waits, and calls that never got a free worker before
+    it are reported instead of waited on.
+    """
+    keys = list(keys)
+    results, errors = {}, {}
+    if not keys:
+        return results, errors
+
+    workers = max(1, max_workers or 1)
+    started = {}
+
+    def timed(key):
+        started[key] = time.monotonic()
+        return fn(key)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(timed, key): key for key in keys}
+        pending = set(futures)
+        budget = timeout * math.ceil(len(keys) / workers)
+        deadline = time.monotonic() + budget
+        while pending:
+            now = time.monotonic()
+            expiries = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+            done, _ = wait(pending, timeout=max(0.0, min(expiries + [deadline]) - now),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    errors[futures[future]] = str(e)
+
+            now = time.monotonic()
+            for future in list(pending):
+                key = futures[future]
+                if key in started and (now - started[key] >= timeout or now >= deadline):
+                    errors[key] = f"timed out after {timeout:g}s"
+                elif now >= deadline:
+                    errors[key] = f"never started: batch deadline of {budget:g}s passed"
+                else:
+                    continue
+                future.cancel()
+                pending.discard(future)
+    finally:
+        # Don't block on requests that hung past their timeout
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return {k: results[k] for k in keys if k in results}, errors
@@ -1,66 +1,123 @@
-import yfinance as yf
 import pandas as pd
+from config.settings import FETCH_WORKERS, FETCH_TIMEOUT, USE_CACHE
+from src.cache import FundamentalCache
+from src.concurrency import fetch_all
+from src.providers import get_provider
 
 class FundamentalLoader:
-    def __init__(self, tickers):
+    def __init__(self, tickers, max_workers=FETCH_WORKERS, timeout=FETCH_TIMEOUT, use_cache=USE_CACHE, provider=None):
         self.tickers = tickers
+        self.provider = provider or get_provider()
+        self.max_workers = max_workers   # 1 = old serial behaviour
+        self.timeout = timeout           # Seconds to wait for a single ticker
+        self.cache = FundamentalCache() if use_cache else None
 
-    def get_key_stats(self):
-        data = []
-        print(f"--- Fetching data for {len(self.tickers)} stocks... ---")
+    def fetch_stock_data(self, ticker):
+        """
+        Fetches and flattens the yfinance 'info' snapshot for ONE ticker.
+        Raises on network/API errors so the caller can log them.
+        """
+        info = self.provider.get_info(ticker)
 
-        for ticker in self.tickers:
+        # --- HELPER: Manual PEG Calculation ---
+        trailing_pe = info.get('trailingPE')
+        forward_pe = info.get('forwardPE')
+        peg_ratio = info.get('pegRatio')
+
+        if (peg_ratio is None) and (trailing_pe and forward_pe):
             try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
-                
-                # --- HELPER: Manual PEG Calculation ---
-                trailing_pe = info.get('trailingPE')
-                forward_pe = info.get('forwardPE')
-                peg_ratio = info.get('pegRatio')
-
-                if (peg_ratio is None) and (trailing_pe and forward_pe):
-                    try:
-                        if forward_pe < trailing_pe:
-                            growth_rate = (trailing_pe / forward_pe) - 1
-                            if growth_rate > 0.05: 
-                                peg_ratio = trailing_pe / (growth_rate * 100)
-                    except:
-                        pass
-
-                stock_data = {
-                    'ticker': ticker,
-                    'sector': info.get('sector', 'Unknown'),
-                    'price': info.get('currentPrice'),
-                    'market_cap': info.get('marketCap'),
-                    
-                    # --- TECHNICALS (CRITICAL PART) ---
-                    '200_dma': info.get('twoHundredDayAverage'),
-                    '50_dma': info.get('fiftyDayAverage'),
-                    
-                    'trailing_pe': trailing_pe,
-                    'forward_pe': forward_pe,
-                    'peg_ratio': peg_ratio,
-                    'price_to_book': info.get('priceToBook'),
-                    'roe': info.get('returnOnEquity'),
-                    'profit_margin': info.get('profitMargins'),
-                    'debt_to_equity': info.get('debtToEquity'),
-                    'current_ratio': info.get('currentRatio'),
-                    'dividend_yield': info.get('dividendYield'),
-                    'target_mean_price': info.get('targetMeanPrice')
-                }
-                
-                data.append(stock_data)
-                print(f"✔ Processed {ticker}")                
+                if forward_pe < trailing_pe:
+                    growth_rate = (trailing_pe / forward_pe) - 1
+                    if growth_rate > 0.05:
+                        peg_ratio = trailing_pe / (growth_rate * 100)
+            except:
+                pass
+
+        return {
+            'ticker': ticker,
+            'sector': info.get('sector', 'Unknown'),
+            'price': info.get('currentPrice'),
+            'market_cap': info.get('marketCap'),
+
+            # --- TECHNICALS (CRITICAL PART) ---
+            '200_dma': info.get('twoHundredDayAverage'),
+            '50_dma': info.get('fiftyDayAverage'),
+
+            'trailing_pe': trailing_pe,
+            'forward_pe': forward_pe,
+            'peg_ratio': peg_ratio,
+            'price_to_book': info.get('priceToBook'),
+            'roe': info.get('returnOnEquity'),
+            'profit_margin': info.get('profitMargins'),
+            'debt_to_equity': info.get('debtToEquity'),
+            'current_ratio': info.get('currentRatio'),
+            'dividend_yield': info.get('dividendYield'),
+            'target_mean_price': info.get('targetMeanPrice')
+        }
+
+    def _fetch_serial(self, tickers):
+        data = []
+        for ticker in tickers:
+            try:
+                data.append(self.fetch_stock_data(ticker))
+                print(f"✔ Processed {ticker}")
             except Exception as e:
                 print(f"❌ Error fetching {ticker}: {e}")
+        return data
+
+    def _fetch_concurrent(self, tickers):
+        """
+        Fans the requests out over a thread pool (the work is network-bound).
+        Results are collected in the original ticker order so the output
+        DataFrame is stable from run to run.
+        """
+        fetched, errors = fetch_all(self.fetch_stock_data, tickers, self.max_workers, self.timeout)
+        for ticker in tickers:
+            if ticker in fetched:
+                print(f"✔ Processed {ticker}")
+            elif ticker in errors:
+                print(f"❌ Error fetching {ticker}: {errors[ticker]}")
+        return list(fetched.values())
+
+    def _fetch(self, tickers):
+        if self.max_workers and self.max_workers > 1:
+            return self._fetch_concurrent(tickers)
+        return self._fetch_serial(tickers)
+
+    def get_key_stats(self):
+        print(f"--- Fetching data for {len(self.tickers)} stocks... ---")
+
+        if self.cache is None:
+            data = self._fetch(self.tickers)
+        else:
+            # --- CACHE: Only hit the network for expired/missing tickers ---
+            fresh, stale = self.cache.split_fresh(self.tickers)
+            print(f"⚡ {len(fresh)} stocks served from cache, {len(stale)} to fetch")
+
+            fetched = self._fetch(stale)
+            self.cache.store(fetched)
+
+            by_ticker = dict(fresh)
+            by_ticker.update({rec['ticker']: rec for rec in fetched})
+
+            # Fetch failed? Fall back to expired cache rather than dropping the stock
+            failed = [t for t in stale if t not in by_ticker]
+            if failed:
+                old = self.cache.load(failed)
+                for ticker in failed:
+                    if ticker in old:
+                        print(f"⚠ Using expired cache for {ticker}")
+                        by_ticker[ticker] = self.cache.to_record(ticker, old[ticker])
+
+            # Keep the universe order stable
+            data = [by_ticker[t] for t in self.tickers if t in by_ticker]
 
         df = pd.DataFrame(data)
-        
+
         # --- DEBUG PRINT: Prove the columns exist ---
         if not df.empty:
             print("\n🔍 DEBUG: Columns found in data:")
-            print(df.columns.tolist()) 
+            print(df.columns.tolist())
             df.set_index('ticker', inplace=True)
-            
-        return df
\ No newline at end of file
+
+        return df
@@ -1,33 +1,231 @@
-import os
+import hashlib
+import time
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import alpaca_trade_api as tradeapi
-from dotenv import load_dotenv
-
-# Load secrets
-load_dotenv()
+from config.settings import (ORDER_MAX_IN_FLIGHT, ORDER_RETRIES, ORDER_RETRY_BACKOFF, BROKER_RATE_PER_SEC,
+                             BROKER_RATE_BURST, ORDER_JOURNAL, ORDER_RESUME_MAX_AGE_HOURS)
+from src.broker import get_broker
+from src.journal import OrderJournal
+from src.rate_limit import get_rate_limiter
 
 class ExecutionEngine:
-    def __init__(self):
+    def __init__(self, broker=None, max_in_flight=ORDER_MAX_IN_FLIGHT, retries=ORDER_RETRIES,
+                 backoff=ORDER_RETRY_BACKOFF, limiter=None, journal=None, use_journal=ORDER_JOURNAL):
         """
-        Initializes connection to Alpaca Paper Trading.
+        Sends the buy list to the broker (Alpaca paper trading by default,
+        see BROKER). Up to `max_in_flight` orders are in flight at once.
+        Every order carries a deterministic client_order_id, so a retry or
+        a second run of the same file can never place it twice.
+        With the order journal on, every step is logged before it happens,
+        so a run that dies halfway can be resumed (see resume()).
         """
-        self.api = tradeapi.REST(
-            os.getenv("ALPACA_API_KEY"),
-            os.getenv("ALPACA_SECRET_KEY"),
-            os.getenv("ALPACA_ENDPOINT"),
-            api_version='v2'
-        )
-        
+        self.broker = broker or get_broker()
+        self.max_in_flight = max(1, max_in_flight)
+        self.retries = retries
+        self.backoff = backoff
+        # Shared across engines/threads: the API sees one request rate, not one per caller
+        self.limiter = limiter or get_rate_limiter('broker', BROKER_RATE_PER_SEC, BROKER_RATE_BURST)
+        self.journal = journal or (OrderJournal() if use_journal else None)
+
         # Check connection
         try:
-            account = self.api.get_account()
-            print(f"✅ Connected to Alpaca! Buying Power: ${account.buying_power}")
+            account = self.broker.get_account()
+            print(f"✅ Connected to broker! Buying Power: ${account.buying_power}")
         except Exception as e:
             print(f"❌ Connection Failed: {e}")
 
-    def execute_orders(self, csv_path):
+    @staticmethod
+    def client_order_id(batch_id, ticker, qty, side='buy'):
+        """
+        Same batch + order -> same id. Alpaca refuses an id it has already
+        seen, which is what makes re-sending an order safe.
+        """
+        digest = hashlib.sha1(f"{batch_id}|{ticker}|{side}|{qty}".encode()).hexdigest()[:20]
+        return f"ii-{batch_id}-{digest}"
+
+    @staticmethod
+    def default_batch():
+        return f"{date.today():%Y%m%d}"
+
+    # --- SUBMISSION ---
+    COLUMNS = ['ticker', 'qty', 'side', 'client_order_id', 'status', 'order_id', 'attempts', 'error']
+
+    def _request(self, call, *args, **kwargs):
+        self.limiter.acquire()
+        return call(*args, **kwargs)
+
+    def _log(self, event, client_order_id, **fields):
+        if self.journal is not None:
+            self.journal.append(event, client_order_id, **fields)
+
+    def _lookup(self, client_order_id):
+        try:
+            return self._request(self.broker.get_order_by_client_id, client_order_id)
+        except Exception:
+            return None
+
+    def submit_one(self, ticker, qty, client_order_id, side='buy', check_first=False):
         """
-        Reads the CSV report and places orders.
+        Places one market order, retrying transient failures with
+        exponential backoff. After any failure the broker is asked whether
+        the order arrived anyway (timeout, lost reply, earlier run) before
+        it is sent again. check_first asks before the first attempt too
+        (the journal says a request may have gone out before a crash).
+        Returns the order's result row.
+        """
+        result = {'ticker': ticker, 'qty': qty, 'side': side, 'client_order_id': client_order_id,
+                  'status': 'failed', 'order_id': None, 'attempts': 0, 'error': None}
+        existing = self._lookup(client_order_id) if check_first else None
+        if existing is not None:
+            self._log('ack', client_order_id, order_id=existing.id, error=None)
+            result.update(status='existing', order_id=existing.id)
+            return result
+
+        for attempt in range(self.retries + 1):
+            result['attempts'] = attempt + 1
+            self._log('submitted', client_order_id, attempt=attempt + 1)
+            try:
+                order = self._request(self.broker.submit_order, symbol=ticker, qty=qty, side=side, type='market',
+                                      time_in_force='day', client_order_id=client_order_id)
+                self._log('ack', client_order_id, order_id=order.id, error=None)
+                result.update(status='submitted', order_id=order.id, error=None)
+                return result
+            except Exception as e:
+                result['error'] = str(e)
+                error = e
+
+            existing = self._lookup(client_order_id)
+            if existing is not None:
+                self._log('ack', client_order_id, order_id=existing.id, error=None)
+                result.update(status='existing', order_id=existing.id, error=None)
+                return result
+
+            if attempt == self.retries or not self.broker.is_retryable(error):
+                break
+            time.sleep(self.backoff * 2 ** attempt)
+
+        # 'failed' is retried by resume(); a rejection would only be refused again
+        self._log('failed' if self.broker.is_retryable(error) else 'rejected', client_order_id, error=str(error))
+        return result
+
+    def _run(self, jobs, side):
+        """
+        Submits (ticker, qty, client_order_id, check_first) jobs on the
+        thread pool; results in job order.
+        """
+        if not jobs:
+            return []
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(jobs))) as pool:
+                return list(pool.map(lambda job: self.submit_one(*job[:3], side=side, check_first=job[3]), jobs))
+        finally:
+            if self.journal is not None:
+                self.journal.sync()
+
+    def submit_orders(self, orders_df, batch_id=None, side='buy'):
+        """
+        Submits every row of a buy list (ticker, shares) concurrently and
+        returns one result row per order, in input order (a ticker listed
+        twice is one order for the combined shares):
+          submitted - placed now
+          existing  - already at the broker (lost reply, or an earlier run)
+          failed    - not placed; see 'error'
+        batch_id defaults to today's date: running the same file twice in a
+        day does not double the orders. With the journal, orders it already
+        has an ack (or a rejection) for are answered without a request, and
+        ones that were in flight when a run died are checked first.
+        """
+        batch_id = batch_id or self.default_batch()
+        orders = orders_df.assign(shares=pd.to_numeric(orders_df['shares'], errors='coerce').fillna(0).astype(int))
+        orders = orders[orders['shares'] > 0]
+        if orders.empty:
+            return pd.DataFrame(columns=self.COLUMNS)
+
+        # Identical rows would share a client_order_id, and the broker would drop one of them
+        orders = orders.assign(ticker=orders['ticker'].astype(str))
+        repeated = orders['ticker'][orders['ticker'].duplicated()].unique()
+        if len(repeated):
+            print(f"⚠ Listed more than once, shares combined into one {side} order: {', '.join(repeated)}")
+            orders = orders.groupby('ticker', sort=False, as_index=False)['shares'].sum()
+
+        results, jobs, slots = [], [], []
+        for ticker, qty in zip(orders['ticker'], orders['shares']):
+            ticker, qty = str(ticker), int(qty)
+            cid = self.client_order_id(batch_id, ticker, qty, side)
+            record = self.journal.get(cid) if self.journal is not None else None
+            if record is not None and record['event'] in OrderJournal.DONE:
+                done = record['event'] == 'ack'
+                results.append({'ticker': ticker, 'qty': qty, 'side': side, 'client_order_id': cid,
+                                'status': 'existing' if done else 'failed', 'order_id': record.get('order_id'),
+                                'attempts': 0, 'error': record.get('error')})
+                continue
+            if record is None:
+                self._log('intent', cid, batch=batch_id, ticker=ticker, qty=qty, side=side)
+            slots.append(len(results))
+            results.append(None)
+            jobs.append((ticker, qty, cid, record is not None))
+
+        # Write-ahead: every intent is on disk before the first order goes out
+        if self.journal is not None:
+            self.journal.sync()
+        for slot, result in zip(slots, self._run(jobs, side)):
+            results[slot] = result
+        return pd.DataFrame(results, columns=self.COLUMNS)
+
+    def resume(self, batch_id=None, max_age_hours=ORDER_RESUME_MAX_AGE_HOURS):
+        """
+        After a crash: the batch's journaled orders without an ack or
+        rejection (today's batch unless batch_id is given) are looked up at
+        the broker by client_order_id and only sent if it doesn't have them.
+        Unfinished orders older than max_age_hours, in any batch, are marked
+        expired instead: they were day orders, and sending one now would buy
+        at a price nobody chose.
+        """
+        if self.journal is None:
+            print("⚠ Order journal is off (ORDER_JOURNAL=0); nothing to resume.")
+            return pd.DataFrame(columns=self.COLUMNS)
+        batch_id = batch_id or self.default_batch()
+
+        cutoff = time.time() - max_age_hours * 3600
+        stale = [r for r in self.journal.unfinished() if r['created'] < cutoff]
+        for record in stale:
+            self._log('expired', record['cid'], error=f"unfinished for over {max_age_hours:g}h; not resumed")
+        if stale:
+            batches = sorted({str(r.get('batch')) for r in stale})
+            print(f"⚠ Expired {len(stale)} stale unfinished order(s) from batch(es) {', '.join(batches)}")
+
+        pending = self.journal.unfinished(batch_id)
+        others = len(self.journal.unfinished()) - len(pending)
+        if others:
+            print(f"ℹ {others} unfinished order(s) in other batches left alone (pass batch_id to resume them)")
+        print(f"\n--- ♻️ Resuming {len(pending)} unfinished order(s) of batch {batch_id} ---")
+        start = time.perf_counter()
+        by_side = {}
+        for record in pending:
+            by_side.setdefault(record.get('side', 'buy'), []).append(
+                (record['ticker'], int(record['qty']), record['cid'], True))
+        results = pd.DataFrame([r for side, jobs in by_side.items() for r in self._run(jobs, side)],
+                               columns=self.COLUMNS)
+        if pending:
+            self.report(results, time.perf_counter() - start)
+        self._compact(batch_id)
+        return results
+
+    def _compact(self, batch_id):
+        # Once a batch has nothing left to resume, old finished batches can leave the log
+        if self.journal is not None and not self.journal.unfinished(batch_id):
+            dropped = self.journal.compact()
+            if dropped:
+                print(f"🧹 Order journal compacted: {dropped} finished order(s) dropped")
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+    def execute_orders(self, csv_path, batch_id=None):
+        """
+        Reads the CSV report, places the orders and returns the per-order results.
         """
         try:
             orders_df = pd.read_csv(csv_path)
@@ -39,36 +237,31 @@ class ExecutionEngine:
             print("⚠ Order file is empty.")
             return
 
-        print(f"\n--- Executing {len(orders_df)} Orders ---")
-
-        for index, row in orders_df.items():
-            # Note: If reading from CSV, iterate differently or ensure correct iteration
-            # Let's fix the iteration for DataFrame
-            pass 
-        
-        # Correct iteration loop
-        for index, row in orders_df.iterrows():
-            ticker = row['ticker']
-            qty = int(row['shares'])
-            
-            if qty <= 0:
-                continue
-                
-            print(f"🚀 Placing Order: Buy {qty} shares of {ticker}...")
-            
-            try:
-                self.api.submit_order(
-                    symbol=ticker,
-                    qty=qty,
-                    side='buy',
-                    type='market',
-                    time_in_force='day'
-                )
-                print(f"   ✔ Order Sent: {ticker}")
-            except Exception as e:
-                print(f"   ❌ Order Failed for {ticker}: {e}")
+        print(f"\n--- Executing {len(orders_df)} Orders (up to {self.max_in_flight} at a time) ---")
+        start = time.perf_counter()
+        batch_id = batch_id or self.default_batch()
+        results = self.submit_orders(orders_df, batch_id)
+        self.report(results, time.perf_counter() - start)
+        self._compact(batch_id)
+        return results
+
+    @staticmethod
+    def report(results, seconds):
+        for row in results.itertuples():
+            if row.status == 'submitted':
+                print(f"   ✔ Order Sent: {row.side.capitalize()} {row.qty} {row.ticker}")
+            elif row.status == 'existing':
+                print(f"   ✔ Already Placed: {row.side.capitalize()} {row.qty} {row.ticker} ({row.client_order_id})")
+            else:
+                print(f"   ❌ Order Failed for {row.ticker} after {row.attempts} attempt(s): {row.error}")
+
+        counts = results['status'].value_counts()
+        print(f"🚀 {counts.get('submitted', 0)} sent, {counts.get('existing', 0)} already placed, "
+              f"{counts.get('failed', 0)} failed in {seconds:.1f}s")
 
 if __name__ == "__main__":
     # Test the execution independently
     exe = ExecutionEngine()
-    # exe.execute_orders("reports/final_buy_orders.csv") # Uncomment to test for real
\ No newline at end of file
+    exe.resume()  # Finish what an earlier run of today's batch left half done
+    # exe.execute_orders("reports/final_buy_orders.csv") # Uncomment to test for real
+    exe.close()
@@ -3,8 +3,9 @@ import os
 from config.settings import DATA_DIR
 
 class FinancialHealth:
-    def __init__(self):
-        self.profile = self.load_profile()
+    def __init__(self, profile=None):
+        # An already-loaded profile skips the file (and its console output)
+        self.profile = profile if profile is not None else self.load_profile()
 
     def load_profile(self):
         path = DATA_DIR / "user_profile.json"
@@ -58,7 +59,13 @@ class FinancialHealth:
             })
 
         # 3. Calculate Investable Surplus
-        monthly_surplus = income - expenses
+        monthly_surplus = self.monthly_surplus()
         print(f"✔ Monthly Surplus: ₹{monthly_surplus:,.0f} (Income - Expenses)")
         
-        return status, monthly_surplus, alerts
\ No newline at end of file
+        return status, monthly_surplus, alerts
+
+    def monthly_surplus(self):
+        """
+        Investable surplus (Income - Expenses), without the printed report.
+        """
+        return self.profile.get('monthly_income', 0) - self.profile.get('monthly_expenses', 0)
\ No newline at end of file
@@ -1,9 +1,23 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
+from config.settings import FETCH_WORKERS, FETCH_TIMEOUT, USE_CACHE
+from src.cache import StatementCache
+from src.concurrency import fetch_all
+from src.providers import get_provider
 
 class HistoryEngine:
-    def __init__(self):
-        pass
+    def __init__(self, provider=None, use_cache=USE_CACHE, max_workers=FETCH_WORKERS, timeout=FETCH_TIMEOUT):
+        self.provider = provider or get_provider()
+        self.use_cache = use_cache
+        self.caches = {}   # One StatementCache per statement type
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    @staticmethod
+    def normalize(ticker):
+        if not ticker.endswith('.NS') and not ticker.endswith('.BO'):
+            return f"{ticker}.NS"
+        return ticker
 
     def check_stability(self, ticker):
         """
@@ -12,79 +26,141 @@ class HistoryEngine:
         - is_stable (True/False)
         - growth_msg (String explaining why)
         """
-        try:
-            if not ticker.endswith('.NS') and not ticker.endswith('.BO'):
-                ticker = f"{ticker}.NS"
-
-            stock = yf.Ticker(ticker)
-            fin = stock.financials # Annual Financials
-            
-            if fin.empty:
-                # If no data, we give it the benefit of the doubt but warn user
-                return True, "No historical data available (Neutral)"
-
-            # Get Revenue and Net Income rows
-            try:
-                # yfinance keys can be inconsistent
-                revenue = fin.loc['Total Revenue'] if 'Total Revenue' in fin.index else fin.iloc[0]
-                net_income = fin.loc['Net Income'] if 'Net Income' in fin.index else fin.iloc[-1]
-            except Exception:
-                return True, "Data format mismatch (Skipped)"
-
-            # Reverse to check trend: Oldest -> Newest
-            rev_trend = revenue.iloc[::-1] 
-            inc_trend = net_income.iloc[::-1]
-            
-            years_count = len(rev_trend)
-            if years_count < 3:
-                return True, "Not enough history (Skipped)"
-
-            # CHECK 1: PROFITABILITY (Must be profitable in latest year)
-            latest_income = inc_trend.iloc[-1]
-            if pd.isna(latest_income) or latest_income < 0:
-                 # Check previous year if latest is NaN (sometimes data is delayed)
-                if len(inc_trend) > 1 and inc_trend.iloc[-2] < 0:
-                    return False, f"Loss making in recent years"
-
-            # CHECK 2: REVENUE GROWTH
-            latest_rev = rev_trend.iloc[-1]
-            old_rev = rev_trend.iloc[0]
-            
-            # Fix for NaN% error
-            if pd.isna(old_rev) or old_rev == 0:
-                growth_pct = 0.0
-            else:
-                growth_pct = ((latest_rev - old_rev) / old_rev) * 100
+        row = self.audit([ticker]).iloc[0]
+        return bool(row['is_stable']), row['history_msg']
+
+    # --- STATEMENTS ---
+    def _cache(self, statement):
+        if statement not in self.caches:
+            self.caches[statement] = StatementCache(statement=statement)
+        return self.caches[statement]
+
+    def _fetch_one(self, ticker, statement='financials'):
+        # get_financials (Annual Financials) / get_balance_sheet / get_cashflow
+        fetch = getattr(self.provider, f"get_{statement}")
+        return StatementCache.to_rows(ticker, fetch(ticker))
+
+    def _fetch_statements(self, tickers, statement='financials'):
+        """
+        Downloads statements for cache misses over a thread pool.
+        Returns ({ticker: rows}, {ticker: error message}).
+        """
+        return fetch_all(lambda t: self._fetch_one(t, statement), tickers, self.max_workers, self.timeout)
+
+    def load_statements(self, tickers, statement='financials'):
+        """
+        Long frame of annual statements for every ticker (see StatementCache),
+        plus {ticker: error} for tickers we could not get at all.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not self.use_cache:
+            fetched, errors = self._fetch_statements(tickers, statement)
+            return StatementCache.to_frame([r for rows in fetched.values() for r in rows]), errors
+
+        cache = self._cache(statement)
+        cached, due = cache.split_due(tickers)
+        if due:
+            print(f"⚡ Statements ({statement}): {len(cached)} from cache, {len(due)} to fetch")
+        fetched, errors = self._fetch_statements(due, statement)
+        cache.store(fetched)
+
+        # A failed refetch still has last year's statements to fall back on
+        statements = cache.load(tickers)
+        errors = {t: e for t, e in errors.items() if t not in set(statements['ticker'])}
+        return statements, errors
+
+    # --- STABILITY (all tickers at once) ---
+    @staticmethod
+    def _pick_row(statements, line_item, fallback):
+        """
+        Values of `line_item` per (ticker, age); tickers without it fall back
+        to their first ('min') or last ('max') statement row, like fin.iloc[0/-1].
+        """
+        named = statements[statements['line_item'] == line_item].groupby('ticker')['position'].min()
+        default = statements.groupby('ticker')['position'].agg(fallback)
+        position = named.reindex(default.index).fillna(default)
+        rows = statements[statements['position'] == statements['ticker'].map(position)]
+        return rows.set_index(['ticker', 'age'])['value'].unstack('age')
+
+    @classmethod
+    def stability_table(cls, statements, tickers, errors=None):
+        """
+        The check_stability rules evaluated for every ticker in one pass over
+        a (ticker x fiscal year) table instead of one statement at a time.
+        """
+        errors = errors or {}
+        tickers = list(tickers)
+        statements = statements.copy()
+        # age 0 = latest fiscal year, 1 = the year before, ...
+        statements['age'] = statements.groupby('ticker')['period_end'].rank(method='dense', ascending=False).astype(int) - 1
+        years = statements.groupby('ticker')['period_end'].nunique().reindex(tickers).fillna(0).to_numpy(dtype=int)
+
+        width = max(years.max(initial=0), 2)
+        revenue = cls._pick_row(statements, 'Total Revenue', 'min').reindex(index=tickers, columns=range(width))
+        income = cls._pick_row(statements, 'Net Income', 'max').reindex(index=tickers, columns=range(width))
+        revenue, income = revenue.to_numpy(dtype=np.float64), income.to_numpy(dtype=np.float64)
+
+        rows = np.arange(len(tickers))
+        latest_rev, prev_rev = revenue[:, 0], revenue[:, 1]
+        old_rev = revenue[rows, np.maximum(years - 1, 0)]
+        latest_inc, prev_inc = income[:, 0], income[:, 1]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # CHECK 1: PROFITABILITY (loss in the latest year AND the one before)
+            loss_making = (np.isnan(latest_inc) | (latest_inc < 0)) & (prev_inc < 0)
+            # CHECK 2: REVENUE GROWTH (0 when the oldest year is missing/zero)
+            growth = np.where(np.isnan(old_rev) | (old_rev == 0), 0.0, (latest_rev - old_rev) / old_rev * 100)
+            # CHECK 3: CONSISTENCY (revenue dropped by >20% in the last year)
+            collapsed = (prev_rev > 0) & ((latest_rev - prev_rev) / prev_rev < -0.20)
 
-            # CHECK 3: CONSISTENCY (Did it crash recently?)
-            # If Revenue dropped by >20% in the last year
-            if len(rev_trend) >= 2:
-                prev_rev = rev_trend.iloc[-2]
-                if prev_rev > 0:
-                    rev_change = (latest_rev - prev_rev) / prev_rev
-                    if rev_change < -0.20:
-                        return False, "Revenue collapsed >20% last year"
+        failed = np.array([t in errors for t in tickers], dtype=bool)
+        conditions = [failed, years == 0, years < 3, loss_making, collapsed]
+        stable = np.select(conditions, [True, True, True, False, False], default=True)
 
-            return True, f"Growing: {growth_pct:.1f}% over {years_count} yrs"
+        messages = []
+        for i, ticker in enumerate(tickers):
+            if failed[i]:
+                # Don't fail the whole bot just because history check failed
+                messages.append(f"History check skipped ({errors[ticker]})")
+            elif years[i] == 0:
+                messages.append("No historical data available (Neutral)")
+            elif years[i] < 3:
+                messages.append("Not enough history (Skipped)")
+            elif loss_making[i]:
+                messages.append("Loss making in recent years")
+            elif collapsed[i]:
+                messages.append("Revenue collapsed >20% last year")
+            else:
+                messages.append(f"Growing: {growth[i]:.1f}% over {years[i]} yrs")
+
+        return pd.DataFrame({'is_stable': stable.astype(bool), 'history_msg': messages}, index=tickers)
 
-        except Exception as e:
-            # Don't fail the whole bot just because history check failed
-            return True, f"History check skipped ({e})"
+    def audit(self, tickers):
+        """
+        Stability verdict for any number of tickers (the whole universe is fine:
+        statements come from the local cache and misses are fetched in parallel).
+        Indexed by the tickers as given.
+        """
+        tickers = list(tickers)
+        symbols = [self.normalize(t) for t in tickers]
+        statements, errors = self.load_statements(symbols)
+        table = self.stability_table(statements, list(dict.fromkeys(symbols)), errors)
+        table = table.reindex(symbols)
+        table.index = tickers
+        return table
 
     def filter_stocks(self, df_recommendations):
         print("\n--- 📜 3-YEAR HISTORY CHECK ---")
-        approved_indices = []
-
-        for index, row in df_recommendations.iterrows():
-            ticker = row['ticker']
-            print(f"  > Auditing financials for {ticker}...")
-            
-            is_stable, msg = self.check_stability(ticker)
-            
-            if is_stable:
+        if df_recommendations.empty:
+            return df_recommendations
+
+        print(f"  > Auditing financials for {len(df_recommendations)} stocks...")
+        verdicts = self.audit(df_recommendations['ticker'])
+
+        for ticker, ok, msg in zip(df_recommendations['ticker'], verdicts['is_stable'], verdicts['history_msg']):
+            if ok:
                 print(f"  ✔ Passed {ticker}: {msg}")
-                approved_indices.append(index)
             else:
                 print(f"  ❌ REJECTED {ticker}: {msg}")
-        
-        return df_recommendations.loc[approved_indices]
\ No newline at end of file
+
+        return df_recommendations[verdicts['is_stable'].to_numpy()]
@@ -0,0 +1,170 @@
+import copy
+import os
+import numpy as np
+import pandas as pd
+from config.settings import INDICATOR_STATE_PATH
+from src.indicators import IndicatorEngine, Smoother, true_range
+
+class IndicatorState:
+    EMA_SPANS = (12, 20, 26, 50)
+    DMA_WINDOWS = (50, 200)
+    RSI_PERIOD = 14
+    ATR_PERIOD = 14
+    BB_WINDOW = 20
+
+    def __init__(self, tickers):
+        """
+        Compact per-ticker indicator state that advances one bar at a time in
+        O(1) per ticker, instead of recomputing a 200-day window every day.
+        Uses the same Smoother arithmetic as IndicatorEngine, so the numbers
+        match a full recompute.
+        """
+        self.tickers = list(tickers)
+        n = len(self.tickers)
+        self.last_date = None
+        self.prev_close = np.full(n, np.nan)   # Last valid close (ffilled)
+
+        self.smoothers = {f'ema_{s}': Smoother(n, 2.0 / (s + 1)) for s in self.EMA_SPANS}
+        self.smoothers['macd_signal'] = Smoother(n, 2.0 / (9 + 1))
+        self.smoothers['avg_gain'] = Smoother(n, 1.0 / self.RSI_PERIOD, seed=self.RSI_PERIOD)
+        self.smoothers['avg_loss'] = Smoother(n, 1.0 / self.RSI_PERIOD, seed=self.RSI_PERIOD)
+        self.smoothers['atr'] = Smoother(n, 1.0 / self.ATR_PERIOD, seed=self.ATR_PERIOD)
+
+        # Ring buffer of the last 200 closes + running window sums for the DMAs
+        width = max(self.DMA_WINDOWS)
+        self.window = np.full((width, n), np.nan)
+        self.pos = 0
+        self.sums = {w: np.zeros(n) for w in self.DMA_WINDOWS}
+        self.counts = {w: np.zeros(n) for w in self.DMA_WINDOWS}
+
+    # --- UPDATE ---
+    def update(self, date, high, low, close):
+        """
+        Folds one daily bar (arrays aligned to self.tickers) into the state.
+        """
+        close = np.asarray(close, dtype=np.float64)
+        valid = ~np.isnan(close)
+
+        # Price changes vs the last valid close (NaN on the first bar)
+        delta = np.where(valid, close - self.prev_close, np.nan)
+        gain = np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None))
+        loss = np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None))
+        self.smoothers['avg_gain'].step(gain)
+        self.smoothers['avg_loss'].step(loss)
+
+        tr = true_range(np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64), self.prev_close)
+        self.smoothers['atr'].step(tr)
+
+        for s in self.EMA_SPANS:
+            self.smoothers[f'ema_{s}'].step(close)
+        macd = self.smoothers['ema_12'].state - self.smoothers['ema_26'].state
+        self.smoothers['macd_signal'].step(macd)
+
+        # DMA windows: add the new close, drop the one leaving each window
+        width = self.window.shape[0]
+        x = np.where(valid, close, 0.0)
+        for w in self.DMA_WINDOWS:
+            leaving = self.window[(self.pos - w) % width]
+            self.sums[w] += x - np.nan_to_num(leaving)
+            self.counts[w] += valid.astype(float) - (~np.isnan(leaving)).astype(float)
+        self.window[self.pos] = close
+        self.pos = (self.pos + 1) % width
+
+        self.prev_close = np.where(valid, close, self.prev_close)
+        self.last_date = np.datetime64(date, 'D')
+
+    def resync_sums(self):
+        """
+        Recomputes the running sums from the ring buffer (kills float drift).
+        """
+        width = self.window.shape[0]
+        order = (np.arange(width) + self.pos) % width   # Oldest -> newest
+        ordered = self.window[order]
+        for w in self.DMA_WINDOWS:
+            tail = ordered[-w:]
+            self.sums[w] = np.nansum(tail, axis=0)
+            self.counts[w] = (~np.isnan(tail)).sum(axis=0).astype(float)
+
+    # --- OUTPUT ---
+    def latest(self):
+        """
+        Same columns as IndicatorEngine.latest(), plus the 50/200-DMA.
+        """
+        width = self.window.shape[0]
+        order = (np.arange(width) + self.pos) % width
+        bands = IndicatorEngine.bollinger(self.window[order][-self.BB_WINDOW:], self.BB_WINDOW)
+
+        ema = {s: self.smoothers[f'ema_{s}'].state for s in self.EMA_SPANS}
+        df = IndicatorEngine.to_frame(
+            self.tickers, self.prev_close,
+            rsi=IndicatorEngine.rsi_from_averages(self.smoothers['avg_gain'].state,
+                                                  self.smoothers['avg_loss'].state),
+            ema_20=ema[20],
+            ema_50=ema[50],
+            macd=ema[12] - ema[26],
+            macd_signal=self.smoothers['macd_signal'].state,
+            atr=self.smoothers['atr'].state,
+            bands=bands
+        )
+        for w in self.DMA_WINDOWS:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                df[f'{w}_dma'] = np.where(self.counts[w] >= w, self.sums[w] / self.counts[w], np.nan)
+        return df
+
+    # --- BUILD / SYNC ---
+    def apply_rows(self, panel, after=None):
+        """
+        Feeds every panel row dated after `after` through update().
+        """
+        high = panel.frames['High'].reindex(columns=self.tickers).to_numpy(dtype=np.float64)
+        low = panel.frames['Low'].reindex(columns=self.tickers).to_numpy(dtype=np.float64)
+        close = panel.close.reindex(columns=self.tickers).to_numpy(dtype=np.float64)
+        dates = pd.DatetimeIndex(panel.close.index).values.astype('datetime64[D]')
+        applied = 0
+        for i, day in enumerate(dates):
+            if after is not None and day <= after:
+                continue
+            self.update(day, high[i], low[i], close[i])
+            applied += 1
+        return applied
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    # --- CHECKPOINT ---
+    def save(self, path=INDICATOR_STATE_PATH):
+        self.resync_sums()
+        arrays = {
+            'tickers': np.array(self.tickers),
+            'last_date': np.array([self.last_date if self.last_date is not None else np.datetime64('NaT')],
+                                  dtype='datetime64[D]'),
+            'prev_close': self.prev_close,
+            'window': self.window,
+            'pos': np.array([self.pos]),
+        }
+        for name, sm in self.smoothers.items():
+            arrays[f'{name}__state'] = sm.state
+            arrays[f'{name}__acc'] = sm.acc
+            arrays[f'{name}__count'] = sm.count
+
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=INDICATOR_STATE_PATH):
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            state = cls(data['tickers'].tolist())
+            last = data['last_date'][0]
+            state.last_date = None if np.isnat(last) else last
+            state.prev_close = data['prev_close']
+            state.window = data['window']
+            state.pos = int(data['pos'][0])
+            for name, sm in state.smoothers.items():
+                sm.state = data[f'{name}__state']
+                sm.acc = data[f'{name}__acc']
+                sm.count = data[f'{name}__count']
+        state.resync_sums()
+        return state
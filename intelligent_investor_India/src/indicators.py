@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+class Smoother:
+    def __init__(self, n_tickers, alpha, seed=1):
+        """
+        Exponential smoothing state for every ticker, advanced one bar at a
+        time. Each ticker is seeded with the simple mean of its first `seed`
+        valid values (seed=1 -> classic EMA, seed=n -> Wilder), then
+            s = s + alpha * (x - s)
+        NaN inputs (suspended / not yet listed) carry the previous value.
+        Shared by the full-history engine and the online IndicatorState so
+        both do exactly the same arithmetic.
+        """
+        self.alpha = alpha
+        self.seed = seed
+        self.state = np.full(n_tickers, np.nan)
+        self.acc = np.zeros(n_tickers)
+        self.count = np.zeros(n_tickers)
+
+    def step(self, xt):
+        valid = ~np.isnan(xt)
+        ready = ~np.isnan(self.state)
+
+        # Still collecting the seed window
+        seeding = valid & ~ready
+        if seeding.any():
+            self.acc[seeding] += xt[seeding]
+            self.count[seeding] += 1
+            done = seeding & (self.count >= self.seed)
+            self.state[done] = self.acc[done] / self.count[done]
+
+        step = valid & ready
+        self.state[step] += self.alpha * (xt[step] - self.state[step])
+        return self.state
+
+
+def _smooth(x, alpha, seed=1):
+    """
+    Runs a Smoother down the date axis of a (dates x tickers) array.
+    Returns (series, smoother) so callers can keep the final state.
+    """
+    T, N = x.shape
+    out = np.full((T, N), np.nan)
+    smoother = Smoother(N, alpha, seed)
+    for t in range(T):
+        out[t] = smoother.step(x[t])
+    return out, smoother
+
+
+def true_range(high, low, prev_close):
+    """
+    Works on one bar (1-D) or a whole (dates x tickers) array.
+    """
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))  # fmax ignores a NaN prev_close
+    return np.where(np.isnan(high) | np.isnan(low), np.nan, tr)
+
+
+class IndicatorEngine:
+    def __init__(self, panel):
+        """
+        Panel-level indicators over a PricePanel (dates x tickers matrices).
+        Everything is vectorised across tickers; the only Python loop is the
+        walk down the date axis for the recursive averages.
+        """
+        self.panel = panel
+        self.tickers = list(panel.close.columns)
+        self.close = panel.close.to_numpy(dtype=np.float64)
+        self.high = panel.frames['High'].to_numpy(dtype=np.float64)
+        self.low = panel.frames['Low'].to_numpy(dtype=np.float64)
+
+    # --- BUILDING BLOCKS (full dates x tickers arrays) ---
+    @staticmethod
+    def ema(x, span):
+        return _smooth(x, 2.0 / (span + 1), seed=1)[0]
+
+    @staticmethod
+    def deltas(close):
+        """
+        Close-to-close changes, skipping over NaN gaps.
+        """
+        filled = pd.DataFrame(close).ffill().to_numpy()
+        delta = np.full_like(close, np.nan)
+        delta[1:] = filled[1:] - filled[:-1]
+        delta[np.isnan(close)] = np.nan
+        return delta
+
+    def wilder_rsi(self, period=14):
+        delta = self.deltas(self.close)
+        gain = np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None))
+        loss = np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None))
+
+        avg_gain, _ = _smooth(gain, 1.0 / period, seed=period)
+        avg_loss, _ = _smooth(loss, 1.0 / period, seed=period)
+        return self.rsi_from_averages(avg_gain, avg_loss)
+
+    @staticmethod
+    def rsi_from_averages(avg_gain, avg_loss):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+        rsi = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+        return np.where(np.isnan(avg_gain) | np.isnan(avg_loss), np.nan, rsi)
+
+    def macd(self, fast=12, slow=26, signal=9):
+        line = self.ema(self.close, fast) - self.ema(self.close, slow)
+        sig = self.ema(line, signal)
+        return line, sig, line - sig
+
+    def true_range(self):
+        prev_close = np.full_like(self.close, np.nan)
+        prev_close[1:] = pd.DataFrame(self.close).ffill().to_numpy()[:-1]
+        return true_range(self.high, self.low, prev_close)
+
+    def atr(self, period=14):
+        return _smooth(self.true_range(), 1.0 / period, seed=period)[0]
+
+    def bollinger_latest(self, window=20, num_std=2.0):
+        """
+        Bands only need the last `window` closes, so we never touch the rest.
+        """
+        return self.bollinger(self.close[-window:], window, num_std)
+
+    @staticmethod
+    def bollinger(tail, window=20, num_std=2.0):
+        """
+        tail: the last `window` rows of closes (fewer rows / NaNs -> NaN bands).
+        """
+        count = (~np.isnan(tail)).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mid = np.nansum(tail, axis=0) / count
+            var = np.nansum((tail - mid) ** 2, axis=0) / count
+        std = np.sqrt(var)
+        ok = count >= window
+        mid, std = np.where(ok, mid, np.nan), np.where(ok, std, np.nan)
+        return mid, mid + num_std * std, mid - num_std * std
+
+    # --- OUTPUT ---
+    def latest(self):
+        """
+        One row per ticker with the most recent value of every indicator,
+        ready to merge into the scored DataFrame.
+        """
+        if self.close.shape[0] == 0:
+            return pd.DataFrame(index=self.tickers)
+
+        last_close = pd.DataFrame(self.close).ffill().to_numpy()[-1]
+        macd, macd_signal, _ = self.macd()
+        return self.to_frame(
+            self.tickers, last_close,
+            rsi=self.wilder_rsi()[-1],
+            ema_20=self.ema(self.close, 20)[-1],
+            ema_50=self.ema(self.close, 50)[-1],
+            macd=macd[-1],
+            macd_signal=macd_signal[-1],
+            atr=self.atr()[-1],
+            bands=self.bollinger_latest()
+        )
+
+    @staticmethod
+    def to_frame(tickers, last_close, rsi, ema_20, ema_50, macd, macd_signal, atr, bands):
+        """
+        Shared output layout (also used by the online IndicatorState).
+        """
+        bb_mid, bb_upper, bb_lower = bands
+        with np.errstate(invalid='ignore', divide='ignore'):
+            atr_pct = atr / last_close * 100
+            bb_pct_b = (last_close - bb_lower) / (bb_upper - bb_lower)
+
+        return pd.DataFrame({
+            'rsi_14': rsi,
+            'ema_20': ema_20,
+            'ema_50': ema_50,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_hist': macd - macd_signal,
+            'atr_14': atr,
+            'atr_pct': atr_pct,
+            'bb_mid': bb_mid,
+            'bb_upper': bb_upper,
+            'bb_lower': bb_lower,
+            'bb_pct_b': bb_pct_b,
+        }, index=tickers)
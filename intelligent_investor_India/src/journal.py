@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+from config.settings import (ORDER_JOURNAL_PATH, ORDER_JOURNAL_SYNC_RECORDS, ORDER_JOURNAL_SYNC_SECONDS,
+                             ORDER_JOURNAL_KEEP_HOURS)
+
+class OrderJournal:
+    DONE = {'ack', 'rejected', 'expired'}   # Final events; anything else is resumed after a crash
+
+    def __init__(self, path=ORDER_JOURNAL_PATH, sync_records=ORDER_JOURNAL_SYNC_RECORDS,
+                 sync_seconds=ORDER_JOURNAL_SYNC_SECONDS):
+        """
+        Write-ahead log for order execution: one JSON line per event,
+        keyed by client_order_id.
+          intent    - about to be placed (made durable before any request)
+          submitted - a request is going out (attempt n)
+          ack       - the broker has it (order_id)
+          failed    - gave up for now after transient errors (resumable)
+          rejected  - refused by the broker (final)
+          expired   - left unfinished too long to be resumed (final)
+        Writes are buffered and fsynced in groups (every sync_records
+        records or sync_seconds), and concurrent durable writes share one
+        fsync, so journaling costs microseconds per order.
+        """
+        self.path = str(path)
+        self.sync_records = sync_records
+        self.sync_seconds = sync_seconds
+        self.state = {}               # client_order_id -> latest merged record
+        self.lock = threading.Lock()  # Buffer + state
+        self.sync_lock = threading.Lock()   # One writer at a time
+        self.buffer = []
+        self.appended = 0             # Records handed to append()
+        self.synced = 0               # Records known to be on disk
+        self.oldest = None            # monotonic time of the oldest unsynced record
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.replay()
+        self.file = open(self.path, 'a', encoding='utf-8')
+        # A crash mid-write can leave half a line; never glue the next record onto it
+        if self.file.tell() > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self.file.write('\n')
+
+    # --- REPLAY ---
+    def replay(self):
+        """
+        Rebuilds the per-order state from the file. A torn last line (crash
+        while writing) is skipped. Returns the number of records read.
+        """
+        self.state = {}
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(record)
+                count += 1
+        return count
+
+    def _apply(self, record):
+        # Later events only carry what changed (order_id, error); keep the intent's fields
+        current = self.state.setdefault(record['cid'], {})
+        current.setdefault('created', record.get('created', record['ts']))
+        current.update(record)
+
+    # --- WRITING ---
+    def append(self, event, cid, durable=False, **fields):
+        """
+        Logs one event. durable=True returns only once it is on disk
+        (group commit: a thread that finds its record already fsynced by
+        another skips the fsync).
+        """
+        record = {'ts': time.time(), 'event': event, 'cid': cid, **fields}
+        line = json.dumps(record, default=str) + '\n'
+        with self.lock:
+            self.buffer.append(line)
+            self._apply(record)
+            self.appended += 1
+            seq = self.appended
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            due = len(self.buffer) >= self.sync_records or time.monotonic() - self.oldest >= self.sync_seconds
+        if durable or due:
+            self.sync(seq)
+        return seq
+
+    def sync(self, seq=None):
+        """
+        Writes and fsyncs everything buffered (at least up to record `seq`).
+        """
+        with self.sync_lock:
+            if seq is not None and self.synced >= seq:
+                return
+            with self.lock:
+                lines, self.buffer = self.buffer, []
+                upto, self.oldest = self.appended, None
+            if lines:
+                self.file.write(''.join(lines))
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            self.synced = upto
+
+    def compact(self, keep_hours=ORDER_JOURNAL_KEEP_HOURS):
+        """
+        Rewrites the file as one merged line per order and drops batches
+        whose orders are all final and untouched for keep_hours, so the log
+        stays the size of the open work instead of growing forever. The new
+        file is fsynced and swapped in atomically. Returns the number of
+        orders dropped.
+        """
+        cutoff = time.time() - keep_hours * 3600
+        with self.sync_lock:
+            with self.lock:
+                batches = {}
+                for record in self.state.values():
+                    batches.setdefault(record.get('batch'), []).append(record)
+                kept = {}
+                for records in batches.values():
+                    finished = all(r.get('event') in self.DONE for r in records)
+                    if not finished or max(r['ts'] for r in records) >= cutoff:
+                        kept.update((r['cid'], r) for r in records)
+                dropped = len(self.state) - len(kept)
+                # The snapshot already holds every buffered record's effect
+                self.state, self.buffer = kept, []
+                upto, self.oldest = self.appended, None
+                lines = [json.dumps(r, default=str) + '\n' for r in kept.values()]
+
+            self.file.close()
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self.file = open(self.path, 'a', encoding='utf-8')
+            self.synced = upto
+        return dropped
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+    # --- QUERIES ---
+    def get(self, cid):
+        """
+        Merged record for an order ('event' = its latest), or None if the
+        journal has never seen it.
+        """
+        with self.lock:
+            record = self.state.get(cid)
+            return dict(record) if record else None
+
+    def unfinished(self, batch_id=None):
+        """
+        Orders with an intent but no final event (optionally one batch only),
+        as records with cid, batch, ticker, qty, side and created (when the
+        intent was logged).
+        """
+        with self.lock:
+            return [dict(r) for r in self.state.values()
+                    if r.get('event') not in self.DONE and (batch_id is None or r.get('batch') == batch_id)]
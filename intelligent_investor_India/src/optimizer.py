@@ -0,0 +1,130 @@
+import math
+import numpy as np
+from scipy.optimize import minimize
+from config.settings import RISK_TARGET_VOL
+
+class PortfolioOptimizer:
+    def __init__(self, risk_target=RISK_TARGET_VOL):
+        """
+        Score-weighted allocation in whole shares. Weights are shares of
+        the budget (uninvested cash is allowed and carries no risk):
+
+            maximise   scores . w
+            subject to 0 <= w <= caps            (per-stock limit)
+                       sum(w) <= 1               (budget)
+                       sector sums <= sector_caps
+                       w' C w <= risk_target^2   (C = annualised covariance)
+
+        Solved with SciPy's SLSQP, then rounded down to whole shares and
+        topped up greedily (best score first) with the cash rounding left.
+        """
+        self.risk_target = risk_target
+
+    @staticmethod
+    def _sector_matrix(sector_ids, n_sectors):
+        M = np.zeros((n_sectors, len(sector_ids)))
+        M[sector_ids, np.arange(len(sector_ids))] = 1.0
+        return M
+
+    def feasible(self, w, caps, M, sector_caps, cov=None):
+        """
+        Scales weights down (never up) until every constraint holds, so a
+        solver result that is slightly off is still safe to round.
+        """
+        w = np.clip(w, 0, caps)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sector_scale = np.where(M @ w > sector_caps, sector_caps / (M @ w), 1.0)
+        w = w * (M.T @ sector_scale)
+        if w.sum() > 1:
+            w = w / w.sum()
+        if cov is not None:
+            var = w @ cov @ w
+            if var > self.risk_target ** 2:
+                w = w * math.sqrt(self.risk_target ** 2 / var)
+        return w
+
+    def solve(self, scores, caps, sector_ids, sector_caps, cov=None):
+        """
+        Continuous weights for the problem above.
+        """
+        n = len(scores)
+        s = np.clip(np.nan_to_num(scores), 0, None)
+        s = s / s.max() if s.max() > 0 else np.ones(n)
+        M = self._sector_matrix(sector_ids, len(sector_caps))
+
+        constraints = [
+            {'type': 'ineq', 'fun': lambda w: 1 - w.sum(), 'jac': lambda w: -np.ones((1, n))},
+            {'type': 'ineq', 'fun': lambda w: sector_caps - M @ w, 'jac': lambda w: -M},
+        ]
+        if cov is not None:
+            var = self.risk_target ** 2
+            constraints.append({'type': 'ineq', 'fun': lambda w: var - w @ cov @ w,
+                                'jac': lambda w: (-2 * cov @ w)[None, :]})
+
+        w0 = self.feasible(np.full(n, 1.0 / n), caps, M, sector_caps, cov)
+        result = minimize(lambda w: -s @ w, w0, jac=lambda w: -s, method='SLSQP',
+                          bounds=list(zip(np.zeros(n), caps)), constraints=constraints,
+                          options={'maxiter': 200, 'ftol': 1e-9})
+        w = result.x if np.all(np.isfinite(result.x)) else w0
+        return self.feasible(w, caps, M, sector_caps, cov)
+
+    def to_lots(self, w, prices, budget, scores, caps, sector_ids, sector_caps, cov=None):
+        """
+        Whole shares from continuous weights: round every position down,
+        then walk the stocks best score first and buy as many extra shares
+        as the cash, the stock's cap, its sector's cap and the risk target
+        still allow (the risk limit is a quadratic in the share count).
+        A buy that is negatively correlated with the basket lowers its
+        variance and can reopen room for a stock passed over earlier, so
+        passes repeat until one buys nothing (each buy spends cash, so
+        this ends).
+        """
+        shares = np.floor(w * budget / prices)
+        lots = shares * prices / budget
+        M = self._sector_matrix(sector_ids, len(sector_caps))
+        cash = 1 - lots.sum()
+        sector_room = sector_caps - M @ lots
+        if cov is not None:
+            cov_w = cov @ lots
+            slack = self.risk_target ** 2 - lots @ cov_w
+
+        order = np.argsort(-np.nan_to_num(scores), kind='stable')
+        bought = True
+        while bought:
+            bought = False
+            for i in order:
+                limit = min(cash, caps[i] - lots[i], sector_room[sector_ids[i]])
+                if cov is not None and cov[i, i] > 0:
+                    # (w + t e_i)' C (w + t e_i) <= target^2  ->  a t^2 + b t - slack <= 0
+                    a, b = cov[i, i], 2 * cov_w[i]
+                    limit = min(limit, (-b + math.sqrt(max(b * b + 4 * a * slack, 0))) / (2 * a))
+                extra = math.floor(limit * budget / prices[i] * (1 - 1e-12)) if limit > 0 else 0
+                if extra <= 0:
+                    continue
+                t = extra * prices[i] / budget
+                shares[i] += extra
+                bought = True
+                lots[i] += t
+                cash -= t
+                sector_room[sector_ids[i]] -= t
+                if cov is not None:
+                    slack -= 2 * t * cov_w[i] + t * t * cov[i, i]
+                    cov_w += t * cov[:, i]
+        return shares.astype(int)
+
+    def optimize(self, scores, prices, budget, caps, sector_ids, sector_caps, cov=None):
+        """
+        Share counts for each stock, plus the basket's expected annualised
+        volatility on the budget (NaN without a covariance).
+        """
+        scores, prices = np.asarray(scores, dtype=np.float64), np.asarray(prices, dtype=np.float64)
+        caps, sector_caps = np.asarray(caps, dtype=np.float64), np.asarray(sector_caps, dtype=np.float64)
+        sector_ids = np.asarray(sector_ids, dtype=int)
+        if cov is not None:
+            cov = np.asarray(cov, dtype=np.float64)
+
+        w = self.solve(scores, caps, sector_ids, sector_caps, cov)
+        shares = self.to_lots(w, prices, budget, scores, caps, sector_ids, sector_caps, cov)
+        lots = shares * prices / budget
+        vol = math.sqrt(max(lots @ cov @ lots, 0)) if cov is not None else float('nan')
+        return shares, vol
@@ -1,6 +1,8 @@
 import json
 import os
-from config.settings import DATA_DIR
+from config.settings import DATA_DIR, PROJECTION_SEED
+from src.financial_health import FinancialHealth
+from src.projection import GoalProjector
 
 class PersonalizationEngine:
     def __init__(self):
@@ -89,4 +91,14 @@ class PersonalizationEngine:
             "Stocks": round(stock_alloc, 1),
             "Mutual_Funds": round(mf_alloc, 1),
             "Safe_Debt_Gold": round(safe_pct, 1)
-        }
\ No newline at end of file
+        }
+
+    def project_goal(self, initial, years, goal=None, monthly_sip=None, sip_step_up=0.0, seed=PROJECTION_SEED):
+        """
+        What the allocation is likely to grow to (Monte Carlo, see GoalProjector).
+        The monthly SIP defaults to the FinancialHealth surplus.
+        """
+        if monthly_sip is None:
+            monthly_sip = FinancialHealth(self.profile).monthly_surplus()
+        projector = GoalProjector(self.get_asset_allocation(), seed=seed)
+        return projector.project(initial, monthly_sip, years, goal=goal, sip_step_up=sip_step_up)
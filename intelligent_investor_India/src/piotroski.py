@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from config.settings import PIOTROSKI_MIN_CRITERIA, QUALITY_SCORE_SOURCE
+from src.history import HistoryEngine
+
+class PiotroskiEngine:
+    # item: (statement, yfinance line items in order of preference)
+    ITEMS = {
+        'net_income': ('financials', ['Net Income', 'Net Income Common Stockholders',
+                                      'Net Income From Continuing Operation Net Minority Interest']),
+        'revenue': ('financials', ['Total Revenue', 'Operating Revenue']),
+        'gross_profit': ('financials', ['Gross Profit']),
+        'cost_of_revenue': ('financials', ['Cost Of Revenue', 'Reconciled Cost Of Revenue']),
+        'total_assets': ('balance_sheet', ['Total Assets']),
+        'long_term_debt': ('balance_sheet', ['Long Term Debt', 'Long Term Debt And Capital Lease Obligation']),
+        'current_assets': ('balance_sheet', ['Current Assets']),
+        'current_liabilities': ('balance_sheet', ['Current Liabilities']),
+        'shares': ('balance_sheet', ['Ordinary Shares Number', 'Share Issued']),
+        'cfo': ('cashflow', ['Operating Cash Flow', 'Cash Flow From Continuing Operating Activities']),
+    }
+    CRITERIA = ['f_roa', 'f_cfo', 'f_delta_roa', 'f_accruals', 'f_leverage',
+                'f_liquidity', 'f_dilution', 'f_margin', 'f_turnover']
+    YEARS = 3   # Latest year, the year before, and one more for opening assets
+
+    def __init__(self, history=None, min_criteria=PIOTROSKI_MIN_CRITERIA):
+        """
+        Full 9-point Piotroski F-score from annual income, balance sheet and
+        cash flow statements (cached + fetched in parallel via HistoryEngine).
+        """
+        self.history = history or HistoryEngine()
+        self.min_criteria = min_criteria  # Fewer scorable criteria -> no F-score
+
+    def stack(self, statements, tickers):
+        """
+        Builds the (ticker x year x item) array from the long statement
+        frames ({statement: frame}); year 0 = latest fiscal year.
+        Missing line items stay NaN.
+        """
+        items = list(self.ITEMS)
+        X = np.full((len(tickers), self.YEARS, len(items)), np.nan)
+        ticker_index = pd.Index(tickers)
+
+        for statement, frame in statements.items():
+            if frame.empty:
+                continue
+            aliases = {name: (items.index(item), rank)
+                       for item, (kind, names) in self.ITEMS.items() if kind == statement
+                       for rank, name in enumerate(names)}
+            df = frame[frame['line_item'].isin(aliases)].copy()
+            if df.empty:
+                continue
+            df['age'] = frame.groupby('ticker')['period_end'].rank(method='dense', ascending=False).astype(int) - 1
+            df = df[df['age'] < self.YEARS]
+            df['item'] = df['line_item'].map(lambda name: aliases[name][0])
+            df['rank'] = df['line_item'].map(lambda name: aliases[name][1])
+            # Preferred line item first; a NaN preferred value falls through to the next alias
+            df = df.dropna(subset=['value']).sort_values('rank').drop_duplicates(['ticker', 'age', 'item'])
+
+            rows = ticker_index.get_indexer(df['ticker'])
+            keep = rows >= 0
+            X[rows[keep], df['age'].to_numpy()[keep], df['item'].to_numpy()[keep]] = df['value'].to_numpy()[keep]
+        return X
+
+    def compute(self, X, tickers):
+        """
+        The nine criteria for every ticker at once. A criterion whose inputs
+        are missing is NaN (not a fail); f_covered counts the scorable ones.
+        """
+        item = {name: i for i, name in enumerate(self.ITEMS)}
+        get = lambda name, age: X[:, age, item[name]]
+
+        def ratio(a, b):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(b == 0, np.nan, a / b)
+
+        def flag(condition, *inputs):
+            ok = np.all([~np.isnan(x) for x in inputs], axis=0)
+            return np.where(ok, condition.astype(float), np.nan)
+
+        # Opening assets (year before); fall back to closing assets when missing
+        assets = [get('total_assets', a) for a in range(self.YEARS)]
+        opening = [np.where(np.isnan(assets[a + 1]), assets[a], assets[a + 1]) for a in range(self.YEARS - 1)]
+
+        gross = [np.where(np.isnan(get('gross_profit', a)), get('revenue', a) - get('cost_of_revenue', a),
+                          get('gross_profit', a)) for a in range(2)]
+
+        roa = [ratio(get('net_income', a), opening[a]) for a in range(2)]
+        cfo_ta = ratio(get('cfo', 0), opening[0])
+        # Yahoo drops the 'Long Term Debt' line for debt-free companies: with assets present that is 0
+        debt = [np.where(np.isnan(get('long_term_debt', a)) & ~np.isnan(assets[a]), 0.0, get('long_term_debt', a))
+                for a in range(2)]
+        leverage = [ratio(debt[a], assets[a]) for a in range(2)]
+        current = [ratio(get('current_assets', a), get('current_liabilities', a)) for a in range(2)]
+        margin = [ratio(gross[a], get('revenue', a)) for a in range(2)]
+        turnover = [ratio(get('revenue', a), opening[a]) for a in range(2)]
+        shares = [get('shares', a) for a in range(2)]
+
+        with np.errstate(invalid='ignore'):
+            criteria = {
+                # Profitability
+                'f_roa': flag(roa[0] > 0, roa[0]),
+                'f_cfo': flag(get('cfo', 0) > 0, get('cfo', 0)),
+                'f_delta_roa': flag(roa[0] > roa[1], roa[0], roa[1]),
+                'f_accruals': flag(cfo_ta > roa[0], cfo_ta, roa[0]),
+                # Leverage, liquidity, source of funds
+                'f_leverage': flag((leverage[0] < leverage[1]) | (leverage[0] == 0), leverage[0], leverage[1]),
+                'f_liquidity': flag(current[0] > current[1], current[0], current[1]),
+                'f_dilution': flag(shares[0] <= shares[1], shares[0], shares[1]),
+                # Operating efficiency
+                'f_margin': flag(margin[0] > margin[1], margin[0], margin[1]),
+                'f_turnover': flag(turnover[0] > turnover[1], turnover[0], turnover[1]),
+            }
+
+        df = pd.DataFrame(criteria, index=tickers)
+        scored = df[self.CRITERIA].to_numpy()
+        covered = (~np.isnan(scored)).sum(axis=1)
+        df['f_score'] = np.nansum(scored, axis=1).astype(int)
+        df['f_covered'] = covered
+        df['f_coverage'] = covered / len(self.CRITERIA)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Share of scorable criteria passed, on the 0-100 quality_score scale
+            df['f_quality'] = np.where(covered >= self.min_criteria, df['f_score'] / covered * 100, np.nan)
+
+        # Which line items the latest year is missing (why coverage is low)
+        missing = np.isnan(X[:, 0, :])
+        names = np.array(list(self.ITEMS))
+        df['f_missing'] = [",".join(names[row]) for row in missing]
+        return df
+
+    def score(self, tickers):
+        """
+        F-scores for the whole universe in one run: three statement loads
+        (mostly from cache) and one vectorized pass.
+        """
+        tickers = list(tickers)
+        print(f"\n--- 🧮 PIOTROSKI F-SCORE ({len(tickers)} stocks) ---")
+        symbols = [self.history.normalize(t) for t in tickers]
+
+        statements = {}
+        for statement in ('financials', 'balance_sheet', 'cashflow'):
+            statements[statement], _ = self.history.load_statements(symbols, statement)
+
+        X = self.stack(statements, list(dict.fromkeys(symbols)))
+        df = self.compute(X, list(dict.fromkeys(symbols))).reindex(symbols)
+        df.index = tickers
+
+        scored = df['f_quality'].notna().sum()
+        print(f"✔ F-score available for {scored}/{len(tickers)} stocks")
+        return df
+
+
+def configured_f_scores(tickers, source=QUALITY_SCORE_SOURCE):
+    """
+    What callers pass as ValuationEngine(f_scores=...): F-scores for the
+    tickers when quality_score comes from statements, else None. Fetching
+    lives here so scoring itself never touches the network.
+    """
+    return PiotroskiEngine().score(tickers) if source == 'piotroski' else None
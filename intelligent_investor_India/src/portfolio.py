@@ -1,11 +1,20 @@
 import pandas as pd
+import numpy as np
 import math
-from config.settings import DATA_DIR
+from config.settings import DATA_DIR, ALLOCATION_MODE, OPTIMIZER_CANDIDATES, QUOTE_CANDIDATES
+from src.optimizer import PortfolioOptimizer
+from src.price_store import PriceStore
+from src.quotes import QuoteService
+from src.risk import RiskEngine
 
 class PortfolioManager:
-    def __init__(self, total_capital):
+    SAFETY_ETFS = {'NIFTYBEES.NS': 270, 'GOLDBEES.NS': 62}  # Fallback prices when no quote
+
+    def __init__(self, total_capital, price_store=None, quotes=None):
         self.capital = float(total_capital)
         self.holdings = self.load_holdings()
+        self.price_store = price_store  # Local price history (optimizer mode's covariance)
+        self.quotes = quotes or QuoteService()  # Live last prices (batched + cached)
 
     def load_holdings(self):
         """
@@ -40,22 +49,29 @@ class PortfolioManager:
         print(f"✅ Loaded {len(df)} existing holdings.")
         return df
 
+    def market_prices(self, extra_tickers=()):
+        """
+        Last price per holding. Listed holdings and any extra tickers are
+        quoted in one batched call, so later lookups for the extras are
+        served from the quote cache; mutual funds (and anything unquoted)
+        use the CSV's last closing price, then AvgPrice.
+        """
+        self.holdings['Shares'] = pd.to_numeric(self.holdings['Shares'], errors='coerce').fillna(0)
+        self.holdings['AvgPrice'] = pd.to_numeric(self.holdings['AvgPrice'], errors='coerce').fillna(0)
+        return self.quotes.holding_prices(self.holdings, extra_tickers)
+
     def get_current_valuation(self):
         """
-        Calculates the current value of existing holdings.
+        Calculates the current (marked-to-market) value of existing holdings.
         """
         if self.holdings.empty:
             return 0, {}
-        
-        # Ensure numeric columns
-        self.holdings['Shares'] = pd.to_numeric(self.holdings['Shares'], errors='coerce').fillna(0)
-        self.holdings['AvgPrice'] = pd.to_numeric(self.holdings['AvgPrice'], errors='coerce').fillna(0)
 
-        total_value = (self.holdings['Shares'] * self.holdings['AvgPrice']).sum()
+        values = self.holdings['Shares'] * self.market_prices()
+        total_value = values.sum()
         
-        holdings_dict = {}
-        for _, row in self.holdings.iterrows():
-            holdings_dict[row['Ticker']] = row['Shares'] * row['AvgPrice']
+        # dict() keeps the last row for a repeated ticker (same as a row loop)
+        holdings_dict = dict(zip(self.holdings['Ticker'], values))
             
         return total_value, holdings_dict
 
@@ -67,52 +83,60 @@ class PortfolioManager:
             return pd.DataFrame()
 
         print("\n--- 📉 PORTFOLIO REVIEW (Sell Check) ---")
-        sell_orders = []
 
-        for index, row in self.holdings.iterrows():
-            ticker = row['Ticker']
-            shares = row['Shares']
-            avg_price = row['AvgPrice']
-            type_asset = row['Type']
+        # Skip ETFs/MFs, and anything we have no data for
+        h = self.holdings[~self.holdings['Type'].isin(['MF', 'ETF', 'Index'])
+                          & self.holdings['Ticker'].isin(df_scored.index)]
+        if h.empty:
+            return pd.DataFrame()
 
-            # Skip ETFs/MFs
-            if type_asset in ['MF', 'ETF', 'Index']:
-                continue
+        # One join instead of a .loc lookup per holding
+        stats = df_scored.reindex(h['Ticker'])
+        column = lambda name: stats[name].to_numpy() if name in stats.columns else np.zeros(len(stats))
+        # Live quote (one batched call), else the scored snapshot's price
+        live = self.quotes.get_quotes(h['Ticker'].astype(str)).to_numpy()
+        current_price = np.where(np.isnan(live), pd.to_numeric(stats['price'], errors='coerce').to_numpy(), live)
+        current_score = column('total_score')
+        pe_ratio = column('trailing_pe')
+        peg_ratio = column('peg_ratio')
 
-            # Check if we have data
-            if ticker not in df_scored.index:
-                continue
+        # SELL RULES
+        with np.errstate(invalid='ignore'):
+            weak = current_score < 40
+            overvalued = ~weak & (pe_ratio > 80) & (peg_ratio > 4.0)
+        sell = weak | overvalued
+        if not sell.any():
+            return pd.DataFrame()
 
-            stats = df_scored.loc[ticker]
-            current_price = stats['price']
-            current_score = stats.get('total_score', 0)
-            pe_ratio = stats.get('trailing_pe', 0)
-            peg_ratio = stats.get('peg_ratio', 0)
+        reason = [f"Weak Fundamentals (Score: {sc:.0f}/100)" if w else f"Overvalued (P/E: {pe:.1f}, PEG: {peg:.1f})"
+                  for w, sc, pe, peg in zip(weak[sell], current_score[sell], pe_ratio[sell], peg_ratio[sell])]
 
-            reason = ""
-            
-            # SELL RULES
-            if current_score < 40:
-                reason = f"Weak Fundamentals (Score: {current_score:.0f}/100)"
-            elif pe_ratio > 80 and peg_ratio > 4.0:
-                reason = f"Overvalued (P/E: {pe_ratio:.1f}, PEG: {peg_ratio:.1f})"
-
-            if reason:
-                profit_loss = (current_price - avg_price) / avg_price
-                
-                sell_orders.append({
-                    'ticker': ticker,
-                    'action': 'SELL',
-                    'shares': shares,
-                    'current_price': current_price,
-                    'reason': reason,
-                    'est_value': shares * current_price,
-                    'pnl_pct': round(profit_loss * 100, 2)
-                })
+        shares = h['Shares'].to_numpy()[sell]
+        avg_price = h['AvgPrice'].to_numpy()[sell]
+        price = current_price[sell]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_loss = (price - avg_price) / avg_price
+
+        return pd.DataFrame({
+            'ticker': h['Ticker'].to_numpy()[sell],
+            'action': 'SELL',
+            'shares': shares,
+            'current_price': price,
+            'reason': reason,
+            'est_value': shares * price,
+            'pnl_pct': np.round(profit_loss * 100, 2)
+        })
 
-        return pd.DataFrame(sell_orders)
+    def select_and_allocate(self, df_scored, top_n=5, max_sector_weight=0.30, mode=ALLOCATION_MODE):
+        if mode not in ('equal', 'optimize'):
+            raise ValueError(f"Unknown allocation mode '{mode}' (use 'equal' or 'optimize')")
+        score_col = 'total_score' if 'total_score' in df_scored.columns else 'score'
+        df_sorted = df_scored.sort_values(by=score_col, ascending=False)
 
-    def select_and_allocate(self, df_scored, top_n=5, max_sector_weight=0.30):
+        # Holdings, the top candidates and the safety ETFs are quoted in ONE
+        # batch; every price below is read back from the quote cache
+        candidates = list(df_sorted.index[:QUOTE_CANDIDATES])
+        holding_prices = self.market_prices(candidates + list(self.SAFETY_ETFS))
         current_pf_value, current_holdings = self.get_current_valuation()
         total_investment_pool = self.capital + current_pf_value
         
@@ -125,11 +149,11 @@ class PortfolioManager:
 
         # --- SAFETY BUCKET ---
         safe_assets = ['MF', 'ETF', 'Index']
-        mf_holdings = self.holdings[self.holdings['Type'].isin(safe_assets)]
+        is_safe = self.holdings['Type'].isin(safe_assets).to_numpy()
         
         current_mf_value = 0
-        if not mf_holdings.empty:
-            current_mf_value = (mf_holdings['Shares'] * mf_holdings['AvgPrice']).sum()
+        if is_safe.any():
+            current_mf_value = (self.holdings['Shares'].to_numpy() * holding_prices)[is_safe].sum()
         
         target_mf_allocation = 0.20 * total_investment_pool
         mf_shortfall = target_mf_allocation - current_mf_value
@@ -140,18 +164,20 @@ class PortfolioManager:
             
             nifty_amt = mf_shortfall * 0.70
             gold_amt = mf_shortfall * 0.30
+            etf_quotes = self.quotes.get_quotes(list(self.SAFETY_ETFS))
+            nifty_price, gold_price = etf_quotes.fillna(pd.Series(self.SAFETY_ETFS)).to_numpy()
             
-            if nifty_amt > 260:
+            if nifty_amt >= nifty_price:
                 recommendations.append({
                     'ticker': 'NIFTYBEES.NS', 'sector': 'Index ETF',
-                    'shares': math.floor(nifty_amt / 270), 'price': 270,
+                    'shares': math.floor(nifty_amt / nifty_price), 'price': nifty_price,
                     'est_cost': nifty_amt, 'allocation_pct': 0
                 })
             
-            if gold_amt > 60:
+            if gold_amt >= gold_price:
                 recommendations.append({
                     'ticker': 'GOLDBEES.NS', 'sector': 'Commodity ETF',
-                    'shares': math.floor(gold_amt / 62), 'price': 62,
+                    'shares': math.floor(gold_amt / gold_price), 'price': gold_price,
                     'est_cost': gold_amt, 'allocation_pct': 0
                 })
             
@@ -159,43 +185,168 @@ class PortfolioManager:
 
         # --- STOCK ALLOCATION ---
         print(f"\n--- STOCK ALLOCATION (Remaining: ₹{self.capital:,.2f}) ---")
-        
-        score_col = 'total_score' if 'total_score' in df_scored.columns else 'score'
-        df_sorted = df_scored.sort_values(by=score_col, ascending=False)
+
+        # Top candidates at their live price (the scored snapshot's price otherwise)
+        live = self.quotes.get_quotes(candidates)
+        df_sorted = df_sorted.copy()
+        df_sorted.loc[candidates, 'price'] = live.fillna(
+            pd.to_numeric(df_sorted.loc[candidates, 'price'], errors='coerce')).to_numpy()
         
         target_per_stock = total_investment_pool / (top_n + len(current_holdings))
         target_per_stock = min(target_per_stock, self.capital / 3) 
 
-        for ticker, row in df_sorted.iterrows():
-            if self.capital < 2000:
+        if mode == 'optimize':
+            recommendations += self.allocate_optimized(df_sorted, score_col, target_per_stock, current_holdings,
+                                                       total_investment_pool, max_sector_weight)
+        else:
+            recommendations += self.allocate_in_order(df_sorted, target_per_stock, current_holdings)
+        return pd.DataFrame(recommendations)
+
+    def allocate_in_order(self, df_sorted, target_per_stock, current_holdings):
+        """
+        Walks the ranked list buying up to target_per_stock of each stock
+        until capital drops below ₹2,000. While capital covers a full
+        target, every buy is known up front, so whole runs of rows are
+        settled with one cumulative sum; only the rows where capital runs
+        short are handled one at a time (each one at least halves it).
+        Same buys, prints and capital as stepping through row by row.
+        """
+        n = len(df_sorted)
+        tickers = df_sorted.index
+        raw_price = df_sorted['price'].to_numpy()
+        price = pd.to_numeric(df_sorted['price'], errors='coerce').to_numpy(dtype=np.float64)
+        sectors = df_sorted['sector'].to_numpy() if 'sector' in df_sorted.columns else np.full(n, 'Unknown')
+        existing = pd.Series(current_holdings, dtype=np.float64).reindex(tickers).fillna(0).to_numpy() \
+            if current_holdings else np.zeros(n)
+
+        skip = existing > target_per_stock * 0.8
+        with np.errstate(invalid='ignore'):
+            valid = ~skip & ~np.isnan(price) & (price > 0)
+        need = target_per_stock - existing
+        with np.errstate(invalid='ignore', divide='ignore'):
+            full_shares = np.where(valid, np.floor(need / np.where(valid, price, 1)), 0)
+        full_cost = full_shares * np.where(valid, price, 0)
+
+        shares = np.zeros(n)
+        capital_before = np.full(n, np.nan)   # Capital when each row was reached
+        capital = self.capital
+        stop = n                              # First row not reached (capital < 2000)
+        start = 0
+        while start < n:
+            # Capital at each row if every row from `start` gets its full target
+            run = np.subtract.accumulate(np.concatenate(([capital], full_cost[start:])))
+            short = (run[:-1] < 2000) | (valid[start:] & (run[:-1] < need[start:]))
+            end = start + int(np.argmax(short)) if short.any() else n
+
+            shares[start:end] = full_shares[start:end]
+            capital_before[start:end] = run[:end - start]
+            capital = run[end - start]
+            if end == n:
+                break
+            if capital < 2000:
+                stop = end
                 break
-                
-            existing_val = current_holdings.get(ticker, 0)
-            if existing_val > target_per_stock * 0.8:
-                print(f"  ⏭ Skipping {ticker}: Already hold ₹{existing_val:,.0f}")
-                continue
-
-            sector = row.get('sector', 'Unknown')
-            price = row['price']
-            
-            if pd.isna(price) or price <= 0: continue
 
-            amount_to_invest = target_per_stock - existing_val
-            amount_to_invest = min(amount_to_invest, self.capital)
-            
-            shares = math.floor(amount_to_invest / price)
-            cost = shares * price
-            
-            if shares > 0:
-                recommendations.append({
+            # Capital runs short on this row: buy what it still covers
+            capital_before[end] = capital
+            shares[end] = math.floor(capital / price[end])
+            capital -= shares[end] * price[end]
+            start = end + 1
+
+            # Rows priced above the remaining capital can't buy anything; jump past them
+            if start < n and capital >= 2000:
+                with np.errstate(invalid='ignore'):
+                    can_buy = valid[start:] & ((price[start:] <= capital) | (need[start:] <= capital))
+                start = start + int(np.argmax(can_buy)) if can_buy.any() else n
+            elif capital < 2000:
+                stop = start
+                break
+
+        picks = []
+        for i in range(stop):
+            ticker = tickers[i]
+            if skip[i]:
+                print(f"  ⏭ Skipping {ticker}: Already hold ₹{existing[i]:,.0f}")
+            elif shares[i] > 0:
+                cost = int(shares[i]) * price[i]
+                picks.append({
                     'ticker': ticker,
-                    'sector': sector,
-                    'shares': shares,
-                    'price': price,
+                    'sector': sectors[i],
+                    'shares': int(shares[i]),
+                    'price': raw_price[i],
                     'est_cost': cost,
-                    'allocation_pct': round((cost / self.capital) * 100, 2)
+                    'allocation_pct': round((cost / capital_before[i]) * 100, 2)
                 })
-                self.capital -= cost
-                print(f"  ✔ Buying {ticker} ({sector}) - ₹{cost:,.0f}")
+                print(f"  ✔ Buying {ticker} ({sectors[i]}) - ₹{cost:,.0f}")
+
+        self.capital = capital
+        return picks
+
+    def allocate_optimized(self, df_sorted, score_col, target_per_stock, current_holdings,
+                           total_pool, max_sector_weight):
+        """
+        Optimizer mode: whole-share buys among the top OPTIMIZER_CANDIDATES
+        that maximise score-weighted exposure (see PortfolioOptimizer).
+        Each stock is capped at the same target as the equal mode (less what
+        is already held), each sector's held + new value at
+        max_sector_weight of the combined portfolio, and the basket's
+        volatility at RISK_TARGET_VOL using a shrunk covariance from the
+        local price store.
+        """
+        budget = self.capital
+        if budget <= 0:
+            return []
+
+        price = pd.to_numeric(df_sorted['price'], errors='coerce').to_numpy(dtype=np.float64)
+        sectors = df_sorted['sector'].fillna('Unknown') if 'sector' in df_sorted.columns \
+            else pd.Series('Unknown', index=df_sorted.index)
+        existing = pd.Series(current_holdings, dtype=np.float64).reindex(df_sorted.index).fillna(0) \
+            if current_holdings else pd.Series(0.0, index=df_sorted.index)
+
+        skip = (existing > target_per_stock * 0.8).to_numpy()
+        with np.errstate(invalid='ignore'):
+            valid = ~skip & ~np.isnan(price) & (price > 0)
+        rows = np.flatnonzero(valid)[:OPTIMIZER_CANDIDATES]
+        if len(rows) == 0:
+            return []
+        for i in np.flatnonzero(skip[:rows[-1]]):
+            print(f"  ⏭ Skipping {df_sorted.index[i]}: Already hold ₹{existing.iloc[i]:,.0f}")
+
+        tickers = df_sorted.index[rows]
+        sector_ids, sector_names = pd.factorize(sectors.iloc[rows])
+        held = existing[existing > 0].groupby(sectors[existing > 0]).sum()
+        sector_caps = np.clip(max_sector_weight * total_pool - held.reindex(sector_names).fillna(0).to_numpy(),
+                              0, None) / budget
+        caps = np.clip(target_per_stock - existing.to_numpy()[rows], 0, None) / budget
+        scores = pd.to_numeric(df_sorted[score_col], errors='coerce').to_numpy(dtype=np.float64)[rows]
+
+        store = self.price_store or PriceStore()
+        cov = RiskEngine(store).covariance(tickers) if len(store) else None  # Cached per price date
+        if cov is None:
+            print("  ⚠ No local price history: optimizing without the risk target")
+
+        optimizer = PortfolioOptimizer()
+        shares, vol = optimizer.optimize(scores, price[rows], budget, caps, sector_ids, sector_caps,
+                                         None if cov is None else cov.to_numpy())
+
+        picks = []
+        spent = 0.0
+        raw_price = df_sorted['price'].to_numpy()[rows]
+        for j in np.flatnonzero(shares > 0):
+            cost = int(shares[j]) * price[rows[j]]
+            spent += cost
+            picks.append({
+                'ticker': tickers[j],
+                'sector': sector_names[sector_ids[j]],
+                'shares': int(shares[j]),
+                'price': raw_price[j],
+                'est_cost': cost,
+                'allocation_pct': round((cost / budget) * 100, 2)
+            })
+            print(f"  ✔ Buying {tickers[j]} ({sector_names[sector_ids[j]]}) - ₹{cost:,.0f}")
 
-        return pd.DataFrame(recommendations)
\ No newline at end of file
+        risk = f", est. volatility {vol:.1%} (target {optimizer.risk_target:.0%})" if cov is not None else ""
+        print(f"  🧮 Optimizer: {len(picks)} stocks from {len(rows)} candidates, "
+              f"₹{spent:,.0f} of ₹{budget:,.0f} invested{risk}")
+        self.capital = budget - spent
+        return picks
@@ -0,0 +1,300 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from config.settings import PRICE_STORE_DIR, PRICE_HISTORY_PERIOD, PRICE_UPDATE_PERIODS
+from src.prices import PricePanel, PriceHistoryLoader
+
+class _WriterLock:
+    """
+    Cross-platform single-writer lock (O_EXCL lock file). Readers never lock.
+    """
+    def __init__(self, path, timeout=60, stale_after=600):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+
+    def __enter__(self):
+        start = time.time()
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                # A crashed writer leaves the file behind
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() - start > self.timeout:
+                    raise TimeoutError(f"Price store is locked ({self.path})")
+                time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class PriceStore:
+    FIELDS = PricePanel.FIELDS
+
+    def __init__(self, root=PRICE_STORE_DIR):
+        """
+        On-disk daily OHLCV for the universe.
+
+        Layout (one 'generation' directory, swapped atomically on rebuild):
+            CURRENT            -> name of the live generation, e.g. gen-000003
+            gen-N/meta.json    -> ticker column order
+            gen-N/dates.i8     -> int64 days since epoch, one per row
+            gen-N/<field>.f8   -> float64 matrix, rows = dates, cols = tickers
+
+        Rows are date-major, so a daily update is a plain file append.
+        dates.i8 is written LAST and defines how many rows are committed,
+        so concurrent readers never see a half-written bar. Reads are
+        np.memmap views: every process shares the OS page cache instead of
+        loading its own copy.
+        """
+        self.root = str(root)
+        os.makedirs(self.root, exist_ok=True)
+        self.lock_path = os.path.join(self.root, "write.lock")
+
+    # --- READ SIDE ---
+    def _generation(self):
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as f:
+                return os.path.join(self.root, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def _tickers(self, gen):
+        if gen is None:
+            return []
+        with open(os.path.join(gen, "meta.json")) as f:
+            return json.load(f)['tickers']
+
+    def _n_rows(self, gen):
+        return os.path.getsize(os.path.join(gen, "dates.i8")) // 8
+
+    def _dates(self, gen, n):
+        if gen is None or n == 0:
+            return np.array([], dtype='datetime64[D]')
+        days = np.memmap(os.path.join(gen, "dates.i8"), dtype=np.int64, mode='r', shape=(n,))
+        return days.astype('datetime64[D]')
+
+    def _column(self, gen, field, n, width, last_n=None):
+        if gen is None:
+            return np.empty((0, 0))
+        if n == 0 or width == 0:
+            return np.empty((0, width))
+        data = np.memmap(os.path.join(gen, f"{field.lower()}.f8"), dtype=np.float64,
+                         mode='r', shape=(n, width))
+        return data[-last_n:] if last_n else data
+
+    # Each public read resolves CURRENT once, so a concurrent generation
+    # flip can't mix one generation's row count with another's tickers.
+    @property
+    def tickers(self):
+        return self._tickers(self._generation())
+
+    @property
+    def dates(self):
+        gen = self._generation()
+        return self._dates(gen, 0 if gen is None else self._n_rows(gen))
+
+    def __len__(self):
+        gen = self._generation()
+        return 0 if gen is None else self._n_rows(gen)
+
+    def column(self, field, last_n=None):
+        """
+        Zero-copy (dates x tickers) view of one field. last_n limits to the
+        most recent rows (still a view).
+        """
+        gen = self._generation()
+        if gen is None:
+            return np.empty((0, 0))
+        return self._column(gen, field, self._n_rows(gen), len(self._tickers(gen)), last_n)
+
+    def to_panel(self, last_n=None):
+        """
+        Wraps the memmaps in a PricePanel (DataFrames over the same buffers).
+        """
+        return self._panel(self._generation(), last_n)
+
+    def _panel(self, gen, last_n=None):
+        tickers = self._tickers(gen)
+        n = 0 if gen is None else self._n_rows(gen)
+        dates = self._dates(gen, n)
+        if last_n:
+            dates = dates[-last_n:]
+        index = pd.DatetimeIndex(dates.astype('datetime64[ns]'))
+        frames = {
+            f: pd.DataFrame(self._column(gen, f, n, len(tickers), last_n), index=index,
+                            columns=tickers, copy=False)
+            for f in self.FIELDS
+        }
+        return PricePanel(frames)
+
+    # --- WRITE SIDE ---
+    @staticmethod
+    def _to_days(index):
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.normalize().values.astype('datetime64[D]').astype(np.int64)
+
+    def write_panel(self, panel):
+        """
+        (Re)builds the store from a full PricePanel into a new generation,
+        then flips CURRENT. Used for the first backfill and when the ticker
+        set grows.
+        """
+        with _WriterLock(self.lock_path):
+            self._write_generation(panel)
+
+    def _write_generation(self, panel):
+        old = self._generation()
+        n = int(os.path.basename(old).split('-')[1]) + 1 if old else 0
+        name = f"gen-{n:06d}"
+        gen = os.path.join(self.root, name)
+        os.makedirs(gen, exist_ok=True)
+
+        close = panel.close.sort_index()
+        tickers = list(close.columns)
+        for field in self.FIELDS:
+            frame = panel.frames[field].reindex(index=close.index, columns=tickers)
+            np.ascontiguousarray(frame.to_numpy(dtype=np.float64)).tofile(os.path.join(gen, f"{field.lower()}.f8"))
+        with open(os.path.join(gen, "meta.json"), 'w') as f:
+            json.dump({'tickers': tickers}, f)
+        self._to_days(close.index).tofile(os.path.join(gen, "dates.i8"))
+
+        tmp = os.path.join(self.root, "CURRENT.tmp")
+        with open(tmp, 'w') as f:
+            f.write(name)
+        os.replace(tmp, os.path.join(self.root, "CURRENT"))
+
+        if old:
+            # Readers that still map the old files keep them alive on POSIX;
+            # on Windows the delete just fails and is retried next rebuild.
+            for stale in os.listdir(self.root):
+                path = os.path.join(self.root, stale)
+                if stale.startswith("gen-") and path != gen:
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def _merge_new(self, fresh):
+        """
+        Adds fresh's tickers that the store still lacks, on the store's own
+        dates. The caller holds the writer lock, so the read-merge-rewrite
+        can't drop a bar appended by another process.
+        """
+        current = self._panel(self._generation())
+        missing = [t for t in fresh.close.columns if t not in set(current.close.columns)]
+        if not missing:
+            return
+        merged = PricePanel({
+            f: pd.concat([current.frames[f], fresh.frames[f][missing].reindex(current.close.index)], axis=1)
+            for f in self.FIELDS
+        })
+        self._write_generation(merged)
+
+    def append_panel(self, panel):
+        """
+        Appends bars newer than the last stored date (usually exactly one
+        per ticker per day). A bar for the last stored date overwrites that
+        row, so re-running intraday is safe.
+        """
+        with _WriterLock(self.lock_path):
+            gen = self._generation()
+            tickers = self._tickers(gen)
+            n = self._n_rows(gen)
+            last_day = self._dates(gen, n)[-1].astype(np.int64) if n else None
+
+            days = self._to_days(panel.close.index)
+            appended = 0
+            for i, day in enumerate(days):
+                if last_day is not None and day < last_day:
+                    continue
+
+                rows = {
+                    f: panel.frames[f].iloc[i].reindex(tickers).to_numpy(dtype=np.float64)
+                    for f in self.FIELDS
+                }
+                if last_day is not None and day == last_day:
+                    for field, row in rows.items():
+                        data = np.memmap(os.path.join(gen, f"{field.lower()}.f8"), dtype=np.float64,
+                                         mode='r+', shape=(n, len(tickers)))
+                        data[-1] = np.where(np.isnan(row), data[-1], row)
+                        data.flush()
+                    continue
+
+                # Field rows first; the date append is the commit point
+                for field, row in rows.items():
+                    path = os.path.join(gen, f"{field.lower()}.f8")
+                    with open(path, 'r+b') as f:
+                        f.seek(n * len(tickers) * 8)  # Drop any torn tail from a crash
+                        f.write(row.tobytes())
+                        f.truncate()
+                with open(os.path.join(gen, "dates.i8"), 'ab') as f:
+                    f.write(np.int64(day).tobytes())
+                n += 1
+                last_day = day
+                appended += 1
+            return appended
+
+    @staticmethod
+    def update_period(last_date, today=None):
+        """
+        Smallest download period that reaches back to the last stored bar,
+        so missed days are fetched instead of leaving a hole.
+        """
+        today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+        gap = (today - pd.Timestamp(last_date)).days
+        for max_days, period in PRICE_UPDATE_PERIODS:
+            if max_days is None or gap <= max_days:
+                return period
+        return PRICE_UPDATE_PERIODS[-1][1]
+
+    def sync(self, tickers, provider=None, today=None):
+        """
+        Daily update: a full backfill only for tickers the store has never
+        seen, then everyone's bars since the last stored date (a few days
+        on a daily run), appended in place.
+        """
+        tickers = list(tickers)
+        known = set(self.tickers)
+
+        if len(self) == 0:
+            panel = PriceHistoryLoader(tickers, period=PRICE_HISTORY_PERIOD, provider=provider).load()
+            if len(panel.close.index):
+                with _WriterLock(self.lock_path):
+                    if len(self) == 0:
+                        self._write_generation(panel)
+                    else:
+                        # Another process built the store while we downloaded
+                        self._merge_new(panel)
+            print(f"✔ Price store built: {len(self)} days x {len(self.tickers)} stocks")
+            return
+
+        new = [t for t in tickers if t not in known]
+        if new:
+            print(f"--- ➕ Backfilling {len(new)} new stocks into the price store ---")
+            fresh = PriceHistoryLoader(new, period=PRICE_HISTORY_PERIOD, provider=provider).load()
+            with _WriterLock(self.lock_path):
+                self._merge_new(fresh)
+
+        last_date = self.dates[-1]
+        recent = PriceHistoryLoader(tickers, period=self.update_period(last_date, today), provider=provider).load()
+        if len(recent.close.index):
+            if self._to_days(recent.close.index[:1])[0] > last_date.astype(np.int64):
+                print(f"⚠ Price store: download starts {recent.close.index[0]:%Y-%m-%d}, after the last "
+                      f"stored bar ({last_date}); bars in between are missing")
+            appended = self.append_panel(recent)
+            print(f"✔ Price store updated: +{appended} day(s), {len(self)} days x {len(self.tickers)} stocks")
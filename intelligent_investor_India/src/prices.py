@@ -0,0 +1,102 @@
+import pandas as pd
+from config.settings import PRICE_HISTORY_PERIOD, PRICE_BATCH_SIZE
+from src.providers import get_provider
+
+class PricePanel:
+    FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, frames):
+        """
+        frames: {'Close': DataFrame(dates x tickers), 'Volume': ..., ...}
+        All frames share one date index and one ticker column order.
+        """
+        self.frames = frames
+
+    @property
+    def close(self):
+        return self.frames['Close']
+
+    @property
+    def volume(self):
+        return self.frames['Volume']
+
+    @property
+    def tickers(self):
+        return self.close.columns
+
+    def __contains__(self, ticker):
+        return ticker in self.close.columns
+
+    def __len__(self):
+        return len(self.close.columns)
+
+    def latest_stats(self):
+        """
+        Last close + 50/200-DMA per ticker, computed from the bars themselves.
+        Tickers with too little history get NaN for that average.
+        """
+        close = self.close
+        return pd.DataFrame({
+            'price': close.ffill().iloc[-1],
+            '50_dma': close.rolling(50, min_periods=50).mean().ffill().iloc[-1],
+            '200_dma': close.rolling(200, min_periods=200).mean().ffill().iloc[-1],
+        })
+
+    @classmethod
+    def from_download(cls, raw, tickers):
+        """
+        Normalises a yf.download() frame into one aligned frame per field.
+        """
+        if raw is None or raw.empty:
+            return cls({f: pd.DataFrame(columns=list(tickers), dtype=float) for f in cls.FIELDS})
+
+        if not isinstance(raw.columns, pd.MultiIndex):
+            # Single-ticker downloads come back flat
+            raw = pd.concat({tickers[0]: raw}, axis=1).swaplevel(axis=1)
+
+        frames = {}
+        for field in cls.FIELDS:
+            if field in raw.columns.get_level_values(0):
+                frames[field] = raw[field].reindex(columns=list(tickers)).astype(float)
+            else:
+                frames[field] = pd.DataFrame(index=raw.index, columns=list(tickers), dtype=float)
+        return cls(frames)
+
+    @classmethod
+    def concat(cls, panels):
+        panels = [p for p in panels if len(p.close.index)]
+        if not panels:
+            return cls({f: pd.DataFrame(dtype=float) for f in cls.FIELDS})
+        return cls({
+            f: pd.concat([p.frames[f] for p in panels], axis=1).sort_index()
+            for f in cls.FIELDS
+        })
+
+
+class PriceHistoryLoader:
+    def __init__(self, tickers, period=PRICE_HISTORY_PERIOD, batch_size=PRICE_BATCH_SIZE, provider=None):
+        self.tickers = list(tickers)
+        self.period = period
+        self.batch_size = batch_size
+        self.provider = provider or get_provider()
+
+    def load(self):
+        """
+        Pulls daily OHLCV for the whole universe in a handful of batched
+        requests (instead of one history() call per stock).
+        """
+        print(f"--- 📈 Downloading {self.period} price history for {len(self.tickers)} stocks "
+              f"({self.batch_size} per request)... ---")
+        panels = []
+        for i in range(0, len(self.tickers), self.batch_size):
+            batch = self.tickers[i:i + self.batch_size]
+            try:
+                raw = self.provider.download_history(batch, period=self.period)
+                panels.append(PricePanel.from_download(raw, batch))
+            except Exception as e:
+                print(f"❌ Error downloading prices for batch {i // self.batch_size + 1}: {e}")
+
+        panel = PricePanel.concat(panels)
+        have = int(panel.close.notna().any().sum()) if len(panel) else 0
+        print(f"✔ Price history ready for {have}/{len(self.tickers)} stocks")
+        return panel
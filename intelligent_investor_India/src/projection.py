@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from config.settings import (PROJECTION_ASSUMPTIONS, PROJECTION_CORRELATION, PROJECTION_PATHS, PROJECTION_SEED,
+                             PROJECTION_PERCENTILES)
+
+class GoalProjector:
+    def __init__(self, allocation, assumptions=PROJECTION_ASSUMPTIONS, correlation=PROJECTION_CORRELATION,
+                 paths=PROJECTION_PATHS, seed=PROJECTION_SEED):
+        """
+        Monte Carlo wealth projection for a PersonalizationEngine allocation
+        ({'Stocks': %, 'Mutual_Funds': %, 'Safe_Debt_Gold': %}).
+        Each bucket has lognormal monthly returns (correlated via Cholesky);
+        the mix is rebalanced monthly, and SIPs go in at the start of
+        each month.
+        """
+        self.assets = list(assumptions)
+        weights = np.array([allocation.get(a, 0) for a in self.assets], dtype=np.float64)
+        self.weights = weights / weights.sum() if weights.sum() > 0 else weights
+        mu, sigma = np.array([assumptions[a] for a in self.assets], dtype=np.float64).T
+        # Monthly log-return drift/vol whose annual compounding has mean 1 + mu and std sigma
+        sigma_log = np.sqrt(np.log1p((sigma / (1 + mu)) ** 2))
+        self.sigma_m = sigma_log / np.sqrt(12)
+        self.drift_m = (np.log1p(mu) - 0.5 * sigma_log ** 2) / 12
+        self.chol = np.linalg.cholesky(np.asarray(correlation, dtype=np.float64))
+        self.paths = paths
+        self.seed = seed
+
+    def simulate(self, initial, monthly_sip, years, sip_step_up=0.0):
+        """
+        (paths x years+1) wealth at each year end (column 0 = today), plus
+        the total contributed by each year end. One year of months at a
+        time, all paths at once (antithetic pairs): within a year
+        W_12 = P_12 * (W_0 + sip * sum(1 / P_{j-1})), P = cumulative growth.
+        """
+        rng = np.random.default_rng(self.seed)
+        wealth = np.empty((self.paths, years + 1))
+        wealth[:, 0] = initial
+        invested = np.empty(years + 1)
+        invested[0] = initial
+        sip = float(monthly_sip)
+
+        for year in range(1, years + 1):
+            # Antithetic draws: half the random numbers, mirrored (also lowers the noise)
+            half = rng.standard_normal((-(-self.paths // 2) * 12, len(self.assets)))
+            z = np.concatenate([half, -half])[:self.paths * 12] @ self.chol.T
+            growth = (np.exp(self.drift_m + self.sigma_m * z) @ self.weights).reshape(self.paths, 12)
+            cumulative = np.cumprod(growth, axis=1)
+            before = np.concatenate([np.ones((self.paths, 1)), cumulative[:, :-1]], axis=1)
+            wealth[:, year] = cumulative[:, -1] * (wealth[:, year - 1] + sip * (1 / before).sum(axis=1))
+            invested[year] = invested[year - 1] + 12 * sip
+            sip *= 1 + sip_step_up
+        return wealth, invested
+
+    def project(self, initial, monthly_sip, years, goal=None, sip_step_up=0.0, percentiles=PROJECTION_PERCENTILES):
+        """
+        Percentile wealth bands per year and the chance of ending with at
+        least `goal` (nominal ₹) after `years`. sip_step_up raises the SIP
+        by that fraction every year (e.g. 0.10 = +10%/yr).
+        """
+        years = int(years)
+        wealth, invested = self.simulate(initial, max(float(monthly_sip), 0.0), years, sip_step_up)
+        bands = pd.DataFrame(np.percentile(wealth, percentiles, axis=0).T,
+                             columns=[f"p{p}" for p in percentiles], index=pd.RangeIndex(years + 1, name='year'))
+        bands['invested'] = invested
+
+        final = wealth[:, -1]
+        return {
+            'bands': bands,
+            'probability': float((final >= goal).mean()) if goal else None,
+            'median': float(np.median(final)),
+            'invested': float(invested[-1]),
+            'shortfall_risk': float((final < invested[-1]).mean()),   # Ending below what was put in
+        }
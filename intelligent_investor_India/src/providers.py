@@ -0,0 +1,179 @@
+import hashlib
+import os
+import pickle
+import random
+import re
+import time
+from config.settings import MARKET_DATA_MODE, RECORDINGS_DIR, REPLAY_LATENCY
+
+class MarketDataProvider:
+    """
+    The single gateway to market data. Every engine goes through one of these
+    instead of importing yfinance directly, so the backend can be swapped
+    (live / recording / offline replay).
+    """
+    def get_info(self, ticker):
+        raise NotImplementedError
+
+    def get_history(self, ticker, period="3mo"):
+        raise NotImplementedError
+
+    def get_financials(self, ticker):
+        raise NotImplementedError
+
+    def get_balance_sheet(self, ticker):
+        raise NotImplementedError
+
+    def get_cashflow(self, ticker):
+        raise NotImplementedError
+
+    def get_news(self, ticker):
+        raise NotImplementedError
+
+    def download_history(self, tickers, period="1y"):
+        """
+        Daily OHLCV for many tickers in ONE request.
+        Returns a yf.download()-style frame with (field, ticker) columns.
+        """
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    def __init__(self):
+        # Imported here so replay mode works on machines without yfinance
+        import yfinance as yf
+        self.yf = yf
+
+    def get_info(self, ticker):
+        return self.yf.Ticker(ticker).info
+
+    def get_history(self, ticker, period="3mo"):
+        return self.yf.Ticker(ticker).history(period=period)
+
+    def get_financials(self, ticker):
+        return self.yf.Ticker(ticker).financials
+
+    def get_balance_sheet(self, ticker):
+        return self.yf.Ticker(ticker).balance_sheet
+
+    def get_cashflow(self, ticker):
+        return self.yf.Ticker(ticker).cashflow
+
+    def get_news(self, ticker):
+        return self.yf.Ticker(ticker).news
+
+    def download_history(self, tickers, period="1y"):
+        return self.yf.download(list(tickers), period=period, interval="1d", group_by="column",
+                                auto_adjust=False, threads=True, progress=False)
+
+
+def _recording_path(root, method, *args):
+    """
+    data/recordings/<method>/<readable-key>-<hash>.pkl
+    """
+    key = "|".join(str(a) for a in args)
+    safe = re.sub(r'[^A-Za-z0-9._-]+', '_', key)[:80]
+    digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+    return os.path.join(root, method, f"{safe}-{digest}.pkl")
+
+
+class RecordingProvider(MarketDataProvider):
+    def __init__(self, inner, root=RECORDINGS_DIR):
+        """
+        Wraps another provider and pickles every response it returns.
+        """
+        self.inner = inner
+        self.root = str(root)
+
+    def _record(self, method, *args):
+        result = getattr(self.inner, method)(*args)
+
+        path = _recording_path(self.root, method, *args)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(result, f)
+        os.replace(tmp, path)  # Atomic: readers never see half a file
+        return result
+
+    def get_info(self, ticker):
+        return self._record('get_info', ticker)
+
+    def get_history(self, ticker, period="3mo"):
+        return self._record('get_history', ticker, period)
+
+    def get_financials(self, ticker):
+        return self._record('get_financials', ticker)
+
+    def get_balance_sheet(self, ticker):
+        return self._record('get_balance_sheet', ticker)
+
+    def get_cashflow(self, ticker):
+        return self._record('get_cashflow', ticker)
+
+    def get_news(self, ticker):
+        return self._record('get_news', ticker)
+
+    def download_history(self, tickers, period="1y"):
+        return self._record('download_history', tuple(tickers), period)
+
+
+class ReplayProvider(MarketDataProvider):
+    def __init__(self, root=RECORDINGS_DIR, latency=REPLAY_LATENCY, jitter=0.0, seed=None):
+        """
+        Serves responses saved by RecordingProvider. Never touches the network.
+        latency/jitter (seconds) simulate a remote API so concurrency changes
+        can be benchmarked repeatably offline.
+        """
+        self.root = str(root)
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+
+    def _replay(self, method, *args):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+
+        path = _recording_path(self.root, method, *args)
+        if not os.path.exists(path):
+            raise LookupError(f"No recording for {method}{args}")
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def get_info(self, ticker):
+        return self._replay('get_info', ticker)
+
+    def get_history(self, ticker, period="3mo"):
+        return self._replay('get_history', ticker, period)
+
+    def get_financials(self, ticker):
+        return self._replay('get_financials', ticker)
+
+    def get_balance_sheet(self, ticker):
+        return self._replay('get_balance_sheet', ticker)
+
+    def get_cashflow(self, ticker):
+        return self._replay('get_cashflow', ticker)
+
+    def get_news(self, ticker):
+        return self._replay('get_news', ticker)
+
+    def download_history(self, tickers, period="1y"):
+        return self._replay('download_history', tuple(tickers), period)
+
+
+_default_provider = None
+
+def get_provider():
+    """
+    Returns the process-wide provider selected by MARKET_DATA_MODE.
+    """
+    global _default_provider
+    if _default_provider is None:
+        if MARKET_DATA_MODE == 'replay':
+            _default_provider = ReplayProvider()
+        elif MARKET_DATA_MODE == 'record':
+            _default_provider = RecordingProvider(YFinanceProvider())
+        else:
+            _default_provider = YFinanceProvider()
+    return _default_provider
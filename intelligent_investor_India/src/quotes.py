@@ -0,0 +1,104 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from config.settings import QUOTE_TTL_SECONDS, QUOTE_PERIOD, USE_CACHE, UNLISTED_HOLDING_TYPES
+from src.cache import QuoteCache
+from src.prices import PricePanel
+from src.providers import get_provider
+
+class QuoteService:
+    _memory = {}   # symbol -> (price, fetched_at); shared by every service in the process
+    _next_attempt = {}   # symbol -> earliest time to re-ask after a failed/unpriced fetch
+    _lock = threading.Lock()
+
+    def __init__(self, provider=None, ttl=QUOTE_TTL_SECONDS, use_cache=USE_CACHE):
+        """
+        Last prices for any set of tickers. Quotes younger than `ttl`
+        seconds come from memory, then from the SQLite cache; everything
+        else is fetched in ONE batched download. There is deliberately no
+        per-ticker fallback: a symbol the batch can't price keeps its last
+        known quote (any age, with its real fetch time), or NaN, and isn't
+        re-asked until the TTL passes.
+        """
+        self.provider = provider or get_provider()
+        self.ttl = ttl
+        self.cache = QuoteCache() if use_cache else None
+
+    @staticmethod
+    def normalize(ticker):
+        ticker = str(ticker).strip().upper()
+        if not ticker.endswith('.NS') and not ticker.endswith('.BO'):
+            return f"{ticker}.NS"
+        return ticker
+
+    def _download(self, symbols):
+        raw = self.provider.download_history(symbols, period=QUOTE_PERIOD)
+        close = PricePanel.from_download(raw, symbols).close.ffill()
+        if close.empty:
+            return {}
+        last = close.iloc[-1]
+        return {s: float(p) for s, p in last.items() if pd.notna(p) and p > 0}
+
+    def get_quotes(self, tickers, now=None):
+        """
+        Series of last prices indexed by the tickers as given
+        ('TCS' and 'TCS.NS' share one quote).
+        """
+        now = now or time.time()
+        tickers = list(tickers)
+        symbols = list(dict.fromkeys(self.normalize(t) for t in tickers))
+
+        with self._lock:
+            quotes = {s: self._memory[s] for s in symbols if s in self._memory}
+        if self.cache is not None:
+            missing = [s for s in symbols if s not in quotes or now - quotes[s][1] >= self.ttl]
+            for s, (price, fetched_at) in self.cache.load(missing).items():
+                if s not in quotes or fetched_at > quotes[s][1]:
+                    quotes[s] = (price, fetched_at)
+
+        stale = [s for s in symbols if s not in quotes or now - quotes[s][1] >= self.ttl]
+        with self._lock:
+            due = [s for s in stale if self._next_attempt.get(s, 0) <= now]
+        if due:
+            try:
+                fetched = self._download(due)
+            except Exception as e:
+                print(f"⚠ Quote download failed ({e}). Using last known prices.")
+                fetched = {}
+            print(f"⚡ Quotes: {len(symbols) - len(stale)} cached, {len(fetched)}/{len(due)} fetched in one batch")
+            if self.cache is not None:
+                self.cache.store(fetched, now)
+            quotes.update({s: (p, now) for s, p in fetched.items()})
+            # Unpriced symbols keep their last quote and its age, but aren't re-asked until the TTL passes
+            with self._lock:
+                for s in due:
+                    if s in fetched:
+                        self._next_attempt.pop(s, None)
+                    else:
+                        self._next_attempt[s] = now + self.ttl
+
+        with self._lock:
+            for s, quote in quotes.items():
+                if s not in self._memory or quote[1] >= self._memory[s][1]:
+                    self._memory[s] = quote
+        return pd.Series([quotes.get(self.normalize(t), (np.nan, 0))[0] for t in tickers],
+                         index=tickers, dtype=np.float64)
+
+    def holding_prices(self, holdings, extra_tickers=()):
+        """
+        Last price per holdings.csv row. Exchange-listed rows (and any extra
+        tickers) are quoted in one batch; mutual funds have no symbol and are
+        never quoted. Unquoted rows fall back to the CSV's own price columns.
+        """
+        fallback = pd.Series(np.nan, index=holdings.index)
+        for col in ['Previous Closing Price', 'CurrentPrice', 'AvgPrice']:
+            if col in holdings.columns:
+                fallback = fallback.fillna(pd.to_numeric(holdings[col], errors='coerce'))
+
+        listed = ~holdings['Type'].isin(UNLISTED_HOLDING_TYPES).to_numpy() if 'Type' in holdings.columns \
+            else np.ones(len(holdings), dtype=bool)
+        held = list(holdings['Ticker'].astype(str).to_numpy()[listed])
+        quotes = np.full(len(holdings), np.nan)
+        quotes[listed] = self.get_quotes(held + list(extra_tickers)).to_numpy()[:len(held)]
+        return np.where(np.isnan(quotes), fallback.to_numpy(dtype=np.float64), quotes)
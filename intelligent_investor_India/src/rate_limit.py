@@ -0,0 +1,48 @@
+import threading
+import time
+
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        """
+        Thread-safe token bucket: on average `rate` calls per second, with
+        up to `burst` calls allowed back to back. Callers only wait when
+        they are actually over the limit (unlike a fixed sleep per call).
+        """
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available, then takes it.
+        Returns the seconds spent waiting.
+        """
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name, rate, burst=1):
+    """
+    One limiter per API name, shared by every engine and thread in the process.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(rate, burst)
+        return _limiters[name]
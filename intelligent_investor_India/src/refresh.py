@@ -0,0 +1,248 @@
+import os
+import time
+import pandas as pd
+from config.settings import SNAPSHOT_PATH, DEFAULT_TTL_HOURS, PRICE_DERIVED_FIELDS, SCORING_MODE, QUALITY_SCORE_SOURCE
+from src.data_loader import FundamentalLoader
+from src.technical import TechnicalEngine
+from src.valuation import ValuationEngine
+from src.piotroski import configured_f_scores
+from src.scoring_rules import get_rules
+
+class IncrementalRefresher:
+    def __init__(self, tickers, snapshot_path=SNAPSHOT_PATH, panel=None, store=None, loader_cls=FundamentalLoader, **loader_kwargs):
+        """
+        Keeps the last universe snapshot (raw fundamentals + scores) on disk
+        and only refetches / re-scores the tickers that actually changed.
+
+        With a bulk PricePanel (or a PriceStore), price-driven fields are
+        re-derived from the latest close, so only genuinely stale
+        fundamentals hit the network.
+        """
+        self.tickers = list(tickers)
+        self.snapshot_path = snapshot_path
+        self.panel = panel
+        self.store = store
+        self.loader_cls = loader_cls
+        self.loader_kwargs = loader_kwargs
+        self._tech_engine = None
+
+    def price_source(self):
+        """
+        The panel that supplies today's prices (the given panel, else the
+        store's), or None if neither has any bars.
+        """
+        if self.panel is not None and len(self.panel):
+            return self.panel
+        if self.store is not None and len(self.store):
+            if self.panel is None:
+                self.panel = self.store.to_panel()
+            return self.panel if len(self.panel) else None
+        return None
+
+    def load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            return pd.read_pickle(self.snapshot_path)
+        except Exception as e:
+            print(f"⚠ Could not read snapshot ({e}). Doing a full refresh.")
+            return None
+
+    def save_snapshot(self, df_raw, df_scored, errors):
+        snapshot = {
+            'raw': df_raw,
+            'scored': df_scored,
+            'errors': sorted(errors),
+            'rules': self.scoring_key(),
+            'saved_at': time.time()
+        }
+        tmp = f"{self.snapshot_path}.tmp"
+        pd.to_pickle(snapshot, tmp)
+        os.replace(tmp, self.snapshot_path)
+
+    def find_stale(self, snapshot, loader):
+        """
+        Tickers that are new to the universe, errored last time, or whose
+        cached fields have expired.
+        """
+        known = set(snapshot['raw'].index)
+        errored = set(snapshot['errors'])
+
+        # Price fields are refreshed from the panel/store, so their TTL doesn't matter
+        ignore = PRICE_DERIVED_FIELDS if self.price_source() is not None else ()
+
+        if loader.cache is not None:
+            _, expired = loader.cache.split_fresh(self.tickers, ignore_fields=ignore)
+            expired = set(expired)
+        elif time.time() - snapshot['saved_at'] > DEFAULT_TTL_HOURS * 3600:
+            expired = set(self.tickers)
+        else:
+            expired = set()
+
+        return [t for t in self.tickers if t not in known or t in errored or t in expired]
+
+    @staticmethod
+    def changed_rows(df_old, df_new, columns=None):
+        """
+        Index of rows in df_new that are new or differ from df_old in
+        `columns` (default: all of them; NaN == NaN).
+        """
+        common = df_new.index.intersection(df_old.index)
+        new_rows = df_new.index.difference(df_old.index)
+
+        columns = df_new.columns if columns is None else [c for c in columns if c in df_new.columns]
+        a = df_new.loc[common, columns]
+        b = df_old.loc[common].reindex(columns=a.columns)
+        same = ((a == b) | (a.isna() & b.isna())).all(axis=1)
+
+        return new_rows.append(same.index[~same])
+
+    @staticmethod
+    def reprice(df_raw, panel):
+        """
+        Rolls price-driven fields forward to the panel's latest close.
+        Ratios like P/E scale with price (earnings/book unchanged between
+        reports); yield scales inversely.
+        """
+        return IncrementalRefresher.reprice_to(df_raw, panel.latest_stats().reindex(df_raw.index))
+
+    @staticmethod
+    def reprice_to(df_raw, stats):
+        """
+        Same as reprice, from price/50_dma/200_dma given row by row
+        (stats shares df_raw's index; NaN keeps the snapshot value).
+        """
+        df = df_raw.copy()
+        if df.empty or 'price' not in df.columns:
+            return df
+
+        old_price = pd.to_numeric(df['price'], errors='coerce')
+        new_price = stats['price'].fillna(old_price)
+        ratio = (new_price / old_price).fillna(1)
+
+        for col in ['market_cap', 'trailing_pe', 'forward_pe', 'peg_ratio', 'price_to_book']:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce') * ratio
+        if 'dividend_yield' in df.columns:
+            df['dividend_yield'] = pd.to_numeric(df['dividend_yield'], errors='coerce') / ratio
+
+        df['price'] = new_price
+        for col in ['50_dma', '200_dma']:
+            if col in df.columns:
+                df[col] = stats[col].fillna(pd.to_numeric(df[col], errors='coerce'))
+        return df
+
+    @staticmethod
+    def scoring_key():
+        return f"{get_rules().digest}:{SCORING_MODE}:{QUALITY_SCORE_SOURCE}"
+
+    def technical_engine(self):
+        # One engine per refresh, so the universe indicators are computed once
+        if self._tech_engine is None:
+            self._tech_engine = TechnicalEngine(panel=self.panel, store=self.store)
+        return self._tech_engine
+
+    def score(self, df_raw):
+        """
+        The same Technical -> Valuation pipeline main.py runs on the full universe.
+        In 'absolute' mode every score is row-local, so scoring a subset
+        gives identical rows.
+        """
+        df_raw = df_raw.copy()
+        df_tech = self.technical_engine().add_technical_indicators(df_raw)
+
+        val_engine = ValuationEngine(df_raw, f_scores=configured_f_scores(df_raw.index))
+        val_engine.clean_data()
+        return val_engine.get_blended_score(df_tech)
+
+    def rescore_prices(self, df_scored, df_raw):
+        """
+        Cheap re-score for rows whose only change is the close ('absolute'
+        mode): technicals, the price-driven fields and the value / snapshot
+        quality buckets are re-derived; statement F-scores and everything
+        else on the scored row are kept. Same rows as score() would give,
+        without its statement lookups.
+        """
+        df = df_raw.copy()
+        df_tech = self.technical_engine().add_technical_indicators(df)
+        val_engine = ValuationEngine(df, quality_source='snapshot')
+        cleaned = val_engine.clean_data()
+
+        out = df_scored.reindex(df.index).copy()
+        tech_cols = [c for c in df_tech.columns if c not in df_raw.columns or c in PRICE_DERIVED_FIELDS]
+        for col in tech_cols:
+            out[col] = cleaned[col]
+        out['value_score'] = val_engine.rules.value_score(cleaned)
+        snapshot_quality = out['quality_source'] != 'piotroski' if 'quality_source' in out.columns \
+            else pd.Series(True, index=out.index)
+        out['quality_score'] = out['quality_score'].where(~snapshot_quality, val_engine.rules.quality_score(cleaned))
+        out['total_score'] = val_engine.rules.blended(out)
+        return out
+
+    def run(self):
+        """
+        Returns (df_raw, df_scored) for the whole universe.
+
+        Only stale tickers are refetched, and only rows with new
+        fundamentals go through the full scoring pipeline. Rows whose
+        only change is the close take the cheap rescore_prices path.
+        Percentile mode and edited scoring rules re-score everything.
+        """
+        self._tech_engine = None
+        loader = self.loader_cls(self.tickers, **self.loader_kwargs)
+        snapshot = self.load_snapshot()
+
+        if snapshot is None:
+            print("--- 🔄 FULL REFRESH (no previous snapshot) ---")
+            df_raw = loader.get_key_stats()
+            errors = set(self.tickers) - set(df_raw.index)
+            if self.price_source() is not None and not df_raw.empty:
+                df_raw = self.reprice(df_raw, self.price_source())
+            df_scored = self.score(df_raw) if not df_raw.empty else df_raw
+            self.save_snapshot(df_raw, df_scored, errors)
+            return df_raw, df_scored
+
+        stale = self.find_stale(snapshot, loader)
+        print(f"--- 🔄 INCREMENTAL REFRESH: {len(stale)}/{len(self.tickers)} stocks need refetching ---")
+
+        df_old_raw = snapshot['raw']
+        if stale:
+            loader.tickers = stale
+            df_fetched = loader.get_key_stats()
+        else:
+            df_fetched = df_old_raw.iloc[0:0]
+        errors = set(stale) - set(df_fetched.index)
+
+        # --- MERGE: old rows, overwritten by fresh ones, limited to today's universe ---
+        df_raw = pd.concat([df_old_raw.drop(df_fetched.index, errors='ignore'), df_fetched])
+        df_raw = df_raw.reindex([t for t in self.tickers if t in df_raw.index])
+        if self.price_source() is not None and not df_raw.empty:
+            df_raw = self.reprice(df_raw, self.price_source())
+
+        # Fundamentals drive the full re-score; a new close only needs the cheap path
+        df_old_scored = snapshot['scored']
+        fundamentals = [c for c in df_raw.columns if c not in PRICE_DERIVED_FIELDS]
+        changed = self.changed_rows(df_old_raw, df_raw, fundamentals)
+        changed = changed.append(df_raw.index.difference(df_old_scored.index).difference(changed))
+        repriced = self.changed_rows(df_old_raw, df_raw, PRICE_DERIVED_FIELDS).difference(changed)
+        print(f"  ✔ {len(changed)} stocks with new fundamentals, {len(repriced)} only repriced.")
+        if snapshot.get('rules') != self.scoring_key():
+            # Scoring rules/mode were edited: re-score everything (still no refetch)
+            print("  ↻ Scoring rules changed since last run.")
+            changed, repriced = df_raw.index, df_raw.index[:0]
+        elif SCORING_MODE == 'percentile' and len(changed) + len(repriced):
+            # Percentiles depend on every peer, so any change re-ranks all rows
+            changed, repriced = df_raw.index, df_raw.index[:0]
+        print(f"  ✔ Re-scoring {len(changed)}/{len(df_raw)} stocks, repricing {len(repriced)}.")
+
+        parts = [df_old_scored.drop(changed.append(repriced), errors='ignore')]
+        if len(changed):
+            parts.append(self.score(df_raw.loc[changed]))
+        if len(repriced):
+            parts.append(self.rescore_prices(df_old_scored, df_raw.loc[repriced]))
+        df_scored = pd.concat(parts) if len(parts) > 1 else df_old_scored
+        df_scored = df_scored[df_scored.index.isin(df_raw.index)]
+        df_scored = df_scored.sort_values(by='total_score', ascending=False)
+
+        self.save_snapshot(df_raw, df_scored, errors)
+        return df_raw, df_scored
@@ -0,0 +1,255 @@
+import os
+import math
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from config.settings import (COV_LOOKBACK_DAYS, COV_MIN_OBS, TRADING_DAYS, RISK_CACHE_DIR, RISK_CACHE_KEEP,
+                             VAR_CONFIDENCE)
+from src.price_store import PriceStore
+from src.quotes import QuoteService
+
+def ledoit_wolf(X):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a scaled
+    identity (Ledoit & Wolf, 2004). X = (observations x assets) returns.
+    Returns (covariance, shrinkage intensity 0..1).
+    Stays well-conditioned even with fewer days than stocks.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n, p = X.shape
+    X = X - X.mean(axis=0)
+    S = X.T @ X / n
+    mu = np.trace(S) / p
+
+    X2 = X ** 2
+    beta = (np.sum(X2.T @ X2) / n - np.sum(S ** 2)) / (n * p)   # Noise in S
+    delta = (np.sum(S ** 2) - 2 * mu * np.trace(S) + p * mu ** 2) / p  # Distance to target
+    beta = min(beta, delta)
+    shrinkage = 0.0 if delta == 0 else beta / delta
+
+    cov = (1 - shrinkage) * S
+    cov[np.diag_indices(p)] += shrinkage * mu
+    return cov, shrinkage
+
+def daily_returns(close, tickers, lookback=COV_LOOKBACK_DAYS):
+    """
+    Daily log returns over the last `lookback` days for `tickers`
+    (columns missing from the close panel come back all-NaN).
+    """
+    close = close.reindex(columns=list(tickers)).iloc[-(lookback + 1):]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.log(close).diff().iloc[1:]
+    return returns.replace([np.inf, -np.inf], np.nan)
+
+def covariance_from_returns(returns, min_obs=COV_MIN_OBS):
+    """
+    Annualised Ledoit-Wolf covariance (ndarray) from a (days x tickers)
+    frame of daily log returns. Stocks with fewer than `min_obs` returns
+    get the median variance and no correlation; the rest have their gaps
+    filled with their mean return. None if no stock has enough history.
+    """
+    enough = (returns.notna().sum() >= min_obs).to_numpy()
+    if not enough.any():
+        return None
+
+    R = returns.loc[:, enough]
+    cov, _ = ledoit_wolf(R.fillna(R.mean()).to_numpy())
+    cov *= TRADING_DAYS
+
+    n = returns.shape[1]
+    full = np.zeros((n, n))
+    idx = np.flatnonzero(enough)
+    full[np.ix_(idx, idx)] = cov
+    short = np.flatnonzero(~enough)
+    full[short, short] = np.median(np.diag(cov))
+    return full
+
+
+class RiskEngine:
+    _memory = {}   # (cache dir, as-of date, lookback) -> state; shared by every engine in the process
+
+    def __init__(self, store=None, lookback=COV_LOOKBACK_DAYS, min_obs=COV_MIN_OBS, cache_dir=RISK_CACHE_DIR,
+                 confidence=VAR_CONFIDENCE):
+        """
+        Portfolio risk from local daily returns (PriceStore). The Ledoit-Wolf
+        covariance for the whole universe is built once per price date and
+        kept in memory and on disk (<cache_dir>/<date>-<lookback>.npz), so
+        analysing another buy list only slices the cached matrix.
+        """
+        self.store = store or PriceStore()
+        self.lookback = lookback
+        self.min_obs = min_obs
+        self.cache_dir = str(cache_dir)
+        self.confidence = confidence   # VaR level, e.g. 0.95 = loss not exceeded on 19 days out of 20
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def normalize(ticker):
+        if not ticker.endswith('.NS') and not ticker.endswith('.BO'):
+            return f"{ticker}.NS"
+        return ticker
+
+    # --- COVARIANCE CACHE ---
+    def _path(self, as_of):
+        return os.path.join(self.cache_dir, f"{as_of:%Y-%m-%d}-{self.lookback}.npz")
+
+    def _build(self, as_of):
+        panel = self.store.to_panel()
+        close = panel.close[panel.close.index <= as_of]
+        tickers = list(close.columns)
+        returns = daily_returns(close, tickers, self.lookback)
+        cov = covariance_from_returns(returns, self.min_obs)
+        if cov is None:
+            cov = np.zeros((len(tickers), len(tickers)))
+        return {
+            'tickers': np.array(tickers, dtype=str),
+            'returns': returns.to_numpy(),
+            'cov': cov,
+        }
+
+    def _save(self, path, state):
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, **state)
+        os.replace(tmp, path)
+        # Keep only the newest few dates
+        files = sorted(f for f in os.listdir(self.cache_dir) if f.endswith(f"-{self.lookback}.npz"))
+        for old in files[:-RISK_CACHE_KEEP]:
+            os.remove(os.path.join(self.cache_dir, old))
+
+    def load(self, as_of=None):
+        """
+        Cached state for a price date (default: the store's latest):
+        tickers, daily log returns, annualised covariance.
+        """
+        dates = self.store.dates
+        if len(dates) == 0:
+            raise ValueError("Local price store is empty; run PriceStore().sync() first")
+        as_of = pd.Timestamp(dates[-1] if as_of is None else dates[dates <= np.datetime64(pd.Timestamp(as_of), 'D')][-1])
+
+        key = (self.cache_dir, as_of, self.lookback)
+        if key not in self._memory:
+            path = self._path(as_of)
+            state = None
+            if os.path.exists(path):
+                with np.load(path) as data:
+                    state = {k: data[k] for k in data.files}
+                # A store rebuilt with another universe invalidates the file
+                if list(state['tickers']) != list(self.store.tickers):
+                    state = None
+            if state is None:
+                print(f"⚡ Risk: building {len(self.store.tickers)}-stock covariance for {as_of:%Y-%m-%d}")
+                state = self._build(as_of)
+                self._save(path, state)
+            state['as_of'] = as_of
+            state['column'] = {t: i for i, t in enumerate(state['tickers'])}
+            self._memory[key] = state
+        return self._memory[key]
+
+    def covariance(self, tickers, as_of=None):
+        """
+        Annualised covariance (DataFrame) for any tickers, sliced from the
+        cached universe matrix. Tickers without local history get the
+        median variance and no correlation. None if no stock has enough.
+        """
+        state = self.load(as_of)
+        if not state['cov'].any():
+            return None
+        tickers = list(tickers)
+        idx = np.array([state['column'].get(self.normalize(t), -1) for t in tickers], dtype=int)
+        known = idx >= 0
+        full = np.zeros((len(tickers), len(tickers)))
+        full[np.ix_(known, known)] = state['cov'][np.ix_(idx[known], idx[known])]
+        full[~known, ~known] = np.median(np.diag(state['cov']))
+        return pd.DataFrame(full, index=tickers, columns=tickers)
+
+    # --- PORTFOLIO RISK ---
+    def positions(self, holdings, buys=None, prices=None):
+        """
+        Rupee value per ticker: holdings.csv rows at `prices` (one per row,
+        normally PortfolioManager.market_prices(), so risk sees the book at
+        the same quotes as the allocation; quoted via QuoteService when
+        omitted) plus a proposed buy list (select_and_allocate's frame,
+        valued at est_cost).
+        """
+        values = []
+        if holdings is not None and not holdings.empty:
+            shares = pd.to_numeric(holdings['Shares'], errors='coerce').fillna(0).to_numpy()
+            if prices is None:
+                prices = QuoteService().holding_prices(holdings)
+            price = np.nan_to_num(np.asarray(prices, dtype=np.float64))
+            values.append(pd.Series(shares * price, index=holdings['Ticker'].astype(str).to_numpy()))
+        if buys is not None and not buys.empty:
+            values.append(pd.Series(pd.to_numeric(buys['est_cost'], errors='coerce').fillna(0).to_numpy(),
+                                    index=buys['ticker'].astype(str).to_numpy()))
+        if not values:
+            return pd.Series(dtype=np.float64)
+        positions = pd.concat(values)
+        return positions.groupby(positions.index.map(self.normalize), sort=False).sum()
+
+    def analyze(self, positions, as_of=None):
+        """
+        Risk of a {ticker: rupee value} portfolio, all from the cached
+        covariance/returns (milliseconds once the date is cached):
+        annualised volatility, 1-day parametric and historical VaR (in ₹),
+        max drawdown of today's weights over the lookback window, and each
+        stock's marginal / total contribution to volatility.
+        Positions without local price history are listed in 'missing'.
+        """
+        state = self.load(as_of)
+        positions = pd.Series(positions, dtype=np.float64)
+        positions = positions[positions > 0]
+        idx = np.array([state['column'].get(self.normalize(t), -1) for t in positions.index], dtype=int)
+        missing = list(positions.index[idx < 0])
+        positions, idx = positions[idx >= 0], idx[idx >= 0]
+
+        value = float(positions.sum())
+        result = {'as_of': state['as_of'], 'value': value, 'missing': missing, 'confidence': self.confidence}
+        if value <= 0:
+            return result
+
+        w = positions.to_numpy() / value
+        C = state['cov'][np.ix_(idx, idx)]
+        vol = math.sqrt(max(w @ C @ w, 0))
+
+        # Historical simulation: today's weights over the lookback's daily returns
+        R = np.expm1(np.nan_to_num(state['returns'][:, idx]))
+        pnl = R @ w
+        equity = np.cumprod(1 + pnl)
+        z = NormalDist().inv_cdf(self.confidence)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            marginal = C @ w / vol if vol > 0 else np.zeros(len(w))
+        contribution = w * marginal
+        result.update({
+            'volatility': vol,
+            'var_parametric': z * vol / math.sqrt(TRADING_DAYS) * value,
+            'var_historical': float(-np.quantile(pnl, 1 - self.confidence) * value) if len(pnl) else float('nan'),
+            'max_drawdown': float((equity / np.maximum.accumulate(equity) - 1).min()) if len(pnl) else float('nan'),
+            'contributions': pd.DataFrame({
+                'value': positions.to_numpy(),
+                'weight': w,
+                'volatility': np.sqrt(np.diag(C)),
+                'marginal': marginal,           # d(vol)/d(weight)
+                'contribution': contribution,   # Sums to the portfolio volatility
+                'pct_of_risk': contribution / vol if vol > 0 else np.zeros(len(w)),
+            }, index=positions.index).sort_values('contribution', ascending=False),
+        })
+        return result
+
+    @staticmethod
+    def report(result):
+        print(f"\n--- ⚖️ PORTFOLIO RISK (as of {result['as_of']:%Y-%m-%d}) ---")
+        if 'volatility' not in result:
+            print("  ℹ Nothing with local price history to measure.")
+            return
+        level = f"{result['confidence']:.0%}"
+        print(f"  Value:              ₹{result['value']:,.0f}")
+        print(f"  Volatility (ann.):  {result['volatility']:.1%}")
+        print(f"  1-day VaR {level}:     ₹{result['var_parametric']:,.0f} (parametric), "
+              f"₹{result['var_historical']:,.0f} (historical)")
+        print(f"  Max Drawdown:       {result['max_drawdown']:.1%}")
+        top = result['contributions'].head(5)
+        for ticker, row in top.iterrows():
+            print(f"  • {ticker}: {row['weight']:.1%} of value, {row['pct_of_risk']:.1%} of risk")
+        if result['missing']:
+            print(f"  ⚠ No local price history for: {', '.join(result['missing'])}")
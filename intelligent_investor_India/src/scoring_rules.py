@@ -0,0 +1,194 @@
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from config.settings import SCORING_RULES_PATH
+
+OPS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+}
+
+# Compiled rule sets, keyed by the SHA-256 of the file contents
+_COMPILED = {}
+
+class ScoringRules:
+    def __init__(self, spec, digest=None):
+        """
+        A rules file compiled into flat lists the evaluator can apply with
+        boolean masks over the whole universe (no per-row Python).
+        """
+        self.digest = digest or hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+        self.buckets = []
+        for bucket in spec['buckets']:
+            match = bucket.get('match', '*')
+            words = None if match == '*' else [str(w).lower() for w in match]
+            rules = []
+            for rule in bucket.get('rules', []):
+                tiers = [(self._op(op), float(threshold), points) for op, threshold, points in rule['tiers']]
+                rules.append((rule['metric'], tiers))
+            self.buckets.append({
+                'name': bucket.get('name', ''),
+                'words': words,
+                'base': bucket.get('base', 0),
+                'rules': rules,
+            })
+
+        quality = spec.get('quality', {})
+        self.quality_checks = [(metric, self._op(op), float(value)) for metric, op, value in quality.get('checks', [])]
+
+        pct = spec.get('percentile', {})
+        self.min_sector_size = pct.get('min_sector_size', 5)
+        self.missing_percentile = float(pct.get('missing_percentile', 0.5))
+        self.percentile_metrics = {
+            group: [self._pct_metric(m) for m in pct.get(group, [])]
+            for group in ('value', 'quality')
+        }
+
+        self.blend = dict(spec.get('blend', {'value_score': 0.4, 'quality_score': 0.2, 'tech_score': 0.4}))
+
+    @staticmethod
+    def _pct_metric(entry):
+        if entry.get('better') not in ('low', 'high'):
+            raise ValueError(f"Percentile metric {entry.get('metric')}: 'better' must be 'low' or 'high'")
+        return (entry['metric'], entry['better'], bool(entry.get('positive_only', False)))
+
+    @staticmethod
+    def _op(op):
+        if op not in OPS:
+            raise ValueError(f"Unknown operator '{op}' in scoring rules (use one of {list(OPS)})")
+        return OPS[op]
+
+    # --- EVALUATION ---
+    def bucket_masks(self, sector):
+        """
+        One boolean mask per bucket; first match wins, '*' takes the rest.
+        """
+        sector = sector.astype(str).str.lower()
+        taken = np.zeros(len(sector), dtype=bool)
+        masks = []
+        for bucket in self.buckets:
+            if bucket['words'] is None:
+                hit = np.ones(len(sector), dtype=bool)
+            else:
+                hit = np.zeros(len(sector), dtype=bool)
+                for word in bucket['words']:
+                    hit |= sector.str.contains(word, regex=False).to_numpy()
+            mask = hit & ~taken
+            taken |= mask
+            masks.append(mask)
+        return masks
+
+    def _values(self, df, metric):
+        if metric not in df.columns:
+            return np.full(len(df), np.nan)
+        return pd.to_numeric(df[metric], errors='coerce').to_numpy(dtype=np.float64)
+
+    def value_score(self, df):
+        cols = {m: self._values(df, m) for m in {m for b in self.buckets for m, _ in b['rules']}}
+        masks = self.bucket_masks(df['sector'])
+
+        bucket_scores = []
+        for bucket in self.buckets:
+            score = np.full(len(df), bucket['base'])
+            for metric, tiers in bucket['rules']:
+                x = cols[metric]
+                # if / elif: build from the last tier backwards
+                points = np.zeros(len(df), dtype=np.result_type(*[p for _, _, p in tiers]))
+                for op, threshold, p in reversed(tiers):
+                    with np.errstate(invalid='ignore'):
+                        points = np.where(op(x, threshold), p, points)
+                score = score + points
+            bucket_scores.append(score)
+
+        return np.select(masks, bucket_scores, default=0)
+
+    def quality_score(self, df):
+        if not self.quality_checks:
+            return np.zeros(len(df), dtype='int64')
+        passed = np.zeros(len(df))
+        for metric, op, value in self.quality_checks:
+            with np.errstate(invalid='ignore'):
+                passed += op(self._values(df, metric), value)
+        score = passed / len(self.quality_checks) * 100
+        # Keep whole-number scores as ints (the default 4 checks give 0/25/.../100)
+        return score.astype('int64') if np.all(score == np.round(score)) else score
+
+    def percentile_scores(self, df, sector):
+        """
+        Sector-relative scoring: every metric becomes its percentile within
+        the stock's sector (1.0 = best), in ONE grouped rank over all metrics.
+        Missing values get missing_percentile; with positive_only, a value
+        <= 0 (loss-making P/E, negative book) ranks worst (0). Both count as
+        not available in the coverage columns.
+        Returns (value_score, quality_score, value_coverage, quality_coverage).
+        """
+        entries = [(g, m, better, pos) for g, items in self.percentile_metrics.items()
+                   for m, better, pos in items]
+        if not entries:
+            zeros = np.zeros(len(df))
+            return zeros, zeros, zeros, zeros
+
+        # Orient every column so that bigger = better, NaN = missing
+        cols, worst = {}, np.zeros((len(df), len(entries)), dtype=bool)
+        for i, (_, metric, better, positive_only) in enumerate(entries):
+            x = self._values(df, metric)
+            if positive_only:
+                with np.errstate(invalid='ignore'):
+                    worst[:, i] = x <= 0     # e.g. negative P/E is not 'cheap': below every peer
+                x = np.where(worst[:, i], np.nan, x)
+            cols[i] = -x if better == 'low' else x
+        X = pd.DataFrame(cols, index=df.index)
+
+        groups = sector.astype(str).to_numpy()
+        in_sector = X.groupby(groups).rank(pct=True).to_numpy()
+        universe = X.rank(pct=True).to_numpy()
+
+        # Tiny sectors don't give a meaningful percentile; rank them universe-wide
+        _, inverse, counts = np.unique(groups, return_inverse=True, return_counts=True)
+        small = (counts[inverse] < self.min_sector_size)[:, None]
+        P = np.where(small, universe, in_sector)
+
+        available = ~np.isnan(P)
+        P = np.where(available, P, np.where(worst, 0.0, self.missing_percentile))
+
+        out = []
+        for group in ('value', 'quality'):
+            idx = [i for i, e in enumerate(entries) if e[0] == group]
+            if idx:
+                out.append((P[:, idx].mean(axis=1) * 100, available[:, idx].mean(axis=1)))
+            else:
+                out.append((np.zeros(len(df)), np.zeros(len(df))))
+        (value, value_cov), (quality, quality_cov) = out
+        return value, quality, value_cov, quality_cov
+
+    def blended(self, df):
+        total = np.zeros(len(df))
+        for col, weight in self.blend.items():
+            total = total + df[col].to_numpy(dtype=np.float64) * weight
+        return total
+
+
+def load_rules(path=SCORING_RULES_PATH):
+    """
+    Reads and compiles a rules file. Compilation is cached by file hash,
+    so repeated loads (or re-loads of an unchanged file) are free.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    if digest not in _COMPILED:
+        _COMPILED[digest] = ScoringRules(json.loads(raw), digest)
+    return _COMPILED[digest]
+
+
+def get_rules(rules=None):
+    """
+    Accepts None (default rules file), a path, or an already compiled ScoringRules.
+    """
+    if isinstance(rules, ScoringRules):
+        return rules
+    return load_rules(rules) if rules is not None else load_rules()
@@ -0,0 +1,80 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+class WeightSweep:
+    COLUMNS = ['value_score', 'quality_score', 'tech_score']
+
+    def __init__(self, df_scored, baseline_weights, columns=None):
+        """
+        Evaluates thousands of blend-weight vectors against one scored
+        universe in a single batched matrix product (no pipeline re-runs).
+        baseline_weights: {column: weight}, e.g. ScoringRules.blend.
+        """
+        self.columns = list(columns or self.COLUMNS)
+        self.tickers = np.asarray(df_scored.index)
+        self.scores = df_scored[self.columns].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        self.baseline = np.array([baseline_weights.get(c, 0.0) for c in self.columns], dtype=np.float64)
+
+    @staticmethod
+    def simplex_grid(step=0.05, n_weights=3):
+        """
+        Every weight vector on a `step` lattice whose weights sum to 1.
+        step=0.01 with 3 weights -> 5,151 vectors.
+        """
+        units = int(round(1 / step))
+        rows = [c for c in itertools.product(range(units + 1), repeat=n_weights - 1) if sum(c) <= units]
+        grid = np.array([list(c) + [units - sum(c)] for c in rows], dtype=np.float64)
+        return grid / units
+
+    def _top_membership(self, weights, top_n):
+        """
+        (k x n) boolean: is ticker j in the top-N under weight vector i?
+        argpartition finds the N-th best total without a full sort; ties at
+        that boundary go to the earlier row (same as a stable sort).
+        """
+        # Rounded so genuine ties stay ties regardless of summation order
+        totals = np.round(weights @ self.scores.T, 9)                  # (k x n)
+        kth = -np.partition(-totals, top_n - 1, axis=1)[:, top_n - 1:top_n]
+
+        above = totals > kth
+        at = totals == kth
+        room = top_n - above.sum(axis=1, keepdims=True)
+        member = above | (at & (np.cumsum(at, axis=1) <= room))
+
+        # Exactly top_n members per row -> order them best first
+        top = np.nonzero(member)[1].reshape(len(weights), top_n)
+        order = np.argsort(-np.take_along_axis(totals, top, axis=1), axis=1, kind='stable')
+        return member, np.take_along_axis(top, order, axis=1)
+
+    def run(self, weights, top_n=15, chunk_size=2048):
+        """
+        Returns one row per weight vector with its top-N set and how much it
+        overlaps the baseline top-N, plus the per-ticker inclusion frequency.
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        top_n = min(top_n, len(self.tickers))
+
+        base_member, _ = self._top_membership(self.baseline[None, :], top_n)
+        base_member = base_member[0]
+
+        overlaps, tops = [], []
+        frequency = np.zeros(len(self.tickers))
+        # Chunked so 10k weights x 5k tickers doesn't need one giant matrix
+        for start in range(0, len(weights), chunk_size):
+            member, top = self._top_membership(weights[start:start + chunk_size], top_n)
+            overlaps.append(member.astype(np.int32) @ base_member.astype(np.int32))
+            tops.append(top)
+            frequency += member.sum(axis=0)
+
+        overlap = np.concatenate(overlaps) if overlaps else np.zeros(0, dtype=np.int32)
+        top = np.concatenate(tops) if tops else np.zeros((0, top_n), dtype=int)
+
+        result = pd.DataFrame(weights, columns=[f"w_{c.replace('_score', '')}" for c in self.columns])
+        result['overlap'] = overlap
+        result['overlap_pct'] = overlap / top_n * 100 if top_n else 0.0
+        result['jaccard'] = overlap / np.maximum(2 * top_n - overlap, 1)
+        result['top'] = [tuple(self.tickers[row]) for row in top]
+
+        inclusion = pd.Series(frequency / max(len(weights), 1), index=self.tickers, name='inclusion_rate')
+        return result, inclusion.sort_values(ascending=False)
@@ -1,52 +1,184 @@
-import yfinance as yf
-from textblob import TextBlob
+import hashlib
 import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from config.settings import (USE_CACHE, FETCH_WORKERS, FETCH_TIMEOUT, NEWS_RATE_PER_SEC, NEWS_RATE_BURST,
+                             NEWS_HEADLINES, SENTIMENT_BATCH_SIZE, SENTIMENT_SCORER, SENTIMENT_PROCESSES,
+                             NEWS_REFRESH_MINUTES, NEWS_WINDOW_DAYS, NEWS_HALF_LIFE_DAYS)
+from src.cache import NewsCache
+from src.concurrency import fetch_all
+from src.providers import get_provider
+from src.rate_limit import get_rate_limiter
+from src.sentiment_scorers import get_scorer, _init_worker, _score_chunk
 
 class SentimentEngine:
-    def __init__(self):
-        pass
+    def __init__(self, provider=None, use_cache=USE_CACHE, max_workers=FETCH_WORKERS, timeout=FETCH_TIMEOUT,
+                 limiter=None, scorer=SENTIMENT_SCORER, processes=SENTIMENT_PROCESSES):
+        self.provider = provider or get_provider()
+        self.scorer_name = scorer        # 'textblob' or 'lexicon' (cached separately)
+        self.processes = processes       # >1: score large batches across CPU cores
+        self._scorer = None
+        self.store = NewsCache()         # Local news archive (always kept)
+        self.use_cache = use_cache       # False: always re-fetch news and re-score headlines
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Shared across engines/threads: the API sees one request rate, not one per caller
+        self.limiter = limiter or get_rate_limiter('news', NEWS_RATE_PER_SEC, NEWS_RATE_BURST)
 
-    def get_news_sentiment(self, ticker):
+    @staticmethod
+    def normalize(ticker):
+        if not ticker.endswith('.NS') and not ticker.endswith('.BO'):
+            return f"{ticker}.NS"
+        return ticker
+
+    @staticmethod
+    def headline_hash(title):
+        # Same words -> same hash, regardless of stray whitespace
+        return hashlib.sha1(" ".join(title.split()).encode('utf-8')).hexdigest()
+
+    # --- NEWS ---
+    def _fetch_one(self, ticker):
+        self.limiter.acquire()
+        return self.provider.get_news(ticker) or []
+
+    @staticmethod
+    def parse_item(item, now=None):
         """
-        Fetches latest news and returns a sentiment score (-1 to +1).
+        One yfinance news item -> (id, published_at, title, publisher, link).
+        Handles both the old flat layout (uuid / providerPublishTime) and the
+        newer {'id', 'content': {...}} layout. None if there's no title.
         """
+        content = item.get('content') if isinstance(item.get('content'), dict) else item
+        title = (content.get('title') or '').strip()
+        if not title:
+            return None
+
+        published = content.get('pubDate') or content.get('displayTime') or item.get('providerPublishTime')
         try:
-            # Add .NS suffix if missing
-            if not ticker.endswith('.NS') and not ticker.endswith('.BO'):
-                ticker = f"{ticker}.NS"
-
-            stock = yf.Ticker(ticker)
-            news_list = stock.news
-            
-            if not news_list:
-                print(f"  ℹ No recent news found for {ticker}. Assuming Neutral.")
-                return 0, []
-
-            total_polarity = 0
-            count = 0
-            headlines = []
-
-            for item in news_list[:5]: # Check last 5 headlines
-                title = item.get('title', '')
-                if not title: continue
-                
-                # Analyze Sentiment
-                analysis = TextBlob(title)
-                polarity = analysis.sentiment.polarity
-                
-                total_polarity += polarity
-                count += 1
-                headlines.append(f"{title} ({polarity:.2f})")
-
-            if count == 0:
-                return 0, []
-
-            avg_score = total_polarity / count
-            return avg_score, headlines
-
-        except Exception as e:
-            print(f"  ⚠ Error fetching news for {ticker}: {e}")
-            return 0, []
+            if isinstance(published, (int, float)):
+                published_at = float(published)
+            else:
+                published_at = pd.Timestamp(published).timestamp()
+        except (TypeError, ValueError):
+            published_at = None
+        if published_at is None or np.isnan(published_at):
+            published_at = now or time.time()   # Undated: filed under when we first saw it
+
+        provider = content.get('provider')
+        publisher = provider.get('displayName') if isinstance(provider, dict) else content.get('publisher')
+        url = content.get('canonicalUrl') or content.get('clickThroughUrl')
+        link = url.get('url') if isinstance(url, dict) else content.get('link')
+
+        item_id = item.get('id') or item.get('uuid') or content.get('id') or link or \
+            hashlib.sha1(title.encode('utf-8')).hexdigest()
+        return str(item_id), published_at, title, publisher, link
+
+    def sync_news(self, tickers, now=None):
+        """
+        Brings the local news store up to date. Tickers fetched within the
+        last NEWS_REFRESH_MINUTES are skipped; the rest are fetched in
+        parallel (paced by the shared rate limiter) and items whose id isn't
+        stored yet are appended. Dedup is by id, not publish time: an item
+        without a date (stamped `now`) must not hide older items that turn
+        up later. Returns {ticker: error}.
+        """
+        now = now or time.time()
+        state = self.store.sync_state(tickers)
+        refresh = NEWS_REFRESH_MINUTES * 60 if self.use_cache else 0
+        due = [t for t in tickers if t not in state or now - state[t][1] >= refresh]
+
+        fetched, errors = fetch_all(self._fetch_one, due, self.max_workers, self.timeout)
+
+        items = {ticker: [row for row in (self.parse_item(item, now) for item in raw) if row]
+                 for ticker, raw in fetched.items()}
+        added = self.store.append(items, now)
+        if due:
+            print(f"  ⚡ News: {len(tickers) - len(due)} up to date, {len(due)} fetched, {added} new headlines")
+        return errors
+
+    # --- SCORING ---
+    @property
+    def scorer(self):
+        if self._scorer is None:
+            self._scorer = get_scorer(self.scorer_name)
+        return self._scorer
+
+    def polarity_batch(self, titles):
+        """
+        Raw scorer: a list of headlines -> a list of polarities (-1 to +1).
+        Big lists are split into chunks and scored in a process pool
+        (TextBlob is pure Python, so threads wouldn't help).
+        """
+        if self.processes > 1 and len(titles) >= 2 * SENTIMENT_BATCH_SIZE:
+            chunks = [titles[i:i + SENTIMENT_BATCH_SIZE] for i in range(0, len(titles), SENTIMENT_BATCH_SIZE)]
+            with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                     initargs=(self.scorer_name,)) as pool:
+                return [p for chunk in pool.map(_score_chunk, chunks) for p in chunk]
+        return self.scorer.score(titles)
+
+    def score_headlines(self, titles):
+        """
+        {title: polarity} for any number of headlines. Duplicates are scored
+        once, previously seen headlines come from the cache, and the rest
+        are scored in batches (optionally across processes) and cached.
+        """
+        by_hash = {}
+        for title in titles:
+            by_hash.setdefault(self.headline_hash(title), title)
+
+        scores = self.store.load_polarity(by_hash, self.scorer_name) if self.use_cache else {}
+        todo = [h for h in by_hash if h not in scores]
+        new = dict(zip(todo, self.polarity_batch([by_hash[h] for h in todo]))) if todo else {}
+        self.store.store_polarity(new, self.scorer_name)
+        scores.update(new)
+
+        return {title: scores[self.headline_hash(title)] for title in titles}
+
+    def analyze(self, tickers, now=None):
+        """
+        {ticker: (score, headlines)} for many tickers in one pass, from the
+        local store: score = decay-weighted mean polarity (-1 to +1) of every
+        headline in the last NEWS_WINDOW_DAYS (weight halves every
+        NEWS_HALF_LIFE_DAYS); headlines = the latest NEWS_HEADLINES.
+        """
+        now = now or time.time()
+        symbols = {t: self.normalize(t) for t in tickers}
+        unique = list(dict.fromkeys(symbols.values()))
+        errors = self.sync_news(unique, now)
+
+        items = self.store.load_window(unique, now - NEWS_WINDOW_DAYS * 86400)
+        polarity = self.score_headlines(items['title'].tolist())
+        items['polarity'] = items['title'].map(polarity)
+        age_days = np.clip(now - items['published_at'].to_numpy(dtype=float), 0, None) / 86400
+        items['weight'] = 0.5 ** (age_days / NEWS_HALF_LIFE_DAYS)
+        items['weighted'] = items['weight'] * items['polarity']
+
+        totals = items.groupby('ticker')[['weighted', 'weight']].sum()
+        score = totals['weighted'] / totals['weight']
+        latest = items.groupby('ticker').head(NEWS_HEADLINES)   # Already newest first
+
+        headlines = {}
+        for ticker, title, p in zip(latest['ticker'], latest['title'], latest['polarity']):
+            headlines.setdefault(ticker, []).append(f"{title} ({p:.2f})")
+
+        results = {}
+        for ticker, symbol in symbols.items():
+            if symbol in errors:
+                print(f"  ⚠ Error fetching news for {symbol}: {errors[symbol]}")
+            if symbol not in score.index:
+                if symbol not in errors:
+                    print(f"  ℹ No recent news found for {symbol}. Assuming Neutral.")
+                results[ticker] = (0, [])
+            else:
+                results[ticker] = (float(score[symbol]), headlines[symbol])
+        return results
+
+    def get_news_sentiment(self, ticker):
+        """
+        Syncs latest news and returns a sentiment score (-1 to +1).
+        """
+        return self.analyze([ticker])[ticker]
 
     def filter_stocks(self, df_recommendations):
         """
@@ -56,14 +188,14 @@ class SentimentEngine:
             return df_recommendations
 
         print("\n--- 📰 NEWS SENTIMENT CHECK ---")
+        print(f"  > Scanning news for {len(df_recommendations)} stocks...")
+        results = self.analyze(list(df_recommendations['ticker']))
         approved_indices = []
 
         for index, row in df_recommendations.iterrows():
             ticker = row['ticker']
-            print(f"  > Scanning news for {ticker}...")
-            
-            score, headlines = self.get_news_sentiment(ticker)
-            
+            score, headlines = results[ticker]
+
             # RULE: If score is below -0.15, it's negative news.
             if score < -0.15:
                 print(f"  ❌ BLOCKED {ticker}: Negative Sentiment ({score:.2f})")
@@ -72,8 +204,5 @@ class SentimentEngine:
                 status = "Positive" if score > 0.1 else "Neutral"
                 print(f"  ✔ Approved {ticker}: {status} ({score:.2f})")
                 approved_indices.append(index)
-            
-            # Sleep briefly to avoid blocking by API
-            time.sleep(0.5)
 
-        return df_recommendations.loc[approved_indices]
\ No newline at end of file
+        return df_recommendations.loc[approved_indices]
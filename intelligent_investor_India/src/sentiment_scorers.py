@@ -0,0 +1,241 @@
+import json
+import os
+import re
+from collections import defaultdict
+from config.settings import SENTIMENT_LEXICON_PATH
+
+# --- TOKENIZER (TextBlob's find_tokens, from pattern; BSD licensed) ---
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+ABBREVIATIONS = {
+    "a.", "adj.", "adv.", "al.", "a.m.", "c.", "cf.", "comp.", "conf.", "def.", "ed.", "e.g.", "esp.", "etc.",
+    "ex.", "f.", "fig.", "gen.", "id.", "i.e.", "int.", "l.", "m.", "Med.", "Mil.", "Mr.", "n.", "n.q.", "orig.",
+    "pl.", "pred.", "pres.", "p.m.", "ref.", "v.", "vs.", "w/",
+}
+CONTRACTIONS = {"'d": " 'd", "'m": " 'm", "'s": " 's", "'ll": " 'll", "'re": " 're", "'ve": " 've", "n't": " n't"}
+EMOTICONS = {   # polarity: faces
+    +1.00: ("<3", "♥", ">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "XD", "xD", "8-D"),
+    +0.75: (">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)"),
+    +0.50: (">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)"),
+    +0.25: (">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)"),
+    +0.05: (">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°"),
+    -0.25: (">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>"),
+    -0.75: (">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/"),
+    -1.00: (":'(", ":'''(", ";'("),
+}
+EOS = "END-OF-SENTENCE"
+RE_TOKEN = re.compile(r"(\S+)\s")
+RE_ABBR = [re.compile(r"^[A-Za-z]\.$"),                       # "T. De Smedt"
+           re.compile(r"^([A-Za-z]\.)+$"),                    # "U.S."
+           re.compile("^[A-Z][" + "|".join("bcdfghjklmnpqrstvwxz") + "]+.$")]   # "Mr."
+RE_SARCASM = re.compile(r"\( ?\! ?\)")
+# Longest face first, so ">:)" isn't read as ":)"
+RE_EMOTICONS = re.compile(r"(%s)($|\s)" % "|".join(
+    r" ?".join(re.escape(c) for c in face)
+    for face in sorted((f for faces in EMOTICONS.values() for f in faces), key=len, reverse=True)))
+
+
+def find_tokens(string):
+    """
+    Sentences of space-separated tokens, split exactly like TextBlob's
+    PatternAnalyzer does: contractions and punctuation come off the words
+    ("isn't" -> "is n ' t"), abbreviations keep their period, and
+    sarcasm marks / spaced-out emoticons are glued back together.
+    """
+    punctuation = tuple(PUNCTUATION.replace(".", ""))
+    for a, b in CONTRACTIONS.items():
+        string = re.sub(a, b, string)
+    for quote in ("“", "”", "‘", "’", "'", '"'):
+        string = string.replace(quote, f" {quote} ")
+    string = re.sub("\r\n", "\n", string)
+    string = re.sub(r"\n{2,}", f" {EOS} ", string)
+    string = re.sub(r"\s+", " ", string)
+
+    tokens = []
+    for t in RE_TOKEN.findall(string + " "):
+        tail = []
+        while t.startswith(punctuation) and t not in CONTRACTIONS:
+            tokens.append(t[0])
+            t = t[1:]
+        while t.endswith(punctuation + (".",)) and t not in CONTRACTIONS:
+            if t.endswith(punctuation):
+                tail.append(t[-1])
+                t = t[:-1]
+            if t.endswith("..."):
+                tail.append("...")
+                t = t[:-3].rstrip(".")
+            if t.endswith("."):
+                if t in ABBREVIATIONS or any(r.match(t) for r in RE_ABBR):
+                    break
+                tail.append(t[-1])
+                t = t[:-1]
+        if t != "":
+            tokens.append(t)
+        tokens.extend(reversed(tail))
+
+    # Sentence ends, keeping trailing quotes / brackets / repeated '!?' with the sentence
+    sentences, i, j = [[]], 0, 0
+    while j < len(tokens):
+        if tokens[j] in ("...", ".", "!", "?", EOS):
+            while j < len(tokens) and tokens[j] in ("'", '"', "”", "’", "...", ".", "!", "?", ")", EOS):
+                if tokens[j] in ("'", '"') and sentences[-1].count(tokens[j]) % 2 == 0:
+                    break   # Balanced quotes
+                j += 1
+            sentences[-1].extend(t for t in tokens[i:j] if t != EOS)
+            sentences.append([])
+            i = j
+        j += 1
+    sentences[-1].extend(tokens[i:j])
+
+    sentences = (RE_SARCASM.sub("(!)", " ".join(s)) for s in sentences if s)
+    return [RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), s) for s in sentences]
+
+
+class TextBlobScorer:
+    name = 'textblob'
+
+    def __init__(self):
+        from textblob import TextBlob
+        self.TextBlob = TextBlob
+
+    def score(self, titles):
+        return [self.TextBlob(title).sentiment.polarity for title in titles]
+
+
+class LexiconScorer:
+    name = 'lexicon'
+    NEGATIONS = {'no', 'not', "n't", 'never'}
+
+    def __init__(self, path=SENTIMENT_LEXICON_PATH):
+        """
+        TextBlob's own sentiment lexicon, precompiled into a flat JSON table
+        {word: [polarity, intensity, is_adverb]} and scored with the same
+        rules as its PatternAnalyzer (intensifiers like 'very' scale the next
+        word, a preceding negation flips and halves it, '!' boosts, emoticons
+        count, the result is the mean over assessed words).
+        Tokens come from a copy of TextBlob's tokenizer (find_tokens above),
+        so scores are the same as TextBlob's (tests/test_sentiment_scorers.py);
+        what's skipped is the blob, the XML lexicon and the subjectivity
+        bookkeeping. TextBlob itself is only needed once, to compile the table.
+        """
+        # Note the tokenizer splits "isn't" into "is n ' t", so "n't" never
+        # acts as a negation in TextBlob (nor here).
+        self.punctuation = PUNCTUATION
+        self.emoticons = {}
+        for p, faces in EMOTICONS.items():
+            for face in faces:
+                self.emoticons.setdefault(face.lower(), p)
+
+        if not os.path.exists(path):
+            self.compile(path)
+        with open(path, encoding='utf-8') as f:
+            self.table = json.load(f)
+
+    @staticmethod
+    def compile(path=SENTIMENT_LEXICON_PATH, xml_path=None):
+        """
+        One-off: builds the JSON table from TextBlob's en-sentiment.xml,
+        averaging word senses the way PatternAnalyzer loads them.
+        """
+        import xml.etree.ElementTree as ET
+        if xml_path is None:
+            try:
+                import textblob
+            except ImportError:
+                raise ImportError(f"The lexicon scorer reads TextBlob's en-sentiment.xml once to build {path}; "
+                                  f"pip install textblob (or pass xml_path)") from None
+            xml_path = os.path.join(os.path.dirname(textblob.__file__), 'en', 'en-sentiment.xml')
+
+        avg = lambda xs: sum(xs) / float(len(xs) or 1)
+        senses = defaultdict(lambda: defaultdict(list))   # word -> pos -> [(p, i)]
+        for node in ET.parse(xml_path).getroot().iter('word'):
+            form = node.get('form')
+            if form:
+                senses[form][node.get('pos')].append((float(node.get('polarity', 0.0)),
+                                                      float(node.get('intensity', 1.0))))
+
+        by_pos = {w: {pos: [avg(col) for col in zip(*rows)] for pos, rows in pos_rows.items()}
+                  for w, pos_rows in senses.items()}
+        table = {w: [avg(col) for col in zip(*pos.values())] + ['RB' in pos] for w, pos in by_pos.items()}
+
+        # Same as TextBlob: 'terrible' -> adverb 'terribly' with the adjective's scores
+        for w, pos in by_pos.items():
+            if 'JJ' in pos:
+                stem = w[:-1] + 'i' if w.endswith('y') else w
+                stem = stem[:-2] if stem.endswith('le') else stem
+                table[stem + 'ly'] = list(pos['JJ']) + [True]
+
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(table, f)
+        os.replace(tmp, path)
+        print(f"✔ Compiled sentiment lexicon ({len(table)} words) -> {path}")
+
+    def polarity(self, text):
+        return self.polarity_of_tokens(" ".join(find_tokens(text)).split())
+
+    def polarity_of_tokens(self, tokens):
+        """
+        PatternAnalyzer's assessment rules over already-tokenized words.
+        """
+        a = []              # Assessments: [polarity, intensity, negated]
+        modifier = None     # Previous known word if it's an adverb ('very')
+        negation = None     # Pending 'not' / 'never' ...
+        for w in tokens:
+            w = w.lower()
+            entry = self.table.get(w)
+            if entry is not None:
+                p, i, is_adverb = entry
+                if modifier is None:
+                    a.append([p, i, False])
+                else:
+                    # 'very good' -> one assessment: good's polarity x very's intensity
+                    a[-1][0] = max(-1.0, min(p * a[-1][1], 1.0))
+                    a[-1][1] = i
+                if negation is not None:
+                    a[-1][1] = 1.0 / a[-1][1]
+                    a[-1][2] = True
+                modifier = w if is_adverb else None
+                negation = w if w in self.NEGATIONS else None
+            else:
+                if w in self.NEGATIONS:
+                    negation = w
+                elif negation and len(w.strip("'")) > 1:
+                    negation = None   # 'not a good' keeps it, 'not the best' doesn't
+                if negation is not None and modifier and modifier.endswith('ly'):
+                    a[-1][2] = True   # 'really not good'
+                    negation = None
+                elif modifier and len(w) > 2:
+                    modifier = None
+                if w == '!' and a:
+                    a[-1][0] = max(-1.0, min(a[-1][0] * 1.25, 1.0))
+                if w == '(!)':
+                    a.append([0.0, 1.0, False])   # Sarcasm mark: counts as a neutral assessment
+                if not w.isalpha() and len(w) <= 5 and w not in self.punctuation and w in self.emoticons:
+                    a.append([self.emoticons[w], 1.0, False])
+
+        if not a:
+            return 0.0
+        # 'not good' = slightly bad, 'not bad' = slightly good
+        return sum(p * -0.5 if negated else p for p, _, negated in a) / len(a)
+
+    def score(self, titles):
+        return [self.polarity(title) for title in titles]
+
+
+SCORERS = {'textblob': TextBlobScorer, 'lexicon': LexiconScorer}
+
+def get_scorer(name):
+    if name not in SCORERS:
+        raise ValueError(f"Unknown sentiment scorer '{name}' (use one of {list(SCORERS)})")
+    return SCORERS[name]()
+
+
+# --- PROCESS POOL WORKERS ---
+_worker_scorer = None
+
+def _init_worker(name):
+    global _worker_scorer
+    _worker_scorer = get_scorer(name)
+
+def _score_chunk(titles):
+    return _worker_scorer.score(titles)
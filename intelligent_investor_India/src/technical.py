@@ -1,10 +1,15 @@
 import pandas as pd
-import yfinance as yf
 import numpy as np
+from src.indicators import IndicatorEngine
+from src.indicator_state import IndicatorState
+from src.prices import PricePanel
+from config.settings import INDICATOR_STATE_PATH
 
 class TechnicalEngine:
-    def __init__(self):
-        pass
+    def __init__(self, panel=None, store=None):
+        self.panel = panel  # Optional PricePanel from PriceHistoryLoader
+        self.store = store  # Optional PriceStore (local memory-mapped bars)
+        self._indicators = None  # Universe indicators, computed once per engine
 
     def add_technical_indicators(self, df):
         """
@@ -17,11 +22,25 @@ class TechnicalEngine:
             df['200_dma'] = df['price'] # Safety fallback
         
         # We need historical data for RSI.
-        # Since fetching history for 500 stocks is slow, we use a heuristic or
-        # fetch only for the shortlist.
-        # FOR SPEED: We will skip RSI for the full list and only apply it 
-        # to the 'Buy Candidates' later. 
-        # Here we just mark the Trend.
+        # With a panel (one batched download) we get it for the full list,
+        # and fill any price/DMA gaps in the info snapshot from real bars.
+        if self.panel is not None and len(self.panel):
+            stats = self.panel.latest_stats().reindex(df.index)
+            for col in ['price', '50_dma', '200_dma']:
+                if col in df.columns:
+                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(stats[col])
+
+        indicators = self.universe_indicators().reindex(df.index)
+        if self.store is not None and len(self.store):
+            # Our own DMAs from local bars beat yfinance's 'info' averages
+            for col in ['50_dma', '200_dma']:
+                current = pd.to_numeric(df[col], errors='coerce') if col in df.columns else np.nan
+                df[col] = indicators.pop(col).fillna(current)
+
+        for col in indicators.columns:
+            df[col] = indicators[col]
+        if 'rsi_14' not in df.columns:
+            df['rsi_14'] = np.nan  # No bars: the RSI gate treats it as neutral
         
         df['tech_score'] = 0
         
@@ -41,30 +60,62 @@ class TechnicalEngine:
             
         return df
 
+    def universe_indicators(self):
+        """
+        Latest indicators for every ticker with bars. Computed on the first
+        call only, so scoring the universe in several slices (as the
+        incremental refresh does) costs one indicator pass.
+        """
+        if self._indicators is None:
+            if self.store is not None and len(self.store):
+                # Local store: O(1)-per-day indicator state, checkpointed between runs
+                self._indicators = self.sync_indicator_state().latest()
+            elif self.panel is not None and len(self.panel):
+                # Wilder RSI, EMA, MACD, ATR, Bollinger for every ticker in one pass
+                self._indicators = IndicatorEngine(self.panel).latest()
+            else:
+                self._indicators = pd.DataFrame()
+        return self._indicators
+
     def get_rsi(self, ticker, period=14):
         """
-        Fetches history for a SINGLE stock to calculate RSI.
-        Used only for final filtering to save time.
+        RSI for a SINGLE stock: its row of the universe's Wilder rsi_14
+        (50 = neutral when it has no bars). Kept for older callers; the
+        indicators frame has it for every ticker at once.
         """
-        try:
-            if not ticker.endswith('.NS') and not ticker.endswith('.BO'):
-                ticker = f"{ticker}.NS"
-                
-            # Fetch 3 mo history
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="3mo")
-            
-            if len(hist) < period + 1:
-                return 50 # Neutral if no data
+        if period != 14:
+            raise ValueError("Only the 14-day RSI is computed (rsi_14)")
+        if not ticker.endswith('.NS') and not ticker.endswith('.BO'):
+            ticker = f"{ticker}.NS"
+        indicators = self.universe_indicators()
+        rsi = indicators['rsi_14'].get(ticker, np.nan) if 'rsi_14' in indicators.columns else np.nan
+        return 50 if pd.isna(rsi) else float(rsi)
+
+    def sync_indicator_state(self, path=INDICATOR_STATE_PATH):
+        """
+        Loads the checkpointed IndicatorState and folds in only the bars the
+        store gained since the last run (usually one).
 
-            delta = hist['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        The checkpoint always stops one bar short of the newest, and that bar
+        is applied to an in-memory copy. An intraday re-write of today's bar
+        is therefore picked up on the next run.
+        """
+        panel = self.store.to_panel()
+        tickers = list(panel.close.columns)
+        days = panel.close.index.values.astype('datetime64[D]')
 
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            
-            return rsi.iloc[-1]
-            
-        except Exception:
-            return 50 # Default Neutral
\ No newline at end of file
+        state = IndicatorState.load(path)
+        if (state is None or state.tickers != tickers
+                or (state.last_date is not None and state.last_date not in days)):
+            print("  ↻ Rebuilding indicator state from the price store...")
+            state = IndicatorState(tickers)
+
+        committed = PricePanel({f: frame.iloc[:-1] for f, frame in panel.frames.items()})
+        newest = PricePanel({f: frame.iloc[-1:] for f, frame in panel.frames.items()})
+
+        state.apply_rows(committed, after=state.last_date)
+        state.save(path)
+
+        live = state.copy()
+        live.apply_rows(newest, after=state.last_date)
+        return live
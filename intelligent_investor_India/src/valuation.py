@@ -1,9 +1,20 @@
+import warnings
 import pandas as pd
 import numpy as np
+from src.scoring_rules import get_rules
+from src.sensitivity import WeightSweep
+from config.settings import SCORING_MODE, QUALITY_SCORE_SOURCE
 
 class ValuationEngine:
-    def __init__(self, df_fundamentals):
+    def __init__(self, df_fundamentals, rules=None, mode=SCORING_MODE, quality_source=QUALITY_SCORE_SOURCE, f_scores=None):
         self.df = df_fundamentals.copy()
+        # Percentile mode must see real gaps, not clean_data's 999 fillers
+        self.raw = df_fundamentals
+        # Compiled sector rules + blend weights (config/scoring_rules.json)
+        self.rules = get_rules(rules)
+        self.mode = mode  # 'absolute' (fixed cutoffs) or 'percentile' (vs sector peers)
+        self.quality_source = quality_source  # 'snapshot' or 'piotroski'
+        self.f_scores = f_scores  # PiotroskiEngine.score() output; never fetched here
 
     def clean_data(self):
         # 1. Fill Missing Values with "Safe" defaults
@@ -29,75 +40,72 @@ class ValuationEngine:
 
     def calculate_piotroski_f_score_lite(self, row):
         """
-        Calculates a 'Lite' F-Score (0-5) based on available snapshot data.
+        Snapshot quality checks passed (0-4 with the default rules) for one row.
+        Deprecated: score_valuation computes them for every row at once.
         """
-        score = 0
-        # 1. Positive ROA (Profitability)
-        if row['roe'] > 0: score += 1
-        
-        # 2. Positive Cash Flow (Proxy: Profit Margin > 0)
-        if row['profit_margin'] > 0: score += 1
-        
-        # 3. Low Leverage (Debt < Equity)
-        if row['debt_to_equity'] < 100: score += 1
-        
-        # 4. High Quality Earnings (PEG < 1.5)
-        if row['peg_ratio'] < 1.5: score += 1
-        
-        return score 
+        warnings.warn("calculate_piotroski_f_score_lite is deprecated; use rules.quality_score on the whole frame",
+                      DeprecationWarning, stacklevel=2)
+        share = self.rules.quality_score(pd.DataFrame([row]))[0] / 100
+        return int(round(share * len(self.rules.quality_checks)))
 
     def score_valuation(self):
-        self.df['value_score'] = 0
-        self.df['quality_score'] = 0
-        
-        for index, row in self.df.iterrows():
-            sector = str(row['sector']).lower()
-            v_score = 0
-            
-            # --- SECTOR SPECIFIC LOGIC ---
-            
-            # 1. BANKS & FINANCE (Value P/B more than P/E)
-            if 'financial' in sector or 'bank' in sector:
-                if row['price_to_book'] < 1.5: v_score += 40
-                elif row['price_to_book'] < 2.5: v_score += 20
-                if row['roe'] > 0.12: v_score += 30
-                v_score += 30 # Base score for stability
+        """
+        Sector-specific value score + Piotroski-lite quality score, evaluated
+        with the compiled rules as boolean masks over the whole universe.
+        """
+        if self.mode == 'percentile':
+            self.score_percentiles()
+        else:
+            self.df['value_score'] = self.rules.value_score(self.df)
+            self.df['quality_score'] = self.rules.quality_score(self.df)
 
-            # 2. REAL ESTATE / INFRA (High Debt is common)
-            elif 'real estate' in sector or 'construction' in sector:
-                if row['trailing_pe'] < 20: v_score += 40
-                if row['debt_to_equity'] < 200: v_score += 30
-                if row['profit_margin'] > 0.10: v_score += 30
+        if self.quality_source == 'piotroski':
+            self.apply_f_scores()
+        return self.df
 
-            # 3. IT / TECH (High Margins, Debt Free)
-            elif 'technology' in sector or 'services' in sector:
-                if row['trailing_pe'] < 25: v_score += 30
-                if row['debt_to_equity'] < 10: v_score += 30
-                if row['profit_margin'] > 0.15: v_score += 40
+    def apply_f_scores(self):
+        """
+        Swaps quality_score for the statement-based F-score (share of the 9
+        criteria passed, 0-100). Stocks with too few scorable criteria keep
+        the snapshot-based score; quality_source says which one was used.
+        Without f_scores (see piotroski.configured_f_scores) every stock
+        keeps its snapshot score.
+        """
+        if self.f_scores is None:
+            print("⚠ No F-scores passed; keeping the snapshot quality score.")
+            self.df['quality_source'] = 'snapshot'
+            return self.df
 
-            # 4. GENERAL MANUFACTURING
-            else:
-                if row['trailing_pe'] < 15: v_score += 40
-                elif row['trailing_pe'] < 25: v_score += 20
-                if row['debt_to_equity'] < 70: v_score += 30
-                if row['roe'] > 0.15: v_score += 30
+        f = self.f_scores.reindex(self.df.index)
+        has_f = f['f_quality'].notna().to_numpy()
+        self.df['quality_score'] = np.where(has_f, f['f_quality'], self.df['quality_score'])
+        self.df['f_score'] = f['f_score']
+        self.df['f_coverage'] = f['f_coverage']
+        self.df['quality_source'] = np.where(has_f, 'piotroski', 'snapshot')
+        return self.df
 
-            self.df.at[index, 'value_score'] = v_score
-            
-            # --- QUALITY SCORE ---
-            f_score = self.calculate_piotroski_f_score_lite(row)
-            self.df.at[index, 'quality_score'] = (f_score / 4) * 100 
+    def score_percentiles(self):
+        """
+        Scores each stock against its own sector's distribution instead of
+        fixed cutoffs (better separation in expensive sectors, fewer ties).
+        """
+        sector = self.df['sector'] if 'sector' in self.df.columns else pd.Series('Unknown', index=self.df.index)
+        raw = self.raw.reindex(self.df.index)
+        value, quality, value_cov, quality_cov = self.rules.percentile_scores(raw, sector)
 
+        self.df['value_score'] = value
+        self.df['quality_score'] = quality
+        self.df['value_coverage'] = value_cov      # Share of metrics that were available
+        self.df['quality_coverage'] = quality_cov
         return self.df
 
     def get_blended_score(self, tech_df=None):
         # --- FIX FOR OVERLAP ERROR ---
         # Instead of self.df.join(), we simply assign the columns if tech_df exists
         if tech_df is not None:
-            if 'tech_score' in tech_df.columns:
-                self.df['tech_score'] = tech_df['tech_score']
-            if 'trend' in tech_df.columns:
-                self.df['trend'] = tech_df['trend']
+            for col in ['tech_score', 'trend', 'rsi_14']:
+                if col in tech_df.columns:
+                    self.df[col] = tech_df[col]
         
         # Ensure columns exist even if tech_df was None
         if 'tech_score' not in self.df.columns:
@@ -105,11 +113,26 @@ class ValuationEngine:
             
         self.score_valuation()
         
-        # FINAL WEIGHTED SCORE
-        self.df['total_score'] = (
-            (self.df['value_score'] * 0.4) + 
-            (self.df['quality_score'] * 0.2) + 
-            (self.df['tech_score'] * 0.4)
-        )
+        # FINAL WEIGHTED SCORE (weights from the rules file)
+        self.df['total_score'] = self.rules.blended(self.df)
         
-        return self.df.sort_values(by='total_score', ascending=False)
\ No newline at end of file
+        return self.df.sort_values(by='total_score', ascending=False)
+
+    def rescore(self, rules):
+        """
+        Re-scores the already-fetched universe under another rules file
+        (path or ScoringRules). No refetch, no technicals re-run.
+        """
+        self.rules = get_rules(rules)
+        return self.get_blended_score()
+
+    def weight_sweep(self, weights=None, top_n=15):
+        """
+        How stable are the top picks under other value/quality/tech weights?
+        weights: (k x 3) array; defaults to a 1%-step grid (~5k vectors).
+        Call after get_blended_score(). Returns (per_weight_df, inclusion_rate).
+        """
+        sweep = WeightSweep(self.df.sort_values(by='total_score', ascending=False), self.rules.blend)
+        if weights is None:
+            weights = sweep.simplex_grid(step=0.01)
+        return sweep.run(weights, top_n=top_n)
@@ -1,6 +1,7 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+from src.quotes import QuoteService
 
 # Define file paths
 HOLDINGS_PATH = 'data/holdings.csv'
@@ -15,10 +16,10 @@ def generate_portfolio_chart():
     if os.path.exists(HOLDINGS_PATH):
         try:
             df_holdings = pd.read_csv(HOLDINGS_PATH)
-            # Calculate current value (Shares * Price)
-            # Note: Ensure your CSV has 'Shares' and 'AvgPrice' (or 'CurrentPrice')
-            price_col = 'CurrentPrice' if 'CurrentPrice' in df_holdings.columns else 'AvgPrice'
-            df_holdings['Value'] = df_holdings['Shares'] * df_holdings[price_col]
+            # Calculate current value (Shares * live quote, one batched call);
+            # mutual funds and unquoted rows use the CSV's own prices
+            price = QuoteService().holding_prices(df_holdings)
+            df_holdings['Value'] = pd.to_numeric(df_holdings['Shares'], errors='coerce') * price
             df_holdings['Source'] = 'Existing Holding'
             print(f"✅ Loaded {len(df_holdings)} existing holdings.")
         except Exception as e:
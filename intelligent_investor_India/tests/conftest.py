@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app is run from this folder (python main.py); make `src` / `config` importable the same way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
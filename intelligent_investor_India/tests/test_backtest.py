@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from src.backtest import Backtester
+
+
+def loop_simulate(C, rows, W, cost):
+    """
+    Reference: walk the days one by one, holding rupees per stock plus cash.
+    """
+    held, cash, value = np.zeros(C.shape[1]), 1.0, 1.0
+    returns, turnover = [], []
+    for day in range(rows[0], len(C)):
+        if day > rows[0]:
+            held = held * C[day] / C[day - 1]
+        before, value = value, held.sum() + cash
+        if day in rows:
+            target = W[list(rows).index(day)]
+            traded = np.abs(target - held / value).sum()
+            value *= 1 - traded * cost
+            held, cash = target * value, (1 - target.sum()) * value
+            turnover.append(traded / 2)
+        returns.append(value / before - 1)
+    return np.array(returns), np.array(turnover)
+
+
+@pytest.mark.parametrize('cost_bps', [0, 25])
+def test_simulate_matches_a_day_by_day_loop(cost_bps):
+    rng = np.random.default_rng(3)
+    C = 100 * np.cumprod(1 + rng.normal(0, 0.02, (10, 3)), axis=0)
+    rows = np.array([1, 4, 7])
+    W = np.array([[0.5, 0.5, 0.0],       # Fully invested
+                  [0.0, 0.4, 0.4],       # 20% cash, one stock sold
+                  [1 / 3, 1 / 3, 1 / 3]])
+
+    bt = Backtester(store=object(), archive=object(), cost_bps=cost_bps)
+    returns, turnover = bt.simulate(C, rows, W)
+    expected_returns, expected_turnover = loop_simulate(C, rows, W, bt.cost)
+
+    assert len(returns) == len(C) - rows[0]
+    np.testing.assert_allclose(returns, expected_returns, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(turnover, expected_turnover, rtol=0, atol=1e-12)
+    assert turnover[0] == pytest.approx(0.5)   # Initial buy: half of 100% traded one way
@@ -0,0 +1,158 @@
+import json
+import time
+import pandas as pd
+import pytest
+from src.broker import MockBroker
+from src.execution import ExecutionEngine
+from src.journal import OrderJournal
+from src.rate_limit import RateLimiter
+
+ORDERS = pd.DataFrame({'ticker': [f"S{i}.NS" for i in range(60)], 'shares': [1 + i % 5 for i in range(60)]})
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'order_journal.jsonl')
+
+
+def engine(broker, journal=None, **kwargs):
+    return ExecutionEngine(broker, limiter=RateLimiter(0), journal=journal, use_journal=journal is not None,
+                           backoff=0, **kwargs)
+
+
+def write_journal(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+# --- IDEMPOTENT SUBMISSION ---
+def test_second_run_of_a_batch_places_nothing_new():
+    broker = MockBroker(latency=0)
+    exe = engine(broker)
+    first = exe.submit_orders(ORDERS, batch_id='b1')
+    second = exe.submit_orders(ORDERS, batch_id='b1')
+
+    assert (first['status'] == 'submitted').all()
+    assert (second['status'] == 'existing').all()
+    assert list(second['order_id']) == list(first['order_id'])
+    assert len(broker.orders) == len(ORDERS)
+
+
+def test_rerunning_after_lost_replies_never_doubles_an_order():
+    broker = MockBroker(latency=0, failure_rate=0.4, lost_ack_rate=0.3, reject={'S3.NS'}, seed=5)
+    exe = engine(broker, retries=1, max_in_flight=8)
+
+    for _ in range(5):
+        results = exe.submit_orders(ORDERS, batch_id='b1')
+
+    assert results['status'].value_counts().to_dict() == {'existing': 59, 'failed': 1}
+
+    # One order per ticker at the broker, however often the batch was re-run
+    assert sorted(o.symbol for o in broker.orders.values()) == sorted(set(ORDERS['ticker']) - {'S3.NS'})
+
+
+
+def test_repeated_ticker_is_one_order_for_the_combined_shares(capsys):
+    broker = MockBroker(latency=0)
+    orders = pd.DataFrame({'ticker': ['A.NS', 'B.NS', 'A.NS'], 'shares': [3, 2, 3]})
+    results = engine(broker).submit_orders(orders, batch_id='b1', side='sell')
+
+    assert list(results['ticker']) == ['A.NS', 'B.NS']
+    assert list(results['qty']) == [6, 2]
+    assert (results['status'] == 'submitted').all()
+    assert sorted((o.symbol, o.qty, o.side) for o in broker.orders.values()) == [('A.NS', 6, 'sell'),
+                                                                                  ('B.NS', 2, 'sell')]
+    assert "Listed more than once" in capsys.readouterr().out
+
+    ExecutionEngine.report(results, 0.0)
+    out = capsys.readouterr().out
+    assert "Order Sent: Sell 6 A.NS" in out and "Buy" not in out
+
+# --- JOURNAL ---
+def test_lost_replies_and_dropped_requests_never_double_an_order(journal_path):
+    broker = MockBroker(latency=0, failure_rate=0.4, lost_ack_rate=0.3, reject={'S3.NS'}, seed=5)
+    journal = OrderJournal(journal_path)
+    exe = engine(broker, journal, retries=1, max_in_flight=8)
+
+    results = exe.submit_orders(ORDERS, batch_id='b1')
+    for _ in range(10):
+        if not journal.unfinished('b1'):
+            break
+        exe.resume('b1')
+
+    assert journal.unfinished('b1') == []
+    assert journal.get(results.loc[3, 'client_order_id'])['event'] == 'rejected'
+    # One order per ticker at the broker, whatever was retried or resumed
+    assert sorted(o.symbol for o in broker.orders.values()) == sorted(set(ORDERS['ticker']) - {'S3.NS'})
+
+
+def test_journal_answers_a_rerun_without_requests(journal_path):
+    broker = MockBroker(latency=0)
+    engine(broker, OrderJournal(journal_path)).submit_orders(ORDERS, batch_id='b1')
+
+    calls = broker.calls
+    rerun = engine(broker, OrderJournal(journal_path)).submit_orders(ORDERS, batch_id='b1')
+    assert (rerun['status'] == 'existing').all()
+    assert (rerun['attempts'] == 0).all()
+    assert broker.calls == calls
+
+
+# --- CRASH RESUME ---
+def test_resume_after_crash_sends_only_what_the_broker_lacks(journal_path):
+    broker = MockBroker(latency=0)
+    batch = ExecutionEngine.default_batch()
+    cids = [ExecutionEngine.client_order_id(batch, t, int(q)) for t, q in zip(ORDERS['ticker'], ORDERS['shares'])]
+    now = time.time()
+    # Died mid-run: every intent logged, 40 orders reached the broker, 25 acks logged, last line torn
+    records = [{'ts': now, 'event': 'intent', 'cid': cid, 'batch': batch, 'ticker': t, 'qty': int(q), 'side': 'buy'}
+               for cid, t, q in zip(cids, ORDERS['ticker'], ORDERS['shares'])]
+    for i, cid in enumerate(cids[:40]):
+        order = broker.submit_order(ORDERS['ticker'][i], int(ORDERS['shares'][i]), 'buy', 'market', 'day', cid)
+        if i < 25:
+            records.append({'ts': now, 'event': 'ack', 'cid': cid, 'order_id': order.id})
+    write_journal(journal_path, records)
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"ts": 1, "event": "subm')
+    broker.calls = 0
+
+    journal = OrderJournal(journal_path)
+    assert len(journal.unfinished()) == len(ORDERS) - 25
+    results = engine(broker, journal).resume()
+
+    assert results['status'].value_counts().to_dict() == {'submitted': 20, 'existing': 15}
+    assert broker.calls == 20
+    assert len(broker.orders) == len(ORDERS)
+    journal.close()
+    assert OrderJournal(journal_path).unfinished() == []
+
+
+def test_resume_skips_other_batches_and_expires_stale_orders(journal_path):
+    broker = MockBroker(latency=0)
+    now = time.time()
+    intent = lambda cid, batch, ts: {'ts': ts, 'event': 'intent', 'cid': cid, 'batch': batch,
+                                     'ticker': cid.upper(), 'qty': 1, 'side': 'buy'}
+    write_journal(journal_path, [intent('old', '20200101', now - 3 * 86400),
+                                 intent('other', 'manual', now),
+                                 intent('today', ExecutionEngine.default_batch(), now)])
+    journal = OrderJournal(journal_path)
+    results = engine(broker, journal).resume()
+
+    assert list(results['client_order_id']) == ['today']
+    assert journal.get('old')['event'] == 'expired'
+    assert [r['cid'] for r in journal.unfinished()] == ['other']
+    assert set(broker.orders) == {'today'}
+
+
+def test_compaction_drops_finished_batches_only(journal_path):
+    broker = MockBroker(latency=0)
+    journal = OrderJournal(journal_path)
+    exe = engine(broker, journal)
+    exe.submit_orders(ORDERS.head(5), batch_id='done')
+    journal.append('intent', 'open', batch='open', ticker='X.NS', qty=1, side='buy')
+
+    assert journal.compact(keep_hours=0) == 5
+    journal.close()
+    with open(journal_path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+    assert [r['cid'] for r in OrderJournal(journal_path).unfinished()] == ['open']
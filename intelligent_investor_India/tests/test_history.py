@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cache import StatementCache
+from src.history import HistoryEngine
+
+NaN = np.nan
+
+
+def statement(rows, years=('2024-03-31', '2023-03-31', '2022-03-31', '2021-03-31')):
+    """yfinance-style annual financials: line items x period ends, newest first."""
+    return pd.DataFrame(rows, index=pd.to_datetime(list(years))).T
+
+
+def check_consistency(fin):
+    """
+    The per-ticker rules stability_table replaces (the original
+    check_stability, minus the download).
+    """
+    if fin.empty:
+        return True, "No historical data available (Neutral)"
+    revenue = fin.loc['Total Revenue'] if 'Total Revenue' in fin.index else fin.iloc[0]
+    net_income = fin.loc['Net Income'] if 'Net Income' in fin.index else fin.iloc[-1]
+    rev_trend = revenue.iloc[::-1]
+    inc_trend = net_income.iloc[::-1]
+
+    years_count = len(rev_trend)
+    if years_count < 3:
+        return True, "Not enough history (Skipped)"
+
+    latest_income = inc_trend.iloc[-1]
+    if pd.isna(latest_income) or latest_income < 0:
+        if len(inc_trend) > 1 and inc_trend.iloc[-2] < 0:
+            return False, "Loss making in recent years"
+
+    latest_rev = rev_trend.iloc[-1]
+    old_rev = rev_trend.iloc[0]
+    if pd.isna(old_rev) or old_rev == 0:
+        growth_pct = 0.0
+    else:
+        growth_pct = ((latest_rev - old_rev) / old_rev) * 100
+
+    if len(rev_trend) >= 2:
+        prev_rev = rev_trend.iloc[-2]
+        if prev_rev > 0:
+            rev_change = (latest_rev - prev_rev) / prev_rev
+            if rev_change < -0.20:
+                return False, "Revenue collapsed >20% last year"
+
+    return True, f"Growing: {growth_pct:.1f}% over {years_count} yrs"
+
+
+STATEMENTS = {
+    'GROWING.NS': statement({'Total Revenue': [140, 120, 110, 100], 'Net Income': [14, 12, 11, 10]}),
+    'LOSS.NS': statement({'Total Revenue': [100, 100, 100, 100], 'Net Income': [-5, -3, 2, 4]}),
+    'LATE_LOSS.NS': statement({'Total Revenue': [100, 100, 100], 'Net Income': [NaN, -3, 2]},
+                              years=('2024-03-31', '2023-03-31', '2022-03-31')),
+    'COLLAPSED.NS': statement({'Total Revenue': [70, 100, 90, 80], 'Net Income': [5, 9, 8, 7]}),
+    'SHORT.NS': statement({'Total Revenue': [100, 90], 'Net Income': [-1, -1]},
+                          years=('2024-03-31', '2023-03-31')),
+    # No 'Total Revenue' / 'Net Income' labels: first and last rows stand in
+    'UNLABELLED.NS': statement({'Operating Revenue': [130, 100, 90], 'EBIT': [20, 15, 10],
+                                'Net Income Common Stockholders': [9, 8, 7]},
+                               years=('2024-03-31', '2023-03-31', '2022-03-31')),
+    # A fiscal year missing from the statement (2022 never filed)
+    'GAP_YEAR.NS': statement({'Total Revenue': [150, 140, 100], 'Net Income': [10, 9, 8]},
+                             years=('2024-03-31', '2023-03-31', '2021-03-31')),
+    # Oldest column all NaN, as yfinance often returns it
+    'NAN_YEAR.NS': statement({'Total Revenue': [120, 110, 100, NaN], 'Net Income': [6, 5, 4, NaN]}),
+    # Revenue row all NaN
+    'NAN_ROW.NS': statement({'Total Revenue': [NaN, NaN, NaN, NaN], 'Net Income': [3, 2, 1, 1]}),
+    'EMPTY.NS': pd.DataFrame(),
+}
+
+
+def test_stability_table_matches_per_ticker_rules():
+    tickers = list(STATEMENTS) + ['FAILED.NS']
+    rows = [r for ticker, fin in STATEMENTS.items() for r in StatementCache.to_rows(ticker, fin)]
+    table = HistoryEngine.stability_table(StatementCache.to_frame(rows), tickers, {'FAILED.NS': 'timeout'})
+
+    for ticker, fin in STATEMENTS.items():
+        assert (table.loc[ticker, 'is_stable'], table.loc[ticker, 'history_msg']) == check_consistency(fin), ticker
+    assert table.loc['FAILED.NS', 'is_stable']
+    assert table.loc['FAILED.NS', 'history_msg'] == "History check skipped (timeout)"
+    # The fixtures reach every outcome
+    assert set(table['history_msg'].str.split().str[0]) >= {'Growing:', 'Loss', 'Revenue', 'Not', 'No', 'History'}
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from src.indicators import IndicatorEngine
+from src.indicator_state import IndicatorState
+from src.prices import PricePanel
+from src.technical import TechnicalEngine
+
+
+def random_panel(days=260, n=30, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-01', periods=days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, n)), axis=0))
+    close[:30, :5] = np.nan        # Listed late
+    close[100:103, 5:8] = np.nan   # Missing bars
+    tickers = [f"T{i}.NS" for i in range(n)]
+    frame = lambda a: pd.DataFrame(a, index=dates, columns=tickers)
+    return PricePanel({'Open': frame(close), 'High': frame(close * 1.01), 'Low': frame(close * 0.99),
+                       'Close': frame(close), 'Volume': frame(np.ones_like(close))})
+
+
+def head(panel, rows):
+    return PricePanel({field: frame.iloc[:rows] for field, frame in panel.frames.items()})
+
+
+def test_online_state_matches_full_recompute():
+    panel = random_panel()
+    full = IndicatorEngine(panel).latest()
+
+    state = IndicatorState(panel.tickers)
+    state.apply_rows(panel)
+    online = state.latest()
+
+    pd.testing.assert_frame_equal(online[full.columns], full, check_exact=False, rtol=1e-9, atol=1e-9)
+
+
+def test_checkpointed_state_resumes_one_bar_at_a_time(tmp_path):
+    panel = random_panel(seed=1)
+    full = IndicatorEngine(panel).latest()
+
+    state = IndicatorState(panel.tickers)
+    state.apply_rows(head(panel, 200))
+    path = str(tmp_path / 'state.npz')
+    state.save(path)
+    state = IndicatorState.load(path)
+    for rows in range(201, len(panel.close) + 1):
+        assert state.apply_rows(head(panel, rows), after=state.last_date) == 1
+    online = state.latest()
+
+    pd.testing.assert_frame_equal(online[full.columns], full, check_exact=False, rtol=1e-9, atol=1e-9)
+    # DMAs from the ring buffer: plain means, NaN unless the whole window has prices
+    for w in IndicatorState.DMA_WINDOWS:
+        window = panel.close.iloc[-w:]
+        expected = window.mean().where(window.notna().all())
+        np.testing.assert_allclose(online[f'{w}_dma'], expected, rtol=1e-9)
+    assert online['200_dma'].iloc[5:8].isna().all()
+
+
+def test_get_rsi_reads_the_wilder_rsi():
+    panel = random_panel()
+    rsi = IndicatorEngine(panel).latest()['rsi_14']
+    engine = TechnicalEngine(panel=panel)
+
+    assert engine.get_rsi('T10') == rsi['T10.NS']
+    assert engine.get_rsi('MISSING.NS') == 50
+    assert TechnicalEngine().get_rsi('T10.NS') == 50
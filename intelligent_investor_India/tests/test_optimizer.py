@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from src import optimizer as optimizer_module
+from src.optimizer import PortfolioOptimizer
+
+EPS = 1e-9
+
+
+def random_problem(seed, with_cov=True):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(3, 60))
+    n_sectors = int(rng.integers(1, 6))
+    budget = float(rng.choice([2e4, 1e5, 1e6]))
+    prices = rng.lognormal(6, 1.2, n)
+    scores = rng.uniform(0, 100, n)
+    caps = np.full(n, rng.uniform(0.05, 0.5))
+    sector_ids = rng.integers(0, n_sectors, n)
+    sector_caps = np.full(n_sectors, rng.uniform(0.1, 0.6))
+    cov = None
+    if with_cov:
+        A = rng.normal(0, 0.02, (n, n))
+        cov = A @ A.T * 252 / n + np.diag(rng.uniform(0.01, 0.2, n))
+    return scores, prices, budget, caps, sector_ids, sector_caps, cov
+
+
+def check_lots(opt, shares, scores, prices, budget, caps, sector_ids, sector_caps, cov):
+    assert shares.dtype.kind == 'i' and (shares >= 0).all()   # Whole shares
+    lots = shares * prices / budget
+    M = opt._sector_matrix(sector_ids, len(sector_caps))
+
+    assert lots.sum() <= 1 + EPS                              # Spend within the budget
+    assert (lots <= caps + EPS).all()
+    assert (M @ lots <= sector_caps + EPS).all()              # Sector caps
+    if cov is not None:
+        assert lots @ cov @ lots <= opt.risk_target ** 2 + EPS
+
+    # Leftover cash can't buy one more share of any stock that still has room for it
+    cash = 1 - lots.sum()
+    for i in range(len(prices)):
+        step = np.zeros(len(prices))
+        step[i] = prices[i] / budget
+        room = (lots[i] + step[i] <= caps[i] + EPS
+                and (M @ (lots + step))[sector_ids[i]] <= sector_caps[sector_ids[i]] + EPS
+                and (cov is None or (lots + step) @ cov @ (lots + step) <= opt.risk_target ** 2 + EPS))
+        if room:
+            assert cash < step[i]
+
+
+@pytest.mark.parametrize('seed', range(25))
+@pytest.mark.parametrize('with_cov', [True, False])
+def test_lots_respect_every_limit(seed, with_cov):
+    scores, prices, budget, caps, sector_ids, sector_caps, cov = random_problem(seed, with_cov)
+    opt = PortfolioOptimizer(risk_target=0.15)
+    shares, vol = opt.optimize(scores, prices, budget, caps, sector_ids, sector_caps, cov)
+
+    check_lots(opt, shares, scores, prices, budget, caps, sector_ids, sector_caps, cov)
+    assert np.isnan(vol) if cov is None else vol <= opt.risk_target + EPS
+
+
+class Failed:
+    def __init__(self, x):
+        self.x = x
+        self.success = False
+
+
+@pytest.mark.parametrize('bad', ['overshoot', 'nan'])
+def test_unconverged_solver_still_gives_a_feasible_basket(monkeypatch, bad):
+    # SLSQP stops early: way over every limit, or not even finite
+    fake = lambda fun, w0, **kwargs: Failed(w0 * 50 if bad == 'overshoot' else np.full_like(w0, np.nan))
+    monkeypatch.setattr(optimizer_module, 'minimize', fake)
+
+    for seed in range(10):
+        scores, prices, budget, caps, sector_ids, sector_caps, cov = random_problem(seed)
+        opt = PortfolioOptimizer(risk_target=0.15)
+        shares, _ = opt.optimize(scores, prices, budget, caps, sector_ids, sector_caps, cov)
+        check_lots(opt, shares, scores, prices, budget, caps, sector_ids, sector_caps, cov)
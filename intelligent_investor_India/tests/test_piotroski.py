@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cache import StatementCache
+from src.piotroski import PiotroskiEngine
+
+YEARS = ['2024-03-31', '2023-03-31', '2022-03-31', '2021-03-31']
+
+# yfinance-style statements (line items x period ends), newest year first
+STATEMENTS = {
+    'GOOD.NS': {
+        'financials': {
+            'Total Revenue': [1000, 800, 700, 600],
+            'Operating Revenue': [1, 1, 1, 1],          # Lower-ranked alias: ignored
+            'Gross Profit': [500, 300, 250, 200],
+            'Net Income': [110, 50, 40, 30],
+        },
+        # Debt-free: no 'Long Term Debt' line at all
+        'balance_sheet': {
+            'Total Assets': [1100, 1000, 900, 800],
+            'Current Assets': [300, 200, 200, 200],
+            'Current Liabilities': [100, 100, 100, 100],
+            'Ordinary Shares Number': [10, 10, 10, 10],
+        },
+        'cashflow': {'Operating Cash Flow': [200, 100, 90, 80]},
+    },
+    'BAD.NS': {
+        'financials': {
+            'Operating Revenue': [900, 1000, 1000],      # Only the fallback alias
+            'Cost Of Revenue': [600, 600, 600],          # No 'Gross Profit': revenue - cost
+            'Net Income': [-10, 20, 20],
+        },
+        'balance_sheet': {
+            'Total Assets': [1000, 1000, 1000],
+            'Long Term Debt': [400, 300, 300],
+            'Current Assets': [100, 150, 150],
+            'Current Liabilities': [100, 100, 100],
+            'Ordinary Shares Number': [12, 10, 10],
+        },
+        'cashflow': {'Operating Cash Flow': [-50, 10, 10]},
+    },
+    'SPARSE.NS': {
+        'financials': {
+            'Total Revenue': [np.nan, 600],              # NaN preferred value falls through
+            'Operating Revenue': [700, 1],
+            'Gross Profit': [350, 300],
+        },
+    },
+}
+
+
+def statements():
+    """{statement: long frame} as HistoryEngine.load_statements returns them."""
+    frames = {}
+    for kind in StatementCache.STATEMENTS:
+        rows = []
+        for ticker, sheets in STATEMENTS.items():
+            if kind in sheets:
+                wide = pd.DataFrame(sheets[kind]).T
+                wide.columns = pd.to_datetime(YEARS[:wide.shape[1]])
+                rows += StatementCache.to_rows(ticker, wide)
+        frames[kind] = StatementCache.to_frame(rows)
+    return frames
+
+
+@pytest.fixture
+def engine():
+    return PiotroskiEngine(history=object())
+
+
+def test_stack_ages_years_and_picks_aliases(engine):
+    tickers = ['GOOD.NS', 'BAD.NS', 'SPARSE.NS', 'NONE.NS']
+    X = engine.stack(statements(), tickers)
+    item = {name: i for i, name in enumerate(engine.ITEMS)}
+
+    assert X.shape == (4, engine.YEARS, len(engine.ITEMS))
+    # Year 0 is the latest fiscal year; the fourth year is dropped
+    assert X[0, :, item['total_assets']].tolist() == [1100, 1000, 900]
+    # Preferred alias wins, the fallback fills in, a NaN preferred value falls through
+    assert X[0, :, item['revenue']].tolist() == [1000, 800, 700]
+    assert X[1, :, item['revenue']].tolist() == [900, 1000, 1000]
+    assert X[2, :2, item['revenue']].tolist() == [700, 600]
+    # Missing line items and tickers stay NaN
+    assert np.isnan(X[0, :, item['long_term_debt']]).all()
+    assert np.isnan(X[2, 2, :]).all()
+    assert np.isnan(X[3]).all()
+
+
+def test_compute_known_f_scores(engine):
+    tickers = ['GOOD.NS', 'BAD.NS', 'SPARSE.NS', 'NONE.NS']
+    df = engine.compute(engine.stack(statements(), tickers), tickers)
+
+    assert (df.loc['GOOD.NS', engine.CRITERIA] == 1).all()
+    assert (df.loc['BAD.NS', engine.CRITERIA] == 0).all()
+    assert df['f_score'].tolist() == [9, 0, 0, 0]
+    assert df['f_covered'].tolist() == [9, 9, 1, 0]
+    assert df.loc['GOOD.NS', 'f_quality'] == 100
+    assert df.loc['BAD.NS', 'f_quality'] == 0
+
+    # Too few scorable criteria: no F-score rather than a fail
+    sparse = df.loc['SPARSE.NS']
+    assert sparse['f_margin'] == 0 and np.isnan(sparse['f_roa']) and np.isnan(sparse['f_quality'])
+    missing = sparse['f_missing'].split(',')
+    assert 'total_assets' in missing and 'revenue' not in missing
+
+
+def test_missing_long_term_debt_is_zero_when_assets_are_reported(engine):
+    tickers = ['GOOD.NS', 'SPARSE.NS']
+    df = engine.compute(engine.stack(statements(), tickers), tickers)
+
+    # Debt-free company: no increase in leverage
+    assert df.loc['GOOD.NS', 'f_leverage'] == 1
+    # No balance sheet at all: still not scorable
+    assert np.isnan(df.loc['SPARSE.NS', 'f_leverage'])
@@ -0,0 +1,61 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from src.portfolio import PortfolioManager
+
+
+def manager(capital):
+    # Skips __init__: no holdings.csv, no quote service
+    pm = PortfolioManager.__new__(PortfolioManager)
+    pm.capital = float(capital)
+    return pm
+
+
+def reference_allocation(df_sorted, capital, target_per_stock, current_holdings):
+    """
+    The original row-by-row walk down the ranked list, kept as the baseline.
+    """
+    picks = []
+    for ticker, row in df_sorted.iterrows():
+        if capital < 2000:
+            break
+        existing_val = current_holdings.get(ticker, 0)
+        if existing_val > target_per_stock * 0.8:
+            continue
+        price = row['price']
+        if pd.isna(price) or price <= 0:
+            continue
+        amount = min(target_per_stock - existing_val, capital)
+        shares = math.floor(amount / price)
+        cost = shares * price
+        if shares > 0:
+            picks.append({'ticker': ticker, 'sector': row.get('sector', 'Unknown'), 'shares': shares,
+                          'price': price, 'est_cost': cost, 'allocation_pct': round((cost / capital) * 100, 2)})
+            capital -= cost
+    return picks, capital
+
+
+def ranked_universe(rng, n):
+    price = rng.lognormal(6, 1.3, n)
+    price[rng.random(n) < 0.05] = np.nan
+    price[rng.random(n) < 0.02] = 0
+    return pd.DataFrame({'price': price, 'sector': rng.choice(['IT', 'Bank', 'Auto'], n)},
+                        index=[f"T{i}.NS" for i in range(n)])
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_allocate_in_order_matches_row_loop(seed):
+    rng = np.random.default_rng(seed)
+    df = ranked_universe(rng, int(rng.integers(0, 300)))
+    held = rng.choice(df.index, min(len(df), int(rng.integers(0, 20))), replace=False) if len(df) else []
+    holdings = {t: float(rng.lognormal(9, 1.5)) for t in held}
+    capital = float(rng.choice([1500, 5000, 30000, 1e5, 1e6, 1e7]))
+    target = min(capital * 1.5 / (int(rng.integers(1, 20)) + len(holdings)), capital / 3)
+
+    expected, expected_capital = reference_allocation(df, capital, target, holdings)
+    pm = manager(capital)
+    picks = pm.allocate_in_order(df, target, holdings)
+
+    assert pd.DataFrame(picks).equals(pd.DataFrame(expected))
+    assert pm.capital == pytest.approx(expected_capital, rel=0, abs=1e-6)
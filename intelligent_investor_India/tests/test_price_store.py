@@ -0,0 +1,98 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.price_store import PriceStore
+from src.prices import PricePanel
+from src.providers import MarketDataProvider
+
+DAYS = pd.bdate_range('2023-01-02', '2024-06-28')
+
+
+class FakeProvider(MarketDataProvider):
+    """
+    Serves yf.download()-style slices of one fixed OHLCV history, as seen
+    on `today`: "Nd" is the last N bars, months/years are calendar spans.
+    """
+    def __init__(self, tickers, seed=0):
+        rng = np.random.default_rng(seed)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(DAYS), len(tickers))), axis=0))
+        close = pd.DataFrame(close, index=DAYS, columns=tickers)
+        self.frames = {'Open': close * 0.99, 'High': close * 1.02, 'Low': close * 0.97, 'Close': close,
+                       'Volume': close * 0 + rng.integers(1e4, 1e6, close.shape)}
+        self.today = DAYS[300]
+        self.requests = []
+
+    def download_history(self, tickers, period="1y"):
+        self.requests.append(period)
+        seen = {f: frame.loc[:self.today, list(tickers)] for f, frame in self.frames.items()}
+        if period.endswith('d'):
+            seen = {f: frame.iloc[-int(period[:-1]):] for f, frame in seen.items()}
+        elif period != 'max':
+            offset = pd.DateOffset(months=int(period[:-2])) if period.endswith('mo') else \
+                pd.DateOffset(years=int(period[:-1]))
+            seen = {f: frame.loc[self.today - offset:] for f, frame in seen.items()}
+        return pd.concat(seen, axis=1)
+
+    def advance(self, days):
+        self.today = DAYS[DAYS.get_loc(self.today) + days]
+
+
+def assert_matches_source(store, provider, tickers, backfilled=()):
+    panel = store.to_panel()
+    assert list(panel.close.columns) == tickers
+    for field, frame in provider.frames.items():
+        expected = frame.loc[panel.close.index[0]:provider.today, tickers].copy()
+        # A late backfill only reaches back PRICE_HISTORY_PERIOD ("1y") from its own day
+        expected.loc[:provider.today - pd.DateOffset(years=1) - pd.Timedelta(days=1), list(backfilled)] = np.nan
+        # Bar for bar: same dates, bit-identical values
+        assert panel.frames[field].index.equals(expected.index)
+        np.testing.assert_array_equal(panel.frames[field].to_numpy(), expected.to_numpy())
+
+
+@pytest.fixture
+def provider():
+    return FakeProvider(['A.NS', 'B.NS', 'C.NS'])
+
+
+@pytest.fixture
+def store(tmp_path, provider):
+    store = PriceStore(tmp_path / "prices")
+    store.sync(['A.NS', 'B.NS'], provider=provider, today=provider.today)
+    assert_matches_source(store, provider, ['A.NS', 'B.NS'])
+    return store
+
+
+def test_one_day_gap(store, provider):
+    provider.advance(1)
+    store.sync(['A.NS', 'B.NS'], provider=provider, today=provider.today)
+
+    assert provider.requests[-1] == "5d"
+    assert_matches_source(store, provider, ['A.NS', 'B.NS'])
+    assert not os.path.exists(store.lock_path)
+
+
+def test_multi_week_gap_is_caught_up(store, provider):
+    # Three idle weeks: more than a "5d" download reaches
+    provider.advance(15)
+    store.sync(['A.NS', 'B.NS'], provider=provider, today=provider.today)
+
+    assert provider.requests[-1] == "1mo"
+    assert_matches_source(store, provider, ['A.NS', 'B.NS'])
+
+
+def test_rerun_on_the_same_day_overwrites_the_last_bar(store, provider):
+    provider.frames['Close'].loc[provider.today] *= 1.05
+    store.sync(['A.NS', 'B.NS'], provider=provider, today=provider.today)
+
+    assert_matches_source(store, provider, ['A.NS', 'B.NS'])
+
+
+def test_new_ticker_is_backfilled_into_a_new_generation(store, provider):
+    before = store._generation()
+    provider.advance(3)
+    store.sync(['A.NS', 'B.NS', 'C.NS'], provider=provider, today=provider.today)
+
+    assert store._generation() != before and not os.path.exists(before)
+    assert_matches_source(store, provider, ['A.NS', 'B.NS', 'C.NS'], backfilled=['C.NS'])
+    assert not os.path.exists(store.lock_path)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+from config.settings import PROJECTION_ASSUMPTIONS, PROJECTION_SEED
+from src.projection import GoalProjector
+
+ALLOCATION = {'Stocks': 50, 'Mutual_Funds': 30, 'Safe_Debt_Gold': 20}
+
+
+def sip_future_value(initial, monthly_sip, years, annual_return):
+    """Lump sum plus an annuity-due SIP, compounded monthly."""
+    r = (1 + annual_return) ** (1 / 12) - 1
+    n = 12 * years
+    return initial * (1 + r) ** n + monthly_sip * ((1 + r) ** n - 1) / r * (1 + r)
+
+
+def test_zero_volatility_median_is_the_sip_future_value():
+    assumptions = {'Stocks': (0.12, 0.0)}
+    projector = GoalProjector({'Stocks': 100}, assumptions=assumptions, correlation=[[1.0]], paths=100)
+    result = projector.project(100000, 10000, 10)
+
+    expected = [sip_future_value(100000, 10000, y, 0.12) for y in range(11)]
+    np.testing.assert_allclose(result['bands']['p50'], expected, rtol=1e-9)
+    np.testing.assert_allclose(result['bands']['p10'], result['bands']['p90'], rtol=1e-9)
+    assert result['invested'] == 100000 + 10000 * 12 * 10
+
+
+@pytest.mark.parametrize('asset', list(PROJECTION_ASSUMPTIONS))
+def test_annual_returns_match_the_assumptions(asset):
+    mu, sigma = PROJECTION_ASSUMPTIONS[asset]
+    projector = GoalProjector({asset: 100}, paths=20000)
+    wealth, _ = projector.simulate(1.0, 0, 5)
+
+    annual = wealth[:, 1:] / wealth[:, :-1] - 1
+    assert annual.mean() == pytest.approx(mu, abs=0.005)
+    assert annual.std() == pytest.approx(sigma, rel=0.03)
+
+
+def test_fixed_seed_gives_identical_bands():
+    first = GoalProjector(ALLOCATION, seed=PROJECTION_SEED).project(500000, 20000, 15, goal=1e7, sip_step_up=0.1)
+    second = GoalProjector(ALLOCATION, seed=PROJECTION_SEED).project(500000, 20000, 15, goal=1e7, sip_step_up=0.1)
+    other = GoalProjector(ALLOCATION, seed=PROJECTION_SEED + 1).project(500000, 20000, 15, goal=1e7, sip_step_up=0.1)
+
+    pd.testing.assert_frame_equal(first['bands'], second['bands'])
+    assert first['probability'] == second['probability']
+    assert not first['bands'].equals(other['bands'])
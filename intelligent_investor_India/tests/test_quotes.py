@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.quotes import QuoteService
+
+
+class FakeProvider:
+    def __init__(self, prices):
+        self.prices = prices   # symbol -> last close (missing -> unpriced)
+        self.calls = []
+
+    def download_history(self, symbols, period):
+        self.calls.append(list(symbols))
+        index = pd.date_range('2024-01-01', periods=2)
+        frames = {s: pd.DataFrame({'Close': [self.prices.get(s, np.nan)] * 2}, index=index) for s in symbols}
+        return pd.concat(frames, axis=1).swaplevel(axis=1)
+
+
+@pytest.fixture(autouse=True)
+def clean_memory():
+    QuoteService._memory.clear()
+    QuoteService._next_attempt.clear()
+    yield
+    QuoteService._memory.clear()
+    QuoteService._next_attempt.clear()
+
+
+def test_unpriced_symbol_keeps_its_fetch_time_and_backs_off():
+    provider = FakeProvider({'TCS.NS': 100.0})
+    service = QuoteService(provider=provider, ttl=60, use_cache=False)
+    assert service.get_quotes(['TCS'], now=1000).iloc[0] == 100.0
+
+    provider.prices = {}
+    assert service.get_quotes(['TCS'], now=1100).iloc[0] == 100.0
+    assert QuoteService._memory['TCS.NS'] == (100.0, 1000)   # Not re-stamped as fresh
+
+    service.get_quotes(['TCS'], now=1130)                    # Backing off: no download
+    assert len(provider.calls) == 2
+    service.get_quotes(['TCS'], now=1160)
+    assert len(provider.calls) == 3
+
+
+def test_holding_prices_never_quotes_mutual_funds():
+    provider = FakeProvider({'TCS.NS': 100.0})
+    service = QuoteService(provider=provider, ttl=60, use_cache=False)
+    holdings = pd.DataFrame({
+        'Ticker': ['TCS', 'SOME ELSS FUND - DIRECT PLAN', 'INFY'],
+        'Type': ['IT', 'MF', 'IT'],
+        'AvgPrice': [90.0, 40.0, 1500.0],
+        'Previous Closing Price': [95.0, 42.5, np.nan],
+    })
+
+    prices = service.holding_prices(holdings)
+
+    np.testing.assert_array_equal(prices, [100.0, 42.5, 1500.0])
+    assert provider.calls == [['TCS.NS', 'INFY.NS']]
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.prices import PricePanel
+from src.refresh import IncrementalRefresher
+
+TICKERS = ['A.NS', 'B.NS', 'C.NS', 'D.NS']
+
+
+def fundamentals(price):
+    return pd.DataFrame({
+        'sector': ['Technology', 'Banking', 'Industrials', 'Real Estate'],
+        'price': price,
+        '50_dma': np.nan,
+        '200_dma': np.nan,
+        'market_cap': [1e10, 2e10, 3e10, 4e10],
+        'trailing_pe': [24.0, 12.0, 14.0, 19.0],
+        'forward_pe': [20.0, 10.0, 12.0, 15.0],
+        'price_to_book': [4.0, 1.4, 2.0, 1.0],
+        'peg_ratio': [1.4, 0.9, 1.6, 2.0],
+        'dividend_yield': [0.01, 0.02, np.nan, 0.03],
+        'roe': [0.2, 0.13, 0.16, -0.05],
+        'profit_margin': [0.16, 0.2, 0.05, 0.12],
+        'debt_to_equity': [5.0, 50.0, 60.0, 150.0],
+    }, index=TICKERS)
+
+
+def panel(last_close, days=260, seed=0):
+    rng = np.random.default_rng(seed)
+    walk = np.exp(np.cumsum(rng.normal(0, 0.01, (days, len(TICKERS))), axis=0))
+    close = walk / walk[-1] * np.asarray(last_close, dtype=float)
+    frame = pd.DataFrame(close, index=pd.bdate_range('2024-01-01', periods=days), columns=TICKERS)
+    return PricePanel({'Open': frame, 'High': frame * 1.01, 'Low': frame * 0.99, 'Close': frame,
+                       'Volume': frame * 0 + 1e5})
+
+
+class StubCache:
+    def __init__(self, expired):
+        self.expired = list(expired)
+
+    def split_fresh(self, tickers, ignore_fields=()):
+        return {}, [t for t in tickers if t in self.expired]
+
+
+class StubLoader:
+    def __init__(self, tickers, rows=None, expired=()):
+        self.tickers = list(tickers)
+        self.rows = rows
+        self.cache = StubCache(expired)
+
+    def get_key_stats(self):
+        return self.rows.reindex([t for t in self.tickers if t in self.rows.index])
+
+
+class SpyRefresher(IncrementalRefresher):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.full, self.cheap = [], []
+
+    def score(self, df_raw):
+        self.full += list(df_raw.index)
+        return super().score(df_raw)
+
+    def rescore_prices(self, df_scored, df_raw):
+        self.cheap += list(df_raw.index)
+        return super().rescore_prices(df_scored, df_raw)
+
+
+def run(path, rows, prices, expired=()):
+    refresher = SpyRefresher(TICKERS, snapshot_path=str(path), panel=prices, loader_cls=StubLoader,
+                             rows=rows, expired=expired)
+    df_raw, df_scored = refresher.run()
+    return refresher, df_raw, df_scored
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / 'snapshot.pkl'
+    close = [100.0, 200.0, 300.0, 400.0]
+    run(path, fundamentals(close), panel(close))
+    return path, close
+
+
+# --- REPRICING ---
+def test_reprice_scales_multiples_with_the_close():
+    df = fundamentals([100.0, 200.0, 300.0, 400.0])
+    stats = pd.DataFrame({'price': [110.0, np.nan, 150.0, 400.0], '50_dma': 1.0, '200_dma': np.nan},
+                         index=TICKERS)
+    out = IncrementalRefresher.reprice_to(df, stats)
+    ratio = np.array([1.1, 1.0, 0.5, 1.0])
+
+    np.testing.assert_allclose(out['price'], [110.0, 200.0, 150.0, 400.0])
+    for col in ['market_cap', 'trailing_pe', 'forward_pe', 'peg_ratio', 'price_to_book']:
+        np.testing.assert_allclose(out[col], df[col] * ratio)
+    np.testing.assert_allclose(out['dividend_yield'], df['dividend_yield'] / ratio)
+    assert (out['50_dma'] == 1.0).all()
+    assert out['200_dma'].isna().all()   # NaN stats keep the snapshot value (NaN here)
+    assert out['roe'].equals(df['roe'])
+
+
+def test_reprice_leaves_an_empty_frame_alone():
+    assert IncrementalRefresher.reprice(pd.DataFrame(), panel([1, 1, 1, 1])).empty
+
+
+def test_changed_rows_treats_nan_as_equal():
+    old = pd.DataFrame({'x': [1.0, np.nan, 3.0], 'y': ['a', 'b', None]}, index=['P', 'Q', 'R'])
+    new = pd.DataFrame({'x': [1.0, np.nan, 4.0, 5.0], 'y': ['a', 'b', None, 'd']}, index=['P', 'Q', 'R', 'S'])
+    assert sorted(IncrementalRefresher.changed_rows(old, new)) == ['R', 'S']
+    assert list(IncrementalRefresher.changed_rows(old, new, ['y'])) == ['S']
+
+
+# --- RE-SCORING ---
+def test_unchanged_close_rescores_nothing(snapshot):
+    path, close = snapshot
+    refresher, df_raw, df_scored = run(path, fundamentals(close), panel(close))
+    assert refresher.full == [] and refresher.cheap == []
+    assert sorted(df_scored.index) == TICKERS
+
+
+def test_changed_fundamental_rescores_only_that_row(snapshot):
+    path, close = snapshot
+    rows = fundamentals(close)
+    rows.loc['B.NS', 'roe'] = 0.05
+    refresher, _, df_scored = run(path, rows, panel(close), expired=['B.NS'])
+
+    assert refresher.full == ['B.NS'] and refresher.cheap == []
+    assert df_scored.loc['B.NS', 'roe'] == 0.05
+
+
+def test_new_close_takes_the_cheap_path_with_full_path_scores(snapshot):
+    path, close = snapshot
+    moved = [90.0, 260.0, 300.0, 500.0]
+    refresher, df_raw, df_scored = run(path, fundamentals(close), panel(moved, seed=1))
+
+    assert refresher.full == []
+    assert sorted(refresher.cheap) == TICKERS   # C's close is the same, its DMAs moved
+    full = IncrementalRefresher(TICKERS, snapshot_path=str(path), panel=panel(moved, seed=1)).score(df_raw)
+    full = full.reindex(df_scored.index)
+    for col in ['price', 'trailing_pe', 'price_to_book', 'peg_ratio', 'rsi_14', 'trend',
+                'tech_score', 'value_score', 'quality_score', 'total_score']:
+        pd.testing.assert_series_equal(df_scored[col], full[col], check_dtype=False)
+
+
+def test_edited_rules_rescore_everything(snapshot):
+    path, close = snapshot
+    saved = pd.read_pickle(path)
+    saved['rules'] = 'an older rules file'
+    pd.to_pickle(saved, path)
+
+    refresher, _, _ = run(path, fundamentals(close), panel(close))
+    assert sorted(refresher.full) == TICKERS and refresher.cheap == []
+
+
+def test_nothing_left_after_the_merge(tmp_path):
+    path = tmp_path / 'snapshot.pkl'
+    refresher = IncrementalRefresher(TICKERS, snapshot_path=str(path), panel=panel([1, 1, 1, 1]),
+                                     loader_cls=StubLoader, rows=fundamentals([1, 1, 1, 1]), expired=TICKERS)
+    refresher.save_snapshot(pd.DataFrame(), pd.DataFrame({'total_score': []}), [])
+    refresher.loader_kwargs['rows'] = pd.DataFrame()
+
+    df_raw, df_scored = refresher.run()
+    assert df_raw.empty and df_scored.empty
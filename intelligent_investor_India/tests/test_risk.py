@@ -0,0 +1,80 @@
+import math
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+import pytest
+from config.settings import TRADING_DAYS
+from src.price_store import PriceStore
+from src.prices import PricePanel
+from src.risk import RiskEngine, ledoit_wolf
+
+TICKERS = ['A.NS', 'B.NS', 'C.NS', 'D.NS']
+
+
+def correlated_returns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    A = np.array([[1.0, 0.0, 0.0, 0.0],
+                  [0.6, 0.8, 0.0, 0.0],
+                  [0.2, -0.3, 1.5, 0.0],
+                  [0.0, 0.4, 0.1, 0.5]])
+    return rng.normal(0, 0.01, (n, len(A))) @ A.T
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # 1001 closes -> 1000 daily returns, all inside the lookback
+    returns = correlated_returns(1000)
+    close = 100 * np.exp(np.vstack([np.zeros(len(TICKERS)), np.cumsum(returns, axis=0)]))
+    frame = pd.DataFrame(close, index=pd.bdate_range('2020-01-01', periods=len(close)), columns=TICKERS)
+    store = PriceStore(tmp_path / "prices")
+    store.write_panel(PricePanel({'Open': frame, 'High': frame, 'Low': frame, 'Close': frame,
+                                  'Volume': frame * 0 + 1e5}))
+    return RiskEngine(store, lookback=1000, cache_dir=tmp_path / "risk")
+
+
+def test_ledoit_wolf_is_psd_with_fewer_days_than_stocks():
+    X = np.random.default_rng(1).normal(0, 0.01, (30, 50))
+    cov, shrinkage = ledoit_wolf(X)
+
+    assert 0 <= shrinkage <= 1
+    assert np.allclose(cov, cov.T)
+    assert np.linalg.eigvalsh(cov).min() > 0
+    # A blend of the sample covariance and a scaled identity
+    S = np.cov(X.T, bias=True)
+    expected = (1 - shrinkage) * S + shrinkage * np.trace(S) / S.shape[0] * np.eye(S.shape[0])
+    assert np.allclose(cov, expected)
+
+
+def test_ledoit_wolf_approaches_sample_covariance():
+    previous = 1.0
+    for n in (100, 1000, 100000):
+        X = correlated_returns(n, seed=n)
+        cov, shrinkage = ledoit_wolf(X)
+        assert shrinkage <= previous
+        previous = shrinkage
+
+    assert shrinkage < 1e-3
+    assert np.allclose(cov, np.cov(X.T, bias=True), rtol=1e-3, atol=1e-12)
+
+
+def test_analyze_contributions_and_parametric_var(engine):
+    positions = {'A': 40000.0, 'B.NS': 30000.0, 'C': 20000.0, 'D': 10000.0, 'UNKNOWN': 5000.0}
+    result = engine.analyze(positions)
+
+    assert result['missing'] == ['UNKNOWN']
+    assert result['value'] == 100000.0
+    w = np.array([0.4, 0.3, 0.2, 0.1])
+    C = engine.covariance(TICKERS).to_numpy()
+    vol = result['volatility']
+    assert vol == pytest.approx(math.sqrt(w @ C @ w))
+
+    contributions = result['contributions']
+    assert contributions['contribution'].sum() == pytest.approx(vol)
+    assert contributions['pct_of_risk'].sum() == pytest.approx(1)
+
+    # z * daily sigma * value, and close to the sample sigma of the portfolio's daily returns
+    z = NormalDist().inv_cdf(engine.confidence)
+    daily = vol / math.sqrt(TRADING_DAYS)
+    assert result['var_parametric'] == pytest.approx(z * daily * result['value'])
+    sample = (np.expm1(engine.load()['returns']) @ w).std()
+    assert daily == pytest.approx(sample, rel=0.02)
@@ -0,0 +1,90 @@
+import json
+import random
+import sys
+import pytest
+from src.sentiment_scorers import LexiconScorer, TextBlobScorer, find_tokens
+
+HEADLINES = [
+    "Reliance shares surge 5% on strong quarterly results",
+    "TCS profit falls, stock not good",
+    "Infosys: not bad at all, really not good",
+    "HDFC Bank reports very strong growth!",
+    "Adani stocks crash amid fraud allegations",
+    "Markets end flat; investors cautious",
+    "Wipro's margins disappoint; analysts downgrade",
+    "Tata Motors isn't doing great",
+    "Bajaj Finance: Extremely positive outlook :)",
+    "Stock never recovered from terrible losses (!)",
+    "Q3 results: net profit up 12.5% YoY, beats estimates",
+    "Vedanta can't catch a break as debt mounts :-(",
+    "Is the worst over for Paytm?",
+    "Maruti posts best-ever monthly sales!!",
+    "",
+]
+
+
+def pinned_scorer():
+    # Skips __init__ (the compiled lexicon file); entries copied from en-sentiment.xml
+    scorer = LexiconScorer.__new__(LexiconScorer)
+    scorer.table = {'great': [0.8, 1.0, False], 'good': [0.7, 1.0, False], 'bad': [-0.7, 1.0, False],
+                    'terrible': [-1.0, 1.0, False], 'very': [0.2, 1.3, True]}
+    scorer.punctuation = '.,;:!?()[]{}`\'\'"@#$^&*+-|=~_'
+    scorer.emoticons = {':)': 0.5, ':-(': -0.75}
+    return scorer
+
+
+# Tokens as TextBlob's find_tokens splits them ("isn't" -> "is n ' t"), with TextBlob's polarity
+@pytest.mark.parametrize('tokens, expected', [
+    (['profit', 'is', 'n', "'", 't', 'great'], 0.8),   # "n't" never negates in TextBlob
+    (['profit', 'is', 'not', 'great'], -0.4),
+    (['very', 'good', 'results', '!'], 1.0),
+    (['not', 'bad', 'at', 'all'], 0.35),
+    (['Stock', 'never', 'recovered', 'from', 'terrible', 'losses', '(!)'], -0.5),
+    (['Markets', 'cheer', ':)'], 0.5),
+    (['Markets', 'end', 'flat'], 0.0),
+])
+def test_lexicon_rules_give_textblob_polarities(tokens, expected):
+    assert pinned_scorer().polarity_of_tokens(tokens) == pytest.approx(expected, abs=1e-12)
+
+
+
+# Sentences as TextBlob's own find_tokens returns them
+@pytest.mark.parametrize('text, expected', [
+    ("Tata Motors isn't doing great :-(", ["Tata Motors is n ' t doing great :-("]),
+    ("Mr. Ambani's U.S. deal, e.g. Jio... (!)", ["Mr. Ambani ' s U.S. deal , e.g. Jio ...", "(!)"]),
+    ('Profit up 12.5%!! Shares "soar" : )', ["Profit up 12.5% ! !", 'Shares " soar " :)']),
+])
+def test_tokenizer_splits_like_textblob(text, expected):
+    assert find_tokens(text) == expected
+
+
+def test_compiled_lexicon_needs_no_textblob(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'textblob', None)   # import textblob -> ImportError
+    path = tmp_path / 'lexicon.json'
+    with pytest.raises(ImportError, match='pip install textblob'):
+        LexiconScorer(str(path))
+
+    path.write_text(json.dumps(pinned_scorer().table), encoding='utf-8')
+    scorer = LexiconScorer(str(path))
+    assert scorer.score(["Very good results!", "Profit isn't great :)"]) == pytest.approx([1.0, 0.65])
+
+@pytest.fixture(scope='module')
+def scorers(tmp_path_factory):
+    pytest.importorskip('textblob')
+    return LexiconScorer(str(tmp_path_factory.mktemp('lexicon') / 'lexicon.json')), TextBlobScorer()
+
+
+def test_lexicon_matches_textblob_on_headlines(scorers):
+    lexicon, textblob = scorers
+    assert lexicon.score(HEADLINES) == pytest.approx(textblob.score(HEADLINES), abs=1e-12)
+
+
+def test_lexicon_matches_textblob_on_random_word_mixes(scorers):
+    lexicon, textblob = scorers
+    rng = random.Random(0)
+    # Lexicon words mixed with negations, intensifiers, punctuation and emoticons
+    words = sorted(lexicon.table)[::7] + ['not', 'never', 'no', "isn't", 'very', 'really', 'extremely',
+                                          'stock', 'shares', '!', '(!)', ',', '.', ':)', ':-(', 'Nifty']
+    titles = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 12))) for _ in range(500)]
+    titles += [t.upper() for t in titles[:50]]
+    assert lexicon.score(titles) == pytest.approx(textblob.score(titles), abs=1e-12)
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.valuation import ValuationEngine
+
+SECTORS = ['Financial Services', 'Banking', 'Real Estate', 'Construction', 'Technology',
+           'Consumer Services', 'Industrials', 'Basic Materials', None, 'Healthcare']
+
+
+def synthetic_universe(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'sector': rng.choice(np.array(SECTORS, dtype=object), n),
+        'price': rng.uniform(10, 1000, n),
+        'trailing_pe': rng.uniform(-10, 60, n),
+        'forward_pe': rng.uniform(0, 60, n),
+        'price_to_book': rng.uniform(0, 5, n),
+        'roe': rng.normal(0.12, 0.1, n),
+        'profit_margin': rng.normal(0.1, 0.1, n),
+        'debt_to_equity': rng.uniform(0, 300, n),
+        'peg_ratio': rng.uniform(0, 4, n),
+        'tech_score': rng.choice([0, 30, 50, 80, 100], n),
+    }, index=[f"T{i}.NS" for i in range(n)])
+    for col in ['trailing_pe', 'price_to_book', 'roe', 'profit_margin', 'debt_to_equity', 'peg_ratio']:
+        df.loc[rng.random(n) < 0.1, col] = np.nan
+    # Exact cutoffs are where a vectorized rewrite usually slips (< vs <=)
+    df.loc[df.index[:40:4], 'trailing_pe'] = 15
+    df.loc[df.index[1:40:4], 'price_to_book'] = 1.5
+    df.loc[df.index[2:40:4], 'debt_to_equity'] = 100
+    df.loc[df.index[3:40:4], 'roe'] = 0.15
+    return df
+
+
+def reference_scores(df):
+    """
+    The original row-by-row scoring, kept here as the baseline.
+    """
+    value, quality = [], []
+    for _, row in df.iterrows():
+        sector = str(row['sector']).lower()
+        v = 0
+        if 'financial' in sector or 'bank' in sector:
+            if row['price_to_book'] < 1.5: v += 40
+            elif row['price_to_book'] < 2.5: v += 20
+            if row['roe'] > 0.12: v += 30
+            v += 30
+        elif 'real estate' in sector or 'construction' in sector:
+            if row['trailing_pe'] < 20: v += 40
+            if row['debt_to_equity'] < 200: v += 30
+            if row['profit_margin'] > 0.10: v += 30
+        elif 'technology' in sector or 'services' in sector:
+            if row['trailing_pe'] < 25: v += 30
+            if row['debt_to_equity'] < 10: v += 30
+            if row['profit_margin'] > 0.15: v += 40
+        else:
+            if row['trailing_pe'] < 15: v += 40
+            elif row['trailing_pe'] < 25: v += 20
+            if row['debt_to_equity'] < 70: v += 30
+            if row['roe'] > 0.15: v += 30
+        f = (row['roe'] > 0) + (row['profit_margin'] > 0) + (row['debt_to_equity'] < 100) + (row['peg_ratio'] < 1.5)
+        value.append(v)
+        quality.append(f / 4 * 100)
+    return np.array(value, dtype=float), np.array(quality, dtype=float)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_absolute_scores_match_row_loop(seed):
+    engine = ValuationEngine(synthetic_universe(2000, seed), mode='absolute', quality_source='snapshot')
+    cleaned = engine.clean_data()
+    value, quality = reference_scores(cleaned)
+
+    scored = engine.score_valuation()
+    np.testing.assert_array_equal(scored['value_score'].to_numpy(dtype=float), value)
+    np.testing.assert_array_equal(scored['quality_score'].to_numpy(dtype=float), quality)
+
+
+
+def test_row_wise_lite_score_still_counts_checks():
+    engine = ValuationEngine(synthetic_universe(200), mode='absolute', quality_source='snapshot')
+    cleaned = engine.clean_data()
+    _, quality = reference_scores(cleaned)
+
+    with pytest.warns(DeprecationWarning):
+        lite = [engine.calculate_piotroski_f_score_lite(row) for _, row in cleaned.iterrows()]
+    np.testing.assert_array_equal(np.array(lite) / 4 * 100, quality)
+
+def test_blended_score_uses_default_weights():
+    df = synthetic_universe(500)
+    engine = ValuationEngine(df, mode='absolute', quality_source='snapshot')
+    engine.clean_data()
+    out = engine.get_blended_score(df).reindex(df.index)
+    expected = out['value_score'] * 0.4 + out['quality_score'] * 0.2 + out['tech_score'] * 0.4
+    np.testing.assert_allclose(out['total_score'].to_numpy(dtype=float), expected.to_numpy(dtype=float))
+
+
+def test_non_positive_multiples_rank_last_in_percentile_mode():
+    df = pd.DataFrame({
+        'sector': 'Industrials',
+        'trailing_pe': [-5.0, 0.0, 10.0, 20.0, np.nan],
+    }, index=['LOSS', 'ZERO', 'CHEAP', 'DEAR', 'GAP'])
+    for col in ['price', 'forward_pe', 'price_to_book', 'roe', 'profit_margin', 'debt_to_equity', 'peg_ratio']:
+        df[col] = 1.0  # Ties: only P/E separates the stocks
+    engine = ValuationEngine(df, mode='percentile', quality_source='snapshot')
+    engine.clean_data()
+    scored = engine.score_valuation()
+    value, coverage = scored['value_score'], scored['value_coverage']
+
+    # A loss-making P/E is worse than any real one, not a middling unknown
+    assert value['CHEAP'] > value['DEAR'] > value['LOSS']
+    assert value['ZERO'] == value['LOSS']
+    assert value['GAP'] > value['LOSS']
+    # Neither a gap nor a non-positive multiple counts as covered
+    assert coverage['GAP'] < coverage['CHEAP']
+    assert coverage['LOSS'] < coverage['CHEAP']
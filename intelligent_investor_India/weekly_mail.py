@@ -3,12 +3,17 @@ import os
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+from config.settings import INCREMENTAL_REFRESH, HISTORY_AUDIT_SCOPE, SNAPSHOT_ARCHIVE
 from config.universe import get_nifty500_tickers
 from src.data_loader import FundamentalLoader
 from src.valuation import ValuationEngine
+from src.piotroski import configured_f_scores
 from src.technical import TechnicalEngine
 from src.portfolio import PortfolioManager
 from src.history import HistoryEngine
+from src.refresh import IncrementalRefresher
+from src.price_store import PriceStore
+from src.backtest import SnapshotArchive
 
 # --- CONFIG ---
 SMTP_SERVER = "smtp.gmail.com"
@@ -20,22 +25,36 @@ RECEIVER_EMAIL = os.environ.get("RECEIVER_EMAIL")
 def generate_report():
     print("⏳ Starting Weekly Scan...")
     tickers = get_nifty500_tickers()
-    loader = FundamentalLoader(tickers)
-    df_raw = loader.get_key_stats()
+    price_store = PriceStore()
+    price_store.sync(tickers)
+    price_panel = price_store.to_panel()
+    if INCREMENTAL_REFRESH:
+        df_raw, df_scored = IncrementalRefresher(tickers, panel=price_panel, store=price_store).run()
+    else:
+        loader = FundamentalLoader(tickers)
+        df_raw = loader.get_key_stats()
     
     if df_raw.empty:
         return "Error: Could not fetch market data."
+    if SNAPSHOT_ARCHIVE:
+        SnapshotArchive().save(df_raw)  # Dated copy for the backtester
 
     # Run Engines
-    tech_engine = TechnicalEngine()
-    df_tech = tech_engine.add_technical_indicators(df_raw)
-    
-    val_engine = ValuationEngine(df_raw)
-    val_engine.clean_data()
-    df_scored = val_engine.get_blended_score(df_tech)
+    if not INCREMENTAL_REFRESH:
+        tech_engine = TechnicalEngine(panel=price_panel, store=price_store)
+        df_tech = tech_engine.add_technical_indicators(df_raw)
+        
+        val_engine = ValuationEngine(df_raw, f_scores=configured_f_scores(df_raw.index))
+        val_engine.clean_data()
+        df_scored = val_engine.get_blended_score(df_tech)
+
+    # Whole-universe statement audit (cached), so picks are already stable
+    if HISTORY_AUDIT_SCOPE == "universe":
+        verdicts = HistoryEngine().audit(df_scored.index)
+        df_scored = df_scored[verdicts['is_stable'].to_numpy()]
     
     # Get Top Picks (Budget doesn't matter here, just ranking)
-    pm = PortfolioManager(100000)
+    pm = PortfolioManager(100000, price_store=price_store)
     candidates = pm.select_and_allocate(df_scored, top_n=10)
     
     hist = HistoryEngine()